@@ -0,0 +1,156 @@
+# benchmarks/bench_codebook.py
+"""
+Benchmark das codificações VLAD/BoVW com índice invertido contra o vetor SIFT médio.
+
+Cadastra as imagens de amostra, treina o codebook com os descritores da própria galeria
+(como faria `python src/codebook.py train --from-db`) e consulta com versões perturbadas
+das mesmas imagens (recorte, rotação, brilho e recompressão JPEG). Para cada método,
+mede recall@k e a latência da busca (sem a extração, medida à parte).
+
+Uso:
+    python benchmarks/bench_codebook.py --synthetic 300
+    python benchmarks/bench_codebook.py --images /caminho/amostras --words 64,256 --probes 8,16
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "src"), ROOT]
+
+from bench_resolution import perturb  # noqa: E402
+from codebook import VisualCodebook  # noqa: E402
+from gallery import GalleryMatcher, InvertedFileIndex  # noqa: E402
+from image_data import ImageData  # noqa: E402
+from strategies.sift_extractor import SIFTExtractor  # noqa: E402
+
+
+def load_samples(args):
+    if args.images:
+        paths = sorted(
+            path for ext in ("jpg", "jpeg", "png")
+            for path in glob.glob(os.path.join(args.images, f"*.{ext}"))
+        )
+        return [open(path, "rb").read() for path in paths]
+
+    # Imagens sintéticas já no tamanho normalizado (640 x 480), com textura para o SIFT
+    rng = np.random.default_rng(args.seed)
+    samples = []
+    for _ in range(args.synthetic):
+        image = np.full((480, 640, 3), rng.integers(0, 255, 3), dtype=np.uint8)
+        for _ in range(25):
+            center = tuple(int(v) for v in rng.integers(0, (640, 480)))
+            axes = tuple(int(v) for v in rng.integers(10, 120, 2))
+            color = tuple(int(v) for v in rng.integers(0, 255, 3))
+            cv2.ellipse(image, center, axes, float(rng.uniform(0, 180)), 0, 360, color, -1)
+        noise = rng.normal(0, 12, image.shape)
+        image = np.clip(image + noise, 0, 255).astype(np.uint8)
+        samples.append(cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 92])[1].tobytes())
+    return samples
+
+
+def describe(samples, sift, max_side):
+    descriptors = []
+    for data in samples:
+        _, desc = sift.detect(ImageData(data=data, max_side=max_side))
+        descriptors.append(desc if desc is not None else np.zeros((1, 128), dtype=np.float32))
+    return descriptors
+
+
+def measure(name, search, queries, ks):
+    latencies = []
+    hits = {k: 0 for k in ks}
+    for expected, query in enumerate(queries):
+        started = time.perf_counter()
+        ranked = search(query, max(ks))
+        latencies.append((time.perf_counter() - started) * 1000.0)
+        ranked_ids = [dog_id for dog_id, _ in ranked]
+        for k in ks:
+            hits[k] += int(expected in ranked_ids[:k])
+    result = {
+        "method": name,
+        "query_ms_p50": float(np.percentile(latencies, 50)),
+        "query_ms_p95": float(np.percentile(latencies, 95)),
+    }
+    result.update({f"recall@{k}": hits[k] / len(queries) for k in ks})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="Diretório com imagens de amostra (jpg/png).")
+    parser.add_argument("--synthetic", type=int, default=200, help="Qtd. de imagens sintéticas se --images não for usado.")
+    parser.add_argument("--max-side", type=int, default=640, help="Normalização de resolução (0 = original).")
+    parser.add_argument("--nfeatures", type=int, default=500, help="nfeatures do SIFT.")
+    parser.add_argument("--words", default="64,256", help="Tamanhos de codebook testados.")
+    parser.add_argument("--probes", default="0,8", help="Palavras visitadas pelo índice invertido (0 = todas).")
+    parser.add_argument("--ks", default="1,5,10", help="Valores de k do recall@k.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Arquivo de saída com os resultados em JSON.")
+    args = parser.parse_args()
+
+    samples = load_samples(args)
+    if not samples:
+        parser.error("Nenhuma imagem de amostra encontrada.")
+    rng = np.random.default_rng(args.seed)
+    queries = [perturb(data, rng) for data in samples]
+    ks = [int(v) for v in args.ks.split(",")]
+
+    sift = SIFTExtractor(nfeatures=args.nfeatures)
+    gallery_descriptors = describe(samples, sift, args.max_side)
+    started = time.perf_counter()
+    query_descriptors = describe(queries, sift, args.max_side)
+    detect_ms = (time.perf_counter() - started) * 1000.0 / len(queries)
+    dog_ids = list(range(len(samples)))
+
+    results = []
+    mean_gallery = GalleryMatcher(dog_ids, [d.mean(axis=0) for d in gallery_descriptors])
+    results.append(measure(
+        "sift-mean", lambda q, k: mean_gallery.top_k(q.mean(axis=0), "cosine", k), query_descriptors, ks
+    ))
+
+    for n_words in (int(v) for v in args.words.split(",")):
+        codebook = VisualCodebook.train(gallery_descriptors, n_words=n_words, seed=args.seed)
+        for encoding in ("vlad", "bovw"):
+            encoded = [codebook.encode(d, encoding) for d in gallery_descriptors]
+            started = time.perf_counter()
+            encoded_queries = [codebook.encode(d, encoding) for d in query_descriptors]
+            encode_ms = (time.perf_counter() - started) * 1000.0 / len(queries)
+
+            full = GalleryMatcher(dog_ids, encoded)
+            result = measure(
+                f"{encoding}-{n_words}-scan", lambda q, k: full.top_k(q, "cosine", k), encoded_queries, ks
+            )
+            result["encode_ms"] = encode_ms
+            results.append(result)
+
+            index = InvertedFileIndex.from_rows(zip(dog_ids, encoded), n_words)
+            for probe in (int(v) for v in args.probes.split(",")):
+                result = measure(
+                    f"{encoding}-{n_words}-ivf-probe{probe or 'all'}",
+                    lambda q, k: index.top_k(q, k, probe=probe or None),
+                    encoded_queries, ks,
+                )
+                result["encode_ms"] = encode_ms
+                result["candidates_mean"] = float(np.mean([len(index.candidates(q, probe or None)) for q in encoded_queries]))
+                results.append(result)
+
+    print(f"galeria={len(samples)} detecção SIFT={detect_ms:.1f}ms/imagem")
+    for result in results:
+        recalls = " ".join(f"r@{k}={result[f'recall@{k}']:.3f}" for k in ks)
+        extra = f" cand={result['candidates_mean']:.0f}" if "candidates_mean" in result else ""
+        print(f"{result['method']:>26} p50={result['query_ms_p50']:7.3f}ms p95={result['query_ms_p95']:7.3f}ms {recalls}{extra}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"samples": len(samples), "detect_ms": detect_ms, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# benchmarks/bench_components.py
+"""
+Microbenchmarks das peças da identificação, sem banco nem HTTP.
+
+- decode: decodificação + normalização de resolução (`ImageData`);
+- strategy:<nome>: cada estratégia de `src/strategies/` sobre a imagem já decodificada
+  (VLAD/BoVW usam um codebook treinado com as próprias imagens sintéticas);
+- pipeline: `FeatureExtractionManager.extract_features` com as estratégias escolhidas;
+- similarity:<classe>: `compare` de `similarity_metrics.py` para um par de vetores;
+- gallery:<métrica>: `GalleryMatcher.top_k` sobre uma galeria sintética de `--gallery` cães.
+
+Estratégias cujas dependências não estão instaladas (scikit-image, por exemplo) aparecem
+como ignoradas no resultado.
+
+Uso:
+    python benchmarks/bench_components.py --images 30 --gallery 50000 --json atual.json
+    python benchmarks/bench_components.py --baseline referencia.json --fail-on-regression
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "src"), ROOT]
+
+from harness import add_common_arguments, finish, measure, synthetic_jpegs  # noqa: E402
+from bench_pq import synthetic_gallery  # noqa: E402
+from feature_extraction_manager import FeatureExtractionManager  # noqa: E402
+from gallery import GalleryMatcher  # noqa: E402
+from image_data import ImageData  # noqa: E402
+from similarity_metrics import CosineSimilarity, EuclideanSimilarity  # noqa: E402
+
+STRATEGIES = ("SIFT", "HOG", "MeanColor", "Texture", "Keypoints", "VLAD", "BoVW")
+
+
+def build_strategy(name, samples, args):
+    """Cria a estratégia como `app.build_strategy`, sem depender da configuração do app."""
+    if name == "SIFT":
+        from strategies.sift_extractor import SIFTExtractor
+        return SIFTExtractor(nfeatures=args.nfeatures)
+    if name == "HOG":
+        from strategies.hog_extractor import HOGExtractor
+        return HOGExtractor()
+    if name == "MeanColor":
+        from strategies.mean_color_extractor import MeanColorExtractor
+        return MeanColorExtractor()
+    if name == "Texture":
+        from strategies.texture_extractor import TextureExtractor
+        return TextureExtractor()
+    if name == "Keypoints":
+        from strategies.keypoints_extractor import KeypointsExtractor
+        return KeypointsExtractor()
+    if name in ("VLAD", "BoVW"):
+        from codebook import VisualCodebook
+        from strategies.sift_extractor import SIFTExtractor
+        from strategies.vlad_extractor import VLADExtractor
+        sift = SIFTExtractor(nfeatures=args.nfeatures)
+        descriptors = [sift.detect(image)[1] for image in samples]
+        codebook = VisualCodebook.train(
+            [d for d in descriptors if d is not None], n_words=args.words, seed=args.seed
+        )
+        return VLADExtractor(codebook, encoding=name.lower(), nfeatures=args.nfeatures)
+    raise ValueError(f"Estratégia desconhecida: '{name}'.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=20, help="Imagens sintéticas medidas.")
+    parser.add_argument("--width", type=int, default=1280, help="Largura das imagens sintéticas.")
+    parser.add_argument("--height", type=int, default=960, help="Altura das imagens sintéticas.")
+    parser.add_argument("--max-side", type=int, default=640, help="Normalização de resolução (0 desativa).")
+    parser.add_argument("--nfeatures", type=int, default=0, help="Limite de keypoints do SIFT (0 = sem limite).")
+    parser.add_argument("--words", type=int, default=64, help="Palavras do codebook VLAD/BoVW.")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES), help="Estratégias medidas.")
+    parser.add_argument("--pipeline", default="SIFT", help="Estratégias do gerenciador medido em `pipeline`.")
+    parser.add_argument("--gallery", type=int, default=20000, help="Cães na galeria sintética.")
+    parser.add_argument("--dim", type=int, default=128, help="Dimensão dos vetores da galeria.")
+    parser.add_argument("--queries", type=int, default=200, help="Consultas à galeria e pares comparados.")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    samples = synthetic_jpegs(args.images, args.seed, args.width, args.height)
+    max_side = args.max_side or None
+    results = {}
+
+    results["decode"] = measure(lambda data: ImageData(data, max_side=max_side).gray, samples)
+
+    # As estratégias recebem a imagem já decodificada, como no gerenciador; cada chamada
+    # usa um ImageData novo para não reaproveitar as conversões de cor da anterior
+    decoded = [ImageData(data, max_side=max_side).bgr for data in samples]
+    strategies = {}
+    for name in (s.strip() for s in args.strategies.split(",") if s.strip()):
+        try:
+            strategies[name] = build_strategy(name, [ImageData(bgr=image) for image in decoded], args)
+        except ImportError as e:
+            results[f"strategy:{name}"] = {"count": 0, "skipped": f"ignorada ({e})"}
+            continue
+        strategy = strategies[name]
+        if hasattr(strategy, "warmup"):
+            strategy.warmup()
+        results[f"strategy:{name}"] = measure(lambda image: strategy.extract(ImageData(bgr=image)), decoded)
+
+    pipeline = [s.strip() for s in args.pipeline.split(",") if s.strip()]
+    missing = [name for name in pipeline if name not in strategies]
+    if missing:
+        results["pipeline"] = {"count": 0, "skipped": f"ignorado (estratégias indisponíveis: {missing})"}
+    else:
+        manager = FeatureExtractionManager([strategies[name] for name in pipeline], max_side=max_side)
+        manager.warmup()
+        results["pipeline"] = measure(manager.extract_features, samples)
+
+    rng = np.random.default_rng(args.seed)
+    vectors, queries = synthetic_gallery(args.gallery, args.dim, breeds=200, latent=16, noise=2.0, rng=rng)
+    queries = queries[rng.choice(args.gallery, min(args.queries, args.gallery), replace=False)]
+    pairs = list(zip(queries, vectors[:len(queries)]))
+    pair_lists = [(a.tolist(), b.tolist()) for a, b in pairs]
+
+    for metric in (EuclideanSimilarity(), CosineSimilarity()):
+        name = type(metric).__name__
+        metric.compare(*pair_lists[0])
+        results[f"similarity:{name}"] = measure(lambda pair: metric.compare(*pair), pair_lists, memory_samples=0)
+
+    gallery = GalleryMatcher(np.arange(args.gallery), vectors)
+    for metric in GalleryMatcher.METRICS:
+        results[f"gallery:{metric}"] = measure(lambda query: gallery.top_k(query, metric, args.k), queries)
+
+    finish("components", args, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# benchmarks/bench_http.py
+"""
+Benchmark dos endpoints HTTP com tráfego sintético de cadastro e identificação.
+
+Roda sem acesso à internet, contra um Postgres local (use um banco só para benchmark: os
+cães criados não são apagados). As imagens sintéticas são servidas por um servidor HTTP
+local, já que os endpoints recebem `image_url`.
+
+1. Semeia a galeria com `--gallery` cães de vetores sintéticos, gravados direto no banco
+   com `DB.insert_dogs` (só o volume da galeria importa para a busca);
+2. cadastra `--enroll` imagens pelo endpoint de cadastro (`--enroll-endpoint`);
+3. identifica versões perturbadas dessas imagens (recorte, rotação, brilho, recompressão)
+   em cada endpoint de `--endpoints`, medindo latência, vazão e acerto do 1º colocado.
+
+Sem `--url`, o app é importado neste processo e chamado pelo cliente de testes do Flask
+(com a configuração do ambiente: POSTGRES_*, EXTRACTION_STRATEGIES, ...). Com `--url`,
+as requisições vão para um servidor já no ar (gunicorn, Docker), e a semeadura usa a
+mesma configuração de banco deste processo.
+
+Uso:
+    python benchmarks/bench_http.py --gallery 20000 --enroll 30 --json http.json
+    python benchmarks/bench_http.py --url http://127.0.0.1:8080 --concurrency 4 --baseline http.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "src"), ROOT]
+
+from harness import add_common_arguments, finish, latency_summary, rss_peak_mb, synthetic_jpegs  # noqa: E402
+from bench_pq import synthetic_gallery  # noqa: E402
+from bench_resolution import perturb  # noqa: E402
+
+IDENTIFY_ENDPOINTS = ("/v1/identify_dog", "/v2/identify_dog", "/v3/identify_dog", "/v4/identify_dog")
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_images(images):
+    """Grava as imagens em um diretório temporário e as serve em 127.0.0.1 (porta livre)."""
+    directory = tempfile.mkdtemp(prefix="bench-http-")
+    for name, data in images.items():
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(data)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class InProcessClient:
+    """Chama o app deste processo pelo cliente de testes do Flask."""
+
+    def __init__(self):
+        import app as app_module
+
+        app_module.startup_report.wait_ready()
+        self.client = app_module.app.test_client()
+
+    def post(self, path, body):
+        response = self.client.post(path, json=body)
+        return response.status_code, response.get_json(silent=True)
+
+
+class RemoteClient:
+    """Chama um servidor já no ar."""
+
+    def __init__(self, url, timeout=120.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def post(self, path, body):
+        request = urllib.request.Request(
+            self.url + path, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read() or b"null")
+        except urllib.error.HTTPError as e:
+            try:
+                return e.code, json.loads(e.read() or b"null")
+            except ValueError:
+                return e.code, None
+
+
+def top_dog_id(payload):
+    """ID do 1º colocado nas respostas de identificação v1 a v4."""
+    if not isinstance(payload, dict):
+        return None
+    if "dog_id" in payload:
+        return payload["dog_id"]
+    if "cosine" in payload:
+        return payload["cosine"].get("dog_id")
+    candidates = payload.get("candidates") or []
+    return candidates[0]["dog_id"] if candidates else None
+
+
+def replay(client, requests, concurrency):
+    """
+    Envia as requisições (path, corpo, esperado) e mede cada uma.
+
+    Returns:
+        tuple: (resumo de latência com `errors` e `accuracy`, respostas na mesma ordem).
+    """
+    def send(item):
+        path, body, _ = item
+        started = time.perf_counter()
+        status, payload = client.post(path, body)
+        return (time.perf_counter() - started) * 1000.0, status, payload
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            responses = list(executor.map(send, requests))
+    else:
+        responses = [send(item) for item in requests]
+    elapsed = time.perf_counter() - started
+
+    result = latency_summary([latency for latency, _, _ in responses], elapsed)
+    result["errors"] = sum(1 for _, status, _ in responses if status >= 500)
+    expected = [item[2] for item in requests]
+    if any(value is not None for value in expected):
+        hits = sum(
+            1 for (_, _, payload), dog_id in zip(responses, expected)
+            if dog_id is not None and top_dog_id(payload) == dog_id
+        )
+        result["accuracy"] = hits / len(requests)
+    return result, responses
+
+
+def seed_gallery(size, dim, seed, batch_size=1000):
+    """Cadastra `size` cães com vetores sintéticos direto no banco, em lotes."""
+    from config import config
+    from database import DB
+
+    database = DB(config)
+    rng = np.random.default_rng(seed)
+    vectors, _ = synthetic_gallery(size, dim, breeds=200, latent=16, noise=2.0, rng=rng)
+    try:
+        for start in range(0, size, batch_size):
+            batch = vectors[start:start + batch_size]
+            dogs = [
+                (f"bench-{start + offset}", vector.astype(float).tolist(), f"synthetic://{start + offset}")
+                for offset, vector in enumerate(batch)
+            ]
+            if database.insert_dogs(dogs, {"strategy": "synthetic"}) is None:
+                raise RuntimeError("Falha ao semear a galeria sintética.")
+    finally:
+        database.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="URL base de um servidor no ar (padrão: app neste processo).")
+    parser.add_argument("--gallery", type=int, default=0, help="Cães sintéticos semeados direto no banco.")
+    parser.add_argument("--dim", type=int, default=128, help="Dimensão dos vetores semeados (a do vetor principal).")
+    parser.add_argument("--enroll", type=int, default=20, help="Imagens cadastradas pelo endpoint de cadastro.")
+    parser.add_argument("--enroll-endpoint", default="/v2/add_dog")
+    parser.add_argument("--endpoints", default=",".join(IDENTIFY_ENDPOINTS[:3]), help="Endpoints de identificação medidos.")
+    parser.add_argument("--rounds", type=int, default=1, help="Vezes que cada consulta é repetida por endpoint.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Requisições simultâneas.")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=960)
+    parser.add_argument("--seed", type=int, default=42)
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    samples = synthetic_jpegs(args.enroll, args.seed, args.width, args.height)
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    images = {f"dog-{i}.jpg": data for i, data in enumerate(samples)}
+    # Cada consulta é uma perturbação diferente, para o cache de features (chave = hash dos
+    # bytes) não responder por endpoints e rodadas seguintes
+    for e in range(len(endpoints)):
+        for r in range(args.rounds):
+            images.update({f"query-{e}-{r}-{i}.jpg": perturb(data, rng) for i, data in enumerate(samples)})
+    server, images_url = serve_images(images)
+
+    results = {}
+    try:
+        if args.gallery:
+            started = time.perf_counter()
+            seed_gallery(args.gallery, args.dim, args.seed)
+            print(f"Galeria semeada com {args.gallery} cães em {time.perf_counter() - started:.1f}s.")
+
+        client = RemoteClient(args.url) if args.url else InProcessClient()
+        # A galeria em cache precisa enxergar os cães semeados
+        client.post("/v2/gallery/invalidate", {})
+
+        enrolls = [
+            (args.enroll_endpoint, {"dog_name": f"bench-enroll-{i}", "image_url": f"{images_url}/dog-{i}.jpg"}, None)
+            for i in range(args.enroll)
+        ]
+        results[f"enroll:{args.enroll_endpoint}"], responses = replay(client, enrolls, args.concurrency)
+        enrolled = [payload.get("dog_id") if status == 201 and payload else None for _, status, payload in responses]
+
+        for e, endpoint in enumerate(endpoints):
+            queries = [
+                (endpoint, {"image_url": f"{images_url}/query-{e}-{r}-{i}.jpg"}, dog_id)
+                for r in range(args.rounds) for i, dog_id in enumerate(enrolled)
+            ]
+            results[f"identify:{endpoint}"], _ = replay(client, queries, args.concurrency)
+            if not args.url:
+                results[f"identify:{endpoint}"]["rss_peak_mb"] = rss_peak_mb()
+    finally:
+        server.shutdown()
+
+    finish("http", args, results)
+
+
+if __name__ == "__main__":
+    main()
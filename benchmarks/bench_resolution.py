@@ -0,0 +1,133 @@
+# benchmarks/bench_resolution.py
+"""
+Benchmark da etapa de normalização de resolução antes do SIFT.
+
+Para cada combinação de `max_side` / `nfeatures` / decodificação reduzida, cadastra as
+imagens de amostra numa galeria em memória, consulta com versões perturbadas das mesmas
+imagens (recorte, rotação, brilho e recompressão JPEG) e mede a latência de extração e a
+acurácia top-1.
+
+Uso:
+    python benchmarks/bench_resolution.py --images /caminho/amostras
+    python benchmarks/bench_resolution.py --synthetic 30 --max-sides 0,1600,1024,800,640
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "src"), ROOT]
+
+from feature_extraction_manager import FeatureExtractionManager  # noqa: E402
+from gallery import GalleryMatcher  # noqa: E402
+from strategies.sift_extractor import SIFTExtractor  # noqa: E402
+
+
+def load_samples(args):
+    if args.images:
+        paths = sorted(
+            path for ext in ("jpg", "jpeg", "png")
+            for path in glob.glob(os.path.join(args.images, f"*.{ext}"))
+        )
+        return [open(path, "rb").read() for path in paths]
+
+    # Imagens sintéticas do tamanho de uma foto de celular (4000 x 3000)
+    rng = np.random.default_rng(args.seed)
+    samples = []
+    for _ in range(args.synthetic):
+        image = np.full((3000, 4000, 3), rng.integers(0, 255, 3), dtype=np.uint8)
+        for _ in range(60):
+            center = tuple(int(v) for v in rng.integers(0, (4000, 3000)))
+            axes = tuple(int(v) for v in rng.integers(40, 600, 2))
+            color = tuple(int(v) for v in rng.integers(0, 255, 3))
+            cv2.ellipse(image, center, axes, float(rng.uniform(0, 180)), 0, 360, color, -1)
+        image = cv2.GaussianBlur(image, (0, 0), 2)
+        samples.append(cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 92])[1].tobytes())
+    return samples
+
+
+def perturb(data, rng):
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    height, width = image.shape[:2]
+    crop = rng.uniform(0.85, 0.95)
+    y0 = int(rng.uniform(0, 1 - crop) * height)
+    x0 = int(rng.uniform(0, 1 - crop) * width)
+    image = image[y0:y0 + int(crop * height), x0:x0 + int(crop * width)]
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), rng.uniform(-10, 10), 1.0)
+    image = cv2.warpAffine(image, matrix, (width, height), borderMode=cv2.BORDER_REFLECT)
+    image = cv2.convertScaleAbs(image, alpha=rng.uniform(0.85, 1.15), beta=rng.uniform(-15, 15))
+    return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tobytes()
+
+
+def run_config(samples, queries, max_side, nfeatures, reduced_decode):
+    manager = FeatureExtractionManager(
+        [SIFTExtractor(nfeatures=nfeatures)], max_side=max_side, reduced_decode=reduced_decode
+    )
+    gallery = GalleryMatcher(
+        list(range(len(samples))), [manager.extract_features(data) for data in samples]
+    )
+
+    latencies = []
+    hits = 0
+    for expected, data in enumerate(queries):
+        started = time.perf_counter()
+        features = manager.extract_features(data)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+        dog_id, _ = gallery.closest(features, "cosine")
+        hits += int(dog_id == expected)
+
+    return {
+        "max_side": max_side,
+        "nfeatures": nfeatures,
+        "reduced_decode": reduced_decode,
+        "latency_ms_p50": float(np.percentile(latencies, 50)),
+        "latency_ms_p95": float(np.percentile(latencies, 95)),
+        "latency_ms_mean": float(np.mean(latencies)),
+        "top1_accuracy": hits / len(queries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="Diretório com imagens de amostra (jpg/png).")
+    parser.add_argument("--synthetic", type=int, default=20, help="Qtd. de imagens sintéticas se --images não for usado.")
+    parser.add_argument("--max-sides", default="0,1600,1024,800,640", help="Valores de max_side (0 = resolução original).")
+    parser.add_argument("--nfeatures", default="0", help="Valores de nfeatures do SIFT (0 = todos).")
+    parser.add_argument("--reduced-decode", action="store_true", help="Também mede com decodificação reduzida.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Arquivo de saída com os resultados em JSON.")
+    args = parser.parse_args()
+
+    samples = load_samples(args)
+    if not samples:
+        parser.error("Nenhuma imagem de amostra encontrada.")
+    rng = np.random.default_rng(args.seed)
+    queries = [perturb(data, rng) for data in samples]
+
+    results = []
+    for max_side in (int(v) for v in args.max_sides.split(",")):
+        for nfeatures in (int(v) for v in args.nfeatures.split(",")):
+            modes = (False, True) if args.reduced_decode and max_side else (False,)
+            for reduced_decode in modes:
+                result = run_config(samples, queries, max_side, nfeatures, reduced_decode)
+                results.append(result)
+                print(
+                    f"max_side={max_side or 'orig':>5} nfeatures={nfeatures:>5} reduced={str(reduced_decode):>5} "
+                    f"p50={result['latency_ms_p50']:8.1f}ms p95={result['latency_ms_p95']:8.1f}ms "
+                    f"top1={result['top1_accuracy']:.3f}"
+                )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"samples": len(samples), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
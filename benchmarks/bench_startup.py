@@ -0,0 +1,134 @@
+# benchmarks/bench_startup.py
+"""
+Benchmark da inicialização a frio do app (o que uma instância nova do Cloud Run paga
+antes de atender).
+
+Cada rodada sobe um processo Python novo com `-X importtime`, importa `app`, espera o
+pré-aquecimento terminar e lê o relatório de `startup.startup_report`. Reporta o tempo até
+a importação e até a prontidão (p50/máximo entre as rodadas), o tempo de cada etapa e os
+pacotes mais caros de importar.
+
+Uso:
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --env LAZY_STARTUP=1 --budget-ms 3000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, time
+started = time.perf_counter()
+import app
+imported_ms = (time.perf_counter() - started) * 1000.0
+app.startup_report.wait_ready(120)
+report = app.startup_report.as_dict()
+report["import_ms"] = imported_ms
+print("STARTUP_REPORT " + json.dumps(report))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Soma o tempo cumulativo (ms) por pacote das importações feitas diretamente pelo app
+    (e das de primeiro nível do interpretador), a partir da saída de `-X importtime`.
+    """
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue
+        # O nome é indentado com dois espaços por nível de importação aninhada
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        package = name.strip().split(".")[0]
+        if depth > 1 or package == "app":
+            continue
+        packages[package] = packages.get(package, 0.0) + int(cumulative) / 1000.0
+    return packages
+
+
+def run_once(env):
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=os.path.join(ROOT, "src"), env=env, capture_output=True, text=True, timeout=300,
+    )
+    report = None
+    for line in completed.stdout.splitlines():
+        if line.startswith("STARTUP_REPORT "):
+            report = json.loads(line[len("STARTUP_REPORT "):])
+    if report is None:
+        raise RuntimeError(f"O app não subiu (código {completed.returncode}):\n{completed.stderr[-2000:]}")
+    report["imports"] = parse_importtime(completed.stderr)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Processos iniciados.")
+    parser.add_argument("--env", action="append", default=[], help="Variável KEY=VALOR passada ao app (repetível).")
+    parser.add_argument("--top", type=int, default=10, help="Pacotes listados por tempo de importação.")
+    parser.add_argument("--budget-ms", type=float, default=0.0, help="Falha (código 1) se o p50 de prontidão passar disso.")
+    parser.add_argument("--json", help="Arquivo de saída com os resultados em JSON.")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.join(ROOT, "src"), ROOT, env.get("PYTHONPATH")]))
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    reports = [run_once(env) for _ in range(args.runs)]
+    import_ms = [r["import_ms"] for r in reports]
+    ready_ms = [r["ready_ms"] for r in reports]
+    stages = {}
+    for report in reports:
+        for stage in report["stages"]:
+            stages.setdefault(stage["name"], []).append(stage["ms"])
+    packages = {}
+    for report in reports:
+        for package, ms in report["imports"].items():
+            packages.setdefault(package, []).append(ms)
+
+    summary = {
+        "runs": args.runs,
+        "env": args.env,
+        "import_ms_p50": float(np.percentile(import_ms, 50)),
+        "ready_ms_p50": float(np.percentile(ready_ms, 50)),
+        "ready_ms_max": float(max(ready_ms)),
+        "stages_ms_p50": {name: float(np.percentile(values, 50)) for name, values in stages.items()},
+        "imports_ms_p50": dict(sorted(
+            ((package, float(np.percentile(values, 50))) for package, values in packages.items()),
+            key=lambda item: item[1], reverse=True,
+        )[:args.top]),
+        "errors": reports[-1]["errors"],
+    }
+
+    print(f"rodadas={args.runs} env={' '.join(args.env) or '-'}")
+    print(f"importação p50={summary['import_ms_p50']:.0f}ms  prontidão p50={summary['ready_ms_p50']:.0f}ms "
+          f"máx={summary['ready_ms_max']:.0f}ms")
+    for name, ms in summary["stages_ms_p50"].items():
+        print(f"  etapa {name:<28} {ms:8.1f} ms")
+    for package, ms in summary["imports_ms_p50"].items():
+        print(f"  import {package:<27} {ms:8.1f} ms")
+    for name, error in summary["errors"].items():
+        print(f"  erro em {name}: {error}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    if args.budget_ms and summary["ready_ms_p50"] > args.budget_ms:
+        print(f"Prontidão p50 acima do orçamento de {args.budget_ms:.0f} ms.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# benchmarks/harness.py
+"""
+Funções comuns dos benchmarks: medição de latência e memória, imagens sintéticas,
+saída em JSON e comparação com um resultado anterior guardado como referência.
+
+Formato do JSON gravado com `--json`:
+
+    {
+        "suite": "components",
+        "params": {...},                  # argumentos da linha de comando
+        "environment": {...},             # Python, NumPy, OpenCV, CPUs, commit
+        "results": {
+            "strategy:SIFT": {"count": 50, "p50_ms": ..., "p95_ms": ..., "p99_ms": ...,
+                              "mean_ms": ..., "throughput": ..., "alloc_peak_kb": ...,
+                              "rss_peak_mb": ...},
+            ...
+        }
+    }
+
+Um arquivo desses pode ser passado depois em `--baseline`: cada métrica é comparada com a
+mesma métrica da referência, e variações piores que `--tolerance` são listadas como
+regressão (código de saída 1 com `--fail-on-regression`).
+"""
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+# Métricas comparadas com a referência e o sentido em que são melhores
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "mean_ms", "alloc_peak_kb")
+HIGHER_IS_BETTER = ("throughput", "accuracy")
+
+
+def add_common_arguments(parser):
+    parser.add_argument("--json", help="Arquivo de saída com os resultados em JSON.")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior usado como referência.")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Piora relativa tolerada antes de apontar regressão (0.10 = 10%%).")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Sai com código 1 se alguma métrica piorar além da tolerância.")
+
+
+def latency_summary(latencies_ms, elapsed_s=None):
+    """
+    Resume as latências de uma série de chamadas.
+
+    Args:
+        latencies_ms (list): Latência de cada chamada, em milissegundos.
+        elapsed_s (float): Tempo total da série (para a vazão com chamadas concorrentes);
+                           se omitido, usa a soma das latências.
+
+    Returns:
+        dict: count, p50_ms, p95_ms, p99_ms, mean_ms e throughput (chamadas por segundo).
+    """
+    latencies = np.asarray(latencies_ms, dtype=np.float64)
+    if not latencies.size:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    if elapsed_s is None:
+        elapsed_s = latencies.sum() / 1000.0
+    return {
+        "count": int(latencies.size),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "mean_ms": float(latencies.mean()),
+        "throughput": float(latencies.size / elapsed_s) if elapsed_s > 0 else None,
+    }
+
+
+def rss_peak_mb():
+    """Pico de memória residente do processo até agora (ru_maxrss está em KB no Linux)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def measure(call, inputs, warmup=2, memory_samples=3):
+    """
+    Mede `call(item)` para cada item de `inputs`.
+
+    As primeiras `warmup` chamadas não entram na conta. O pico de alocação é medido à parte,
+    com o tracemalloc ligado só em `memory_samples` chamadas, para não distorcer a latência;
+    ele cobre os arrays NumPy e objetos Python, mas não a memória interna do OpenCV.
+
+    Returns:
+        dict: Resumo de `latency_summary` mais alloc_peak_kb e rss_peak_mb.
+    """
+    inputs = list(inputs)
+    for item in inputs[:warmup]:
+        call(item)
+    latencies = []
+    started = time.perf_counter()
+    for item in inputs:
+        call_started = time.perf_counter()
+        call(item)
+        latencies.append((time.perf_counter() - call_started) * 1000.0)
+    result = latency_summary(latencies, time.perf_counter() - started)
+
+    if memory_samples and inputs:
+        tracemalloc.start()
+        try:
+            peak = 0
+            for item in inputs[:memory_samples]:
+                tracemalloc.reset_peak()
+                call(item)
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+        result["alloc_peak_kb"] = peak / 1024.0
+    result["rss_peak_mb"] = rss_peak_mb()
+    return result
+
+
+def synthetic_image(rng, width=640, height=480, shapes=25):
+    """Imagem BGR com elipses coloridas e ruído, com textura suficiente para o SIFT."""
+    image = np.full((height, width, 3), rng.integers(0, 255, 3), dtype=np.uint8)
+    for _ in range(shapes):
+        center = tuple(int(v) for v in rng.integers(0, (width, height)))
+        axes = tuple(int(v) for v in rng.integers(max(4, width // 64), max(8, width // 5), 2))
+        color = tuple(int(v) for v in rng.integers(0, 255, 3))
+        cv2.ellipse(image, center, axes, float(rng.uniform(0, 180)), 0, 360, color, -1)
+    noise = rng.normal(0, 12, image.shape)
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+def synthetic_jpegs(count, seed=42, width=640, height=480, quality=92):
+    """Lista de `count` imagens sintéticas codificadas em JPEG (bytes)."""
+    rng = np.random.default_rng(seed)
+    return [
+        cv2.imencode(".jpg", synthetic_image(rng, width, height), [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+        for _ in range(count)
+    ]
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance=0.10):
+    """
+    Compara cada métrica com a mesma métrica da referência.
+
+    Returns:
+        list: Dicts {name, metric, baseline, current, change}, com `change` relativo
+              (positivo = pior), para as métricas que pioraram além de `tolerance`.
+    """
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if not reference:
+            continue
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            before, after = reference.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            if change > tolerance:
+                regressions.append({
+                    "name": name, "metric": metric, "baseline": before, "current": after, "change": change,
+                })
+    return regressions
+
+
+def print_results(results):
+    for name, result in results.items():
+        if not result.get("count"):
+            print(f"{name:>32}  {result.get('skipped', 'sem amostras')}")
+            continue
+        line = (
+            f"{name:>32}  p50={result['p50_ms']:8.2f}ms p95={result['p95_ms']:8.2f}ms "
+            f"p99={result['p99_ms']:8.2f}ms {result['throughput'] or 0:9.1f}/s"
+        )
+        if "alloc_peak_kb" in result:
+            line += f" alloc={result['alloc_peak_kb']:9.1f}KB"
+        if "accuracy" in result:
+            line += f" acerto={result['accuracy']:.3f}"
+        print(line)
+
+
+def finish(suite, args, results):
+    """
+    Imprime os resultados, grava o JSON (`--json`) e compara com a referência
+    (`--baseline`). Encerra com código 1 se houver regressão e `--fail-on-regression`.
+    """
+    print_results(results)
+    report = {"suite": suite, "params": vars(args), "environment": environment(), "results": results}
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        report["baseline"] = {"path": args.baseline, "environment": baseline.get("environment")}
+        report["regressions"] = regressions
+        if regressions:
+            print(f"Regressões em relação a {args.baseline} (tolerância {args.tolerance:.0%}):")
+            for regression in regressions:
+                print(
+                    f"  {regression['name']} {regression['metric']}: {regression['baseline']:.3f} -> "
+                    f"{regression['current']:.3f} ({regression['change']:+.0%})"
+                )
+        else:
+            print(f"Sem regressões em relação a {args.baseline} (tolerância {args.tolerance:.0%}).")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+    return report
@@ -0,0 +1,24 @@
+# gunicorn.conf.py
+"""
+Configuração do gunicorn, lida automaticamente a partir do diretório do app.
+
+SERVING_MODE=sync (padrão): workers sync, uma requisição por vez em cada worker.
+SERVING_MODE=gevent: worker gevent com até WORKER_CONNECTIONS requisições simultâneas
+por worker; download de imagens e Postgres ficam cooperativos e o trabalho de CPU vai
+para o pool limitado de `serving.CPUExecutor` (CPU_WORKERS threads).
+"""
+import os
+
+serving_mode = os.getenv("SERVING_MODE", "sync").lower()
+
+if serving_mode == "gevent":
+    worker_class = "gevent"
+    worker_connections = int(os.getenv("WORKER_CONNECTIONS", "1000"))
+
+    def post_fork(server, worker):
+        # O psycopg2 precisa do callback cooperativo antes da primeira conexão do worker
+        from serving import patch_psycopg
+
+        patch_psycopg()
+elif serving_mode != "sync":
+    raise ValueError(f"SERVING_MODE inválido: '{serving_mode}'. Use 'sync' ou 'gevent'.")
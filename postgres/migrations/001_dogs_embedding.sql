@@ -0,0 +1,42 @@
+-- Migração: coluna pgvector na tabela dogs para busca de vizinhos mais próximos no Postgres
+--
+-- O vetor original (feature_vector float8[]) é mantido; a coluna embedding é uma cópia
+-- em formato vector(128) sincronizada por trigger, assim o código de cadastro não muda.
+-- Requer pgvector >= 0.5.0 para o índice HNSW.
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+ALTER TABLE public.dogs ADD COLUMN IF NOT EXISTS embedding vector(128);
+
+-- Mantém embedding em sincronia com feature_vector em todo INSERT/UPDATE
+CREATE OR REPLACE FUNCTION dogs_sync_embedding() RETURNS trigger AS $$
+BEGIN
+    IF array_length(NEW.feature_vector, 1) = 128 THEN
+        NEW.embedding := NEW.feature_vector::vector(128);
+    ELSE
+        NEW.embedding := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS dogs_sync_embedding_trg ON public.dogs;
+CREATE TRIGGER dogs_sync_embedding_trg
+    BEFORE INSERT OR UPDATE OF feature_vector ON public.dogs
+    FOR EACH ROW EXECUTE FUNCTION dogs_sync_embedding();
+
+-- Preenche os cães já cadastrados
+UPDATE public.dogs
+   SET embedding = feature_vector::vector(128)
+ WHERE embedding IS NULL
+   AND array_length(feature_vector, 1) = 128;
+
+-- Índices HNSW para distância Euclidiana (<->) e de cosseno (<=>)
+CREATE INDEX IF NOT EXISTS dogs_embedding_l2_idx
+    ON public.dogs USING hnsw (embedding vector_l2_ops);
+CREATE INDEX IF NOT EXISTS dogs_embedding_cosine_idx
+    ON public.dogs USING hnsw (embedding vector_cosine_ops);
+
+-- Alternativa para pgvector < 0.5.0 (criar após a carga dos dados):
+-- CREATE INDEX dogs_embedding_l2_idx ON public.dogs USING ivfflat (embedding vector_l2_ops) WITH (lists = 100);
+-- CREATE INDEX dogs_embedding_cosine_idx ON public.dogs USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
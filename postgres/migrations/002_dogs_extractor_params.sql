@@ -0,0 +1,10 @@
+-- Migração: registra com quais parâmetros de extração cada vetor foi gerado
+--
+-- extractor_params guarda FeatureExtractionManager.params() (normalização de resolução,
+-- estratégias e seus parâmetros, versão do OpenCV). Vetores gerados com parâmetros
+-- diferentes não são comparáveis; a coluna permite localizar e recadastrar esses cães.
+
+ALTER TABLE public.dogs ADD COLUMN IF NOT EXISTS extractor_params jsonb;
+
+CREATE INDEX IF NOT EXISTS dogs_extractor_signature_idx
+    ON public.dogs ((extractor_params ->> 'signature'));
@@ -0,0 +1,23 @@
+-- Migração: fila persistente de cadastros assíncronos (/v3/add_dog, GET /jobs/<id>)
+--
+-- Os workers de cada instância retiram jobs com FOR UPDATE SKIP LOCKED, então várias
+-- instâncias podem consumir a mesma fila. Jobs 'running' que ficam parados (instância
+-- reiniciada no meio do processamento) voltam para 'queued' após ENROLL_JOB_STALE_SECONDS.
+
+CREATE TABLE IF NOT EXISTS public.enrollment_jobs (
+    job_id BIGSERIAL PRIMARY KEY,
+    status VARCHAR(16) NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'done', 'failed')),
+    dog_name VARCHAR(255),
+    image_url TEXT NOT NULL,
+    dog_id INT REFERENCES public.dogs(dog_id) ON DELETE SET NULL,
+    error TEXT,
+    attempts INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Acelera a retirada do próximo job pendente e a recuperação de jobs parados
+CREATE INDEX IF NOT EXISTS enrollment_jobs_pending_idx
+    ON public.enrollment_jobs (job_id) WHERE status IN ('queued', 'running');
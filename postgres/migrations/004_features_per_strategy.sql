@@ -0,0 +1,29 @@
+-- Migração: um vetor por estratégia de extração na tabela features
+--
+-- Cada cão passa a ter uma linha por descriptor_type (SIFT, HOG, MeanColor, ...). A
+-- identificação compara cada tipo separadamente e combina as pontuações com pesos, então
+-- incluir ou repesar uma estratégia não exige recalcular as demais nem um vetor concatenado.
+-- dogs.feature_vector continua com o vetor da estratégia principal.
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- O índice ivfflat do init.sql exige dimensão fixa; cada estratégia tem a sua
+DROP INDEX IF EXISTS features_vector_idx;
+ALTER TABLE public.features ALTER COLUMN feature_vector TYPE vector;
+
+ALTER TABLE public.features ADD COLUMN IF NOT EXISTS image_url varchar(255);
+ALTER TABLE public.features ADD COLUMN IF NOT EXISTS params jsonb;
+
+-- Uma linha por cão e estratégia (os cadastros fazem upsert nesta chave)
+CREATE UNIQUE INDEX IF NOT EXISTS features_dog_descriptor_key
+    ON public.features (dog_id, descriptor_type);
+
+-- Os cães já cadastrados têm apenas o vetor SIFT em dogs.feature_vector
+INSERT INTO public.features (dog_id, descriptor_type, feature_vector, image_url, params)
+SELECT dog_id, 'SIFT', feature_vector::vector, image_path, extractor_params
+  FROM public.dogs
+ WHERE feature_vector IS NOT NULL
+ON CONFLICT (dog_id, descriptor_type) DO NOTHING;
+
+-- A comparação por estratégia roda em memória (gallery.FeatureGalleryCache); a migração 011
+-- deixa de gravar feature_vector nos cadastros novos, então não há índice pgvector aqui.
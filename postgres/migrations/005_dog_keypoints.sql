@@ -0,0 +1,14 @@
+-- Migração: keypoints SIFT brutos por cão, para a verificação geométrica (re-ranking)
+--
+-- points: N x 2 float32 (x, y na imagem normalizada); descriptors: N x 128 uint8.
+-- Ambos gravados como bytes contíguos (np.tobytes) e lidos com np.frombuffer.
+-- Cães cadastrados antes desta migração: python src/rerank.py backfill
+
+CREATE TABLE IF NOT EXISTS public.dog_keypoints (
+    dog_id integer PRIMARY KEY REFERENCES public.dogs (dog_id) ON DELETE CASCADE,
+    keypoint_count integer NOT NULL,
+    points bytea NOT NULL,
+    descriptors bytea NOT NULL,
+    params jsonb,
+    created_at timestamp DEFAULT CURRENT_TIMESTAMP
+);
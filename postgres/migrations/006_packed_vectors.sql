@@ -0,0 +1,44 @@
+-- Migração: cópia compacta (float16 em bytea) dos vetores de características
+--
+-- float8[] ocupa 8 bytes por valor e chega ao Python como uma lista de floats; a coluna
+-- bytea guarda 2 bytes por valor e é lida direto para NumPy com np.frombuffer (ver
+-- src/vector_codec.py). Os cadastros novos deixam de gravar o vetor original:
+-- dogs.feature_vector na migração 010 e features.feature_vector na 011.
+-- Linhas já cadastradas: python src/vector_codec.py backfill (até lá a leitura usa o formato antigo).
+
+ALTER TABLE public.dogs ADD COLUMN IF NOT EXISTS feature_packed bytea;
+ALTER TABLE public.features ADD COLUMN IF NOT EXISTS vector_packed bytea;
+
+-- Alterações feitas direto no vetor original (sem regravar a cópia) invalidam a cópia
+-- compacta; a leitura volta ao vetor original até o próximo backfill. Um UPDATE que
+-- regrava o mesmo vetor não invalida nada.
+CREATE OR REPLACE FUNCTION dogs_reset_feature_packed() RETURNS trigger AS $$
+BEGIN
+    IF NEW.feature_vector IS DISTINCT FROM OLD.feature_vector
+       AND NEW.feature_packed IS NOT DISTINCT FROM OLD.feature_packed THEN
+        NEW.feature_packed := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS dogs_reset_feature_packed_trg ON public.dogs;
+CREATE TRIGGER dogs_reset_feature_packed_trg
+    BEFORE UPDATE OF feature_vector ON public.dogs
+    FOR EACH ROW EXECUTE FUNCTION dogs_reset_feature_packed();
+
+CREATE OR REPLACE FUNCTION features_reset_vector_packed() RETURNS trigger AS $$
+BEGIN
+    IF NEW.feature_vector IS DISTINCT FROM OLD.feature_vector
+       AND NEW.vector_packed IS NOT DISTINCT FROM OLD.vector_packed THEN
+        NEW.vector_packed := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS features_reset_vector_packed_trg ON public.features;
+CREATE TRIGGER features_reset_vector_packed_trg
+    BEFORE UPDATE OF feature_vector ON public.features
+    FOR EACH ROW EXECUTE FUNCTION features_reset_vector_packed();
+
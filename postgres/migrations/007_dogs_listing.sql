@@ -0,0 +1,18 @@
+-- Migração: índices da listagem de cães da página inicial (DB.list_dogs)
+--
+-- A listagem pagina por chave em (created_at, dog_id), dos mais recentes para os mais
+-- antigos, e filtra por trecho do nome com ILIKE. Todo cadastro já grava created_at;
+-- a coluna passa a ser NOT NULL para a comparação de tuplas da paginação valer em
+-- todas as linhas.
+
+UPDATE public.dogs SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL;
+ALTER TABLE public.dogs ALTER COLUMN created_at SET DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE public.dogs ALTER COLUMN created_at SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS dogs_listing_idx
+    ON public.dogs (created_at DESC, dog_id DESC);
+
+-- Busca por trecho do nome (ILIKE '%...%') com trigramas
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS dogs_name_trgm_idx
+    ON public.dogs USING gin (dog_name gin_trgm_ops);
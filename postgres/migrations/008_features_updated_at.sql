@@ -0,0 +1,28 @@
+-- Migração: marca de alteração nas linhas de `features`, usada pela atualização
+-- incremental das galerias por estratégia (gallery.FeatureGalleryCache)
+--
+-- Recadastrar uma estratégia atualiza a linha existente (ON CONFLICT ... DO UPDATE), que
+-- mantém o mesmo `id`; uma busca por `id` acima da marca d'água nunca veria o vetor novo.
+-- `updated_at` muda em todo INSERT e sempre que o vetor muda de fato. Regravar o mesmo
+-- vetor (por exemplo, vindo do cache de vetores) não conta como alteração.
+
+ALTER TABLE public.features ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now();
+
+CREATE OR REPLACE FUNCTION features_touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    -- clock_timestamp(), e não now(): em transações longas, now() seria o início da transação
+    IF TG_OP = 'INSERT' OR NEW.feature_vector IS DISTINCT FROM OLD.feature_vector THEN
+        NEW.updated_at := clock_timestamp();
+    ELSE
+        NEW.updated_at := OLD.updated_at;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS features_touch_updated_at_trg ON public.features;
+CREATE TRIGGER features_touch_updated_at_trg
+    BEFORE INSERT OR UPDATE ON public.features
+    FOR EACH ROW EXECUTE FUNCTION features_touch_updated_at();
+
+CREATE INDEX IF NOT EXISTS features_updated_at_idx ON public.features (updated_at);
@@ -0,0 +1,8 @@
+-- Migração: reserva dos jobs de cadastro (DB.claim_enrollment_job)
+--
+-- Cada retirada da fila grava um claim_token novo. A conclusão e a falha só valem para o
+-- worker que ainda detém o token de um job 'running': se o job ficou parado, voltou para
+-- a fila e foi retirado por outro worker, o primeiro não consegue mais concluí-lo (o
+-- cadastro dele é desfeito) nem marcá-lo como falho.
+
+ALTER TABLE public.enrollment_jobs ADD COLUMN IF NOT EXISTS claim_token UUID;
@@ -0,0 +1,25 @@
+-- Migração: dogs.feature_vector (float8[]) deixa de ser gravado nos cadastros novos
+--
+-- O vetor do cão passa a ficar só em feature_packed (float16, migração 006) e em
+-- embedding (pgvector, migração 001), que o cadastro grava direto. feature_vector só é
+-- preenchido quando o vetor não cabe em float16, e a leitura (src/vector_codec.py) usa
+-- a coluna compacta sempre que ela existe. Linhas antigas mantêm o float8[] até rodar
+-- `python src/vector_codec.py backfill`; a coluna pode ser removida quando nenhuma linha
+-- tiver mais feature_packed nulo.
+
+ALTER TABLE public.dogs ALTER COLUMN feature_vector DROP NOT NULL;
+
+-- Sem feature_vector, o embedding gravado pelo cadastro é mantido
+CREATE OR REPLACE FUNCTION dogs_sync_embedding() RETURNS trigger AS $$
+BEGIN
+    IF NEW.feature_vector IS NULL THEN
+        RETURN NEW;
+    END IF;
+    IF array_length(NEW.feature_vector, 1) = 128 THEN
+        NEW.embedding := NEW.feature_vector::vector(128);
+    ELSE
+        NEW.embedding := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,50 @@
+-- Migração: features.feature_vector (pgvector) deixa de ser gravado nos cadastros novos
+--
+-- Nenhuma consulta busca em `features` pelo pgvector: as galerias por estratégia leem os
+-- vetores para a memória (gallery.FeatureGalleryCache). O vetor passa a ficar só em
+-- vector_packed (float16, migração 006); feature_vector só é preenchido quando o vetor
+-- não cabe em float16, e a leitura usa feature_vector::real[] nas linhas antigas.
+-- `python src/vector_codec.py backfill` compacta as linhas antigas e apaga o original,
+-- aqui e em dogs.feature_vector (migração 010).
+
+ALTER TABLE public.features ALTER COLUMN feature_vector DROP NOT NULL;
+
+-- Com o original nulo, o vetor muda quando muda a cópia compacta. A compactação das linhas
+-- antigas também conta como alteração: as galerias recarregam essas linhas uma vez.
+CREATE OR REPLACE FUNCTION features_touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    -- clock_timestamp(), e não now(): em transações longas, now() seria o início da transação
+    IF TG_OP = 'INSERT'
+       OR NEW.vector_packed IS DISTINCT FROM OLD.vector_packed
+       OR (NEW.feature_vector IS NOT NULL AND NEW.feature_vector IS DISTINCT FROM OLD.feature_vector) THEN
+        NEW.updated_at := clock_timestamp();
+    ELSE
+        NEW.updated_at := OLD.updated_at;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Apagar o original (cadastro novo ou backfill) não invalida a cópia compacta; só um
+-- vetor original novo gravado sem a cópia a invalida
+CREATE OR REPLACE FUNCTION dogs_reset_feature_packed() RETURNS trigger AS $$
+BEGIN
+    IF NEW.feature_vector IS NOT NULL
+       AND NEW.feature_vector IS DISTINCT FROM OLD.feature_vector
+       AND NEW.feature_packed IS NOT DISTINCT FROM OLD.feature_packed THEN
+        NEW.feature_packed := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION features_reset_vector_packed() RETURNS trigger AS $$
+BEGIN
+    IF NEW.feature_vector IS NOT NULL
+       AND NEW.feature_vector IS DISTINCT FROM OLD.feature_vector
+       AND NEW.vector_packed IS NOT DISTINCT FROM OLD.vector_packed THEN
+        NEW.vector_packed := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
@@ -1,20 +1,31 @@
-from flask import Flask, render_template, jsonify, request
+from startup import run_prewarm, startup_report
+from serving import CPUExecutor, gevent_active, patch_psycopg
+from flask import Flask, Response, render_template, jsonify, request, g
 import logging
 import os
-from flasgger import Swagger, swag_from
 import sys
+import time
+import metrics
 from config import Config
-from models import db, Dog
 from database import DB
 from config import config
-from flask_migrate import Migrate
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 from strategies.sift_extractor import SIFTExtractor
 from similarity_metrics import EuclideanSimilarity, CosineSimilarity
 from feature_extraction_manager import FeatureExtractionManager
+from gallery import GalleryCache, FeatureGalleryCache, InvertedFileIndex
+from pq_gallery import PQGalleryCache, ProductQuantizer
+from gallery_snapshot import SnapshotGalleryCache
+from jobs import EnrollmentQueue
+from feature_cache import FeatureCache
+from image_data import load_image_bytes
+from rerank import GeometricVerifier, KeypointCache, pack_keypoints
+from thumbnails import ThumbnailCache, make_thumbnail
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+startup_report.checkpoint("imports")
+startup_report.budget_ms = config.STARTUP_BUDGET_MS
+
 # Configura o logging
 logging.basicConfig(level=logging.INFO)
 
@@ -23,27 +34,499 @@ app.config.from_object(Config)
 
 app.secret_key = "sua_chave_secreta"
 
-# Configuração do Swagger
-swagger = Swagger(app)
+# Configuração do Swagger (desligada por padrão com LAZY_STARTUP; ver SWAGGER_ENABLED)
+if config.SWAGGER_ENABLED:
+    from flasgger import Swagger, swag_from
+    swagger = Swagger(app)
+else:
+    def swag_from(*args, **kwargs):
+        return lambda view: view
+
+db = None
+migrate = None
+
+def init_database_tools():
+    """
+    SQLAlchemy (modelos) e Flask-Migrate, usados apenas pelos comandos `flask db` e por
+    `db.create_all()`; as rotas acessam o banco pela classe `DB`.
+    """
+    global db, migrate
+    if migrate is None:
+        from flask_migrate import Migrate
+        from models import db as models_db
+        db = models_db
+        db.init_app(app)
+        migrate = Migrate(app, db)
+    return db
+
+# Na inicialização rápida só são carregados quando o app roda pela linha de comando do Flask
+if not config.LAZY_STARTUP or os.environ.get("FLASK_RUN_FROM_CLI"):
+    init_database_tools()
+
+# Modo de atendimento gevent (SERVING_MODE=gevent, ver serving.py): psycopg2 cooperativo e
+# trabalho de CPU em um pool limitado de threads nativas; no modo sync, roda na própria thread
+if gevent_active():
+    patch_psycopg()
+cpu_executor = CPUExecutor(
+    config.CPU_WORKERS,
+    max_pending=config.CPU_MAX_PENDING or None,
+    submit_timeout=config.CPU_SUBMIT_TIMEOUT,
+)
+cpu_executor.start()
+
+database = DB(config, lazy=config.LAZY_STARTUP)
+startup_report.checkpoint("app")
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.request_timings = metrics.begin_request()
+
+@app.after_request
+def record_request_timings(response):
+    """Histograma por endpoint em /metrics e tempo de cada etapa no cabeçalho Server-Timing."""
+    token = g.pop("request_timings", None)
+    if token is None:
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    timings = metrics.end_request(token)
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    metrics.HTTP_REQUEST_DURATION.observe(
+        elapsed, endpoint=endpoint, method=request.method, status=response.status_code
+    )
+    if config.SERVER_TIMING:
+        response.headers["Server-Timing"] = metrics.server_timing(timings, elapsed)
+    return response
+
+# Galeria de vetores cadastrados, mantida em memória neste processo ou, com
+# GALLERY_SNAPSHOT_DIR, mapeada de um snapshot em disco compartilhado pelos workers
+if config.GALLERY_SNAPSHOT_DIR:
+    gallery_cache = SnapshotGalleryCache(
+        database,
+        config.GALLERY_SNAPSHOT_DIR,
+        refresh_interval=config.GALLERY_REFRESH_SECONDS,
+        rebuild_interval=config.GALLERY_SNAPSHOT_REBUILD_SECONDS,
+        refresh_window=config.GALLERY_REFRESH_WINDOW,
+        delta_max=config.GALLERY_SNAPSHOT_DELTA_MAX,
+    )
+else:
+    gallery_cache = GalleryCache(
+        database, refresh_interval=config.GALLERY_REFRESH_SECONDS, refresh_window=config.GALLERY_REFRESH_WINDOW
+    )
+
+SEARCH_BACKENDS = ("memory", "pgvector")
+
+# Galeria comprimida (quantização de produto), para galerias grandes demais para a matriz
+# float32; os sobreviventes da busca aproximada são reordenados pelo vetor exato do banco
+pq_gallery_cache = None
+if config.PQ_PATH:
+    pq_gallery_cache = PQGalleryCache(
+        database, ProductQuantizer.load(config.PQ_PATH), refresh_interval=config.GALLERY_REFRESH_SECONDS,
+        refresh_window=config.GALLERY_REFRESH_WINDOW,
+    )
+    SEARCH_BACKENDS += ("pq",)
+
+_codebook = None
+
+def load_codebook():
+    """Codebook das estratégias VLAD/BoVW, carregado uma vez de CODEBOOK_PATH."""
+    global _codebook
+    if _codebook is None:
+        if not config.CODEBOOK_PATH:
+            raise ValueError("CODEBOOK_PATH não configurado; treine com: python src/codebook.py train")
+        from codebook import VisualCodebook
+        _codebook = VisualCodebook.load(config.CODEBOOK_PATH)
+    return _codebook
+
+def build_strategy(name):
+    """Cria a estratégia de extração pelo nome (o mesmo gravado em `features.descriptor_type`)."""
+    if name == "SIFT":
+        return SIFTExtractor(nfeatures=config.SIFT_NFEATURES)
+    if name == "HOG":
+        from strategies.hog_extractor import HOGExtractor
+        return HOGExtractor()
+    if name == "MeanColor":
+        from strategies.mean_color_extractor import MeanColorExtractor
+        return MeanColorExtractor()
+    if name == "Texture":
+        from strategies.texture_extractor import TextureExtractor
+        return TextureExtractor()
+    if name in ("VLAD", "BoVW"):
+        from strategies.vlad_extractor import VLADExtractor
+        return VLADExtractor(load_codebook(), encoding=name.lower(), nfeatures=config.SIFT_NFEATURES)
+    raise ValueError(f"Estratégia de extração desconhecida: '{name}'.")
+
+def build_extraction_manager():
+    """
+    Cria o gerenciador de extração com as estratégias e a etapa de normalização
+    configuradas. Cadastro e identificação usam sempre esta mesma configuração.
+    """
+    return FeatureExtractionManager(
+        [build_strategy(name.strip()) for name in config.EXTRACTION_STRATEGIES.split(",") if name.strip()],
+        max_side=config.IMAGE_MAX_SIDE,
+        reduced_decode=config.IMAGE_REDUCED_DECODE,
+        # No modo gevent o paralelismo vem do executor de CPU, entre requisições
+        strategy_workers=0 if cpu_executor.offloading else config.EXTRACTION_STRATEGY_WORKERS,
+    )
+
+# Gerenciador de extração único do processo, criado na inicialização e pré-aquecido na
+# etapa de prontidão (ver `prewarm_steps`)
+extraction_manager = build_extraction_manager()
+
+# Vetores já extraídos são reaproveitados quando a mesma foto volta (retentativas, reenvios)
+if config.FEATURE_CACHE_ENTRIES > 0:
+    extraction_manager.set_feature_cache(FeatureCache(
+        max_entries=config.FEATURE_CACHE_ENTRIES,
+        disk_dir=config.FEATURE_CACHE_DIR or None,
+        disk_max_bytes=config.FEATURE_CACHE_DISK_MAX_BYTES,
+    ))
+
+# Opcionalmente, a extração roda em um pool de processos pré-aquecidos (todos os núcleos)
+if config.EXTRACTION_PROCESSES > 0 and cpu_executor.offloading:
+    logging.warning("EXTRACTION_PROCESSES é ignorado no modo gevent; a extração usa o executor de CPU (CPU_WORKERS).")
+elif config.EXTRACTION_PROCESSES > 0:
+    from extraction_engine import ProcessExtractionEngine
+
+    extraction_manager.set_engine(ProcessExtractionEngine(
+        extraction_manager,
+        processes=config.EXTRACTION_PROCESSES,
+        max_pending=config.EXTRACTION_MAX_PENDING or None,
+        submit_timeout=config.EXTRACTION_SUBMIT_TIMEOUT,
+    ))
+
+# Galerias por estratégia (tabela `features`), usadas na identificação com fusão de pontuações;
+# VLAD/BoVW usam índice invertido por palavra visual
+feature_gallery_cache = FeatureGalleryCache(
+    database,
+    refresh_interval=config.GALLERY_REFRESH_SECONDS,
+    refresh_slack=config.GALLERY_REFRESH_SLACK_SECONDS,
+    index_factories={
+        name: (lambda: InvertedFileIndex(load_codebook().n_words, probe=config.IVF_PROBE or None))
+        for name in extraction_manager.strategy_names() if name in ("VLAD", "BoVW")
+    },
+)
+
+# A primeira estratégia é a principal: o seu vetor vai para dogs.feature_vector e é o usado
+# pelas rotas v1-v3; as demais só existem na tabela `features`
+PRIMARY_STRATEGY = extraction_manager.strategy_names()[0]
 
-migrate = Migrate(app, db)
+def parse_weights(value):
+    """Converte 'SIFT=1.0,HOG=0.5' em {'SIFT': 1.0, 'HOG': 0.5}."""
+    weights = {}
+    for item in value.split(","):
+        if item.strip():
+            name, _, weight = item.partition("=")
+            weights[name.strip()] = float(weight)
+    return weights
 
-db.init_app(app)
+# Pesos padrão da fusão; sem configuração, todas as estratégias pesam igual
+FUSION_WEIGHTS = parse_weights(config.FUSION_WEIGHTS) or {name: 1.0 for name in extraction_manager.strategy_names()}
+
+def extractor_record():
+    """Registro dos parâmetros de extração gravado junto a cada vetor cadastrado."""
+    return dict(extraction_manager.params(), signature=extraction_manager.signature())
+
+def extract_strategies(image_url, names=None):
+    """
+    Vetores das estratégias `names` (padrão: todas). O download acontece na thread (ou
+    greenlet) da requisição; a decodificação e a extração, no executor de CPU.
+    """
+    image_bytes = load_image_bytes(image_url)
+    return cpu_executor.run(extraction_manager.extract_features_by_strategy, image_bytes, names=names)
+
+def extract_primary(image_url):
+    """Vetor da estratégia principal, comparável com dogs.feature_vector."""
+    return extract_strategies(image_url, names=[PRIMARY_STRATEGY])[PRIMARY_STRATEGY]
+
+# Re-ranking geométrico: keypoints brutos gravados no cadastro e comparados só com a lista
+# curta de candidatos da busca pelo vetor global
+geometric_verifier = GeometricVerifier(
+    SIFTExtractor(nfeatures=config.SIFT_NFEATURES),
+    max_keypoints=config.RERANK_MAX_KEYPOINTS,
+    min_inliers=config.RERANK_MIN_INLIERS,
+    workers=0 if cpu_executor.offloading else config.RERANK_WORKERS,
+)
+keypoint_cache = KeypointCache(database, max_entries=config.RERANK_CACHE_ENTRIES)
+
+def describe_for_enrollment(image):
+    """Parte de CPU do cadastro: vetores de todas as estratégias e keypoints compactados."""
+    strategy_features = extraction_manager.extract_features_by_strategy(image)
+    keypoints = None
+    if config.RERANK_MAX_KEYPOINTS > 0:
+        described = geometric_verifier.describe(image)
+        keypoints = pack_keypoints(*described) if described is not None else None
+    return strategy_features, keypoints
+
+def extract_for_enrollment(image_url):
+    """
+    Extrai tudo o que o cadastro grava, decodificando a imagem uma única vez (a detecção
+    SIFT é compartilhada entre a estratégia e os keypoints do re-ranking).
+
+    Returns:
+        tuple: (vetor da estratégia principal, dict com strategy_features, strategy_params,
+                keypoints e keypoint_params, no formato aceito por `DB.insert_dog`).
+    """
+    image = extraction_manager.load_image(load_image_bytes(image_url))
+    strategy_features, keypoints = cpu_executor.run(describe_for_enrollment, image)
+    return strategy_features[PRIMARY_STRATEGY], {
+        "strategy_features": strategy_features,
+        "strategy_params": extraction_manager.strategy_records(),
+        "keypoints": keypoints,
+        "keypoint_params": geometric_verifier.params,
+    }
+
+def extract_many_for_enrollment(image_urls, max_workers):
+    """`extract_for_enrollment` em paralelo; para cada URL, o resultado ou a exceção ocorrida."""
+    def extract_one(image_url):
+        try:
+            return extract_for_enrollment(image_url)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(extract_one, image_urls))
+
+def on_enrolled(dog_id, feature_vector):
+    """Atualiza as galerias em memória após um cadastro (síncrono, assíncrono ou em lote)."""
+    on_enrolled_many([(dog_id, feature_vector)])
+
+def on_enrolled_many(enrolled):
+    """
+    Versão em lote de `on_enrolled`: acrescenta cada cão às galerias e busca os vetores por
+    estratégia uma única vez no fim.
+
+    Args:
+        enrolled (list): Tuplas (dog_id, feature_vector) dos cães cadastrados.
+    """
+    for dog_id, feature_vector in enrolled:
+        gallery_cache.add(dog_id, feature_vector)
+        if pq_gallery_cache is not None:
+            pq_gallery_cache.add(dog_id, feature_vector)
+    if enrolled:
+        feature_gallery_cache.refresh()
+
+# Fila de cadastros assíncronos: os jobs ficam no Postgres e são processados em segundo plano
+enrollment_queue = EnrollmentQueue(
+    database,
+    extract=extract_for_enrollment,
+    extractor_params=extractor_record,
+    on_enrolled=on_enrolled,
+    workers=config.ENROLL_QUEUE_WORKERS,
+    poll_interval=config.ENROLL_QUEUE_POLL_SECONDS,
+    max_attempts=config.ENROLL_JOB_MAX_ATTEMPTS,
+    stale_seconds=config.ENROLL_JOB_STALE_SECONDS,
+)
+if config.ENROLL_QUEUE_WORKERS > 0:
+    enrollment_queue.start()
+
+startup_report.checkpoint("services")
+
+# Valores lidos no momento da coleta de /metrics, sem carregar as galerias
+metrics.GALLERY_SIZE.set_function(gallery_cache.size, gallery="memory")
+if pq_gallery_cache is not None:
+    metrics.GALLERY_SIZE.set_function(pq_gallery_cache.size, gallery="pq")
+for _strategy_name in extraction_manager.strategy_names():
+    metrics.GALLERY_SIZE.set_function(
+        lambda name=_strategy_name: feature_gallery_cache.sizes().get(name), gallery=f"strategy:{_strategy_name}"
+    )
+for _field in ("in_use", "max_connections", "checkouts", "waits", "timeouts", "reconnects"):
+    metrics.DB_POOL.set_function(lambda field=_field: database.pool_stats().get(field), field=_field)
+_cpu_executor_gauge = metrics.registry.gauge(
+    "idealpet_cpu_executor", "Executor de CPU do modo gevent (ver /v2/serving/stats).", ("field",)
+)
+for _field in ("workers", "max_pending", "in_flight", "rejected"):
+    _cpu_executor_gauge.set_function(lambda field=_field: cpu_executor.stats()[field], field=_field)
+
+def prewarm_steps():
+    """
+    Etapas da fase de prontidão: conexões com o banco, detectores e a galeria usada pelo
+    backend de identificação padrão, para a primeira requisição não pagar por elas.
+    """
+    steps = [("database", database.connect), ("extractors", extraction_manager.warmup)]
+    if extraction_manager.engine is not None:
+        steps.append(("extraction_engine", extraction_manager.engine.warmup))
+    if config.IDENTIFY_BACKEND == "memory":
+        steps.append(("gallery", gallery_cache.get))
+    elif config.IDENTIFY_BACKEND == "pq" and pq_gallery_cache is not None:
+        steps.append(("pq_gallery", pq_gallery_cache.get))
+    if len(extraction_manager.strategies) > 1:
+        steps.append(("feature_gallery", feature_gallery_cache.get))
+    return steps
 
-database = DB(config)
+# Com LAZY_STARTUP o pré-aquecimento roda em segundo plano e /readyz só responde OK ao final
+run_prewarm(prewarm_steps(), background=config.LAZY_STARTUP)
+
+def search_pq(feature_vector, metric, k, threshold=None):
+    """
+    Busca na galeria comprimida. Com PQ_SHORTLIST, os melhores pela pontuação aproximada
+    são reordenados pelo vetor exato: as duas etapas de CPU rodam no executor e a busca
+    dos vetores no banco fica fora dele, como no re-ranking geométrico, para não ocupar
+    uma thread de CPU esperando a rede.
+
+    Returns:
+        list: Tuplas (dog_id, pontuação). Para 'cosine' a pontuação é a similaridade.
+    """
+    gallery = pq_gallery_cache.get()
+    if config.PQ_SHORTLIST <= 0:
+        return cpu_executor.run(gallery.top_k, feature_vector, metric, k=k, threshold=threshold)
+    dog_ids = cpu_executor.run(gallery.shortlist_ids, feature_vector, metric, max(k, config.PQ_SHORTLIST))
+    if not dog_ids:
+        return []
+    rows = database.get_dog_vectors(dog_ids)
+    return cpu_executor.run(gallery.rescore, rows, feature_vector, metric, k=k, threshold=threshold)
+
+def find_closest_dog(feature_vector, metric, backend):
+    """
+    Encontra o cão mais próximo usando o backend de busca escolhido.
+
+    Args:
+        feature_vector (list): Vetor de características da imagem fornecida.
+        metric (str): 'euclidean' ou 'cosine'.
+        backend (str): 'memory' (galeria em cache), 'pgvector' (busca indexada no Postgres)
+                       ou 'pq' (galeria comprimida, se PQ_PATH estiver configurado).
+
+    Returns:
+        tuple: (dog_id, pontuação) ou (None, None). Para 'cosine' a pontuação é a similaridade.
+    """
+    with metrics.timer("match", f"{backend}.{metric}"):
+        if backend == "pgvector":
+            rows = database.search_nearest(feature_vector, metric, k=1)
+            if not rows:
+                return None, None
+            dog_id, distance = rows[0]
+            return dog_id, 1.0 - distance if metric == "cosine" else distance
+
+        # A galeria é obtida aqui (pode consultar o banco); a comparação vai para o executor de CPU
+        if backend == "pq":
+            best = search_pq(feature_vector, metric, k=1)
+            return best[0] if best else (None, None)
+
+        # Compara a imagem fornecida com todas as imagens salvas em uma única operação matricial
+        return cpu_executor.run(gallery_cache.get().closest, feature_vector, metric)
+
+def find_top_dogs(feature_vector, metric, k, threshold, backend):
+    """
+    Retorna os k cães mais próximos que passam no limiar, do melhor para o pior.
+
+    Args:
+        feature_vector (list): Vetor de características da imagem fornecida.
+        metric (str): 'euclidean' ou 'cosine'.
+        k (int): Quantidade máxima de candidatos.
+        threshold (float): Distância máxima ('euclidean') ou similaridade mínima ('cosine').
+        backend (str): 'memory', 'pgvector' ou 'pq'.
+
+    Returns:
+        list: Tuplas (dog_id, pontuação). Para 'cosine' a pontuação é a similaridade.
+    """
+    with metrics.timer("match", f"{backend}.{metric}"):
+        if backend == "pgvector":
+            max_distance = threshold
+            if metric == "cosine" and threshold is not None:
+                max_distance = 1.0 - threshold
+            rows = database.search_nearest(feature_vector, metric, k=k, max_distance=max_distance)
+            if metric == "cosine":
+                return [(dog_id, 1.0 - distance) for dog_id, distance in rows]
+            return list(rows)
+
+        if backend == "pq":
+            return search_pq(feature_vector, metric, k=k, threshold=threshold)
+
+        return cpu_executor.run(gallery_cache.get().top_k, feature_vector, metric, k=k, threshold=threshold)
+
+def match_confidence(candidates, metric):
+    """
+    Confiança do melhor candidato, pela separação em relação ao segundo colocado
+    (no estilo do teste de razão de Lowe): 1 - d1/d2, com d = distância.
+
+    Returns:
+        float: Valor entre 0 (empate) e 1 (sem concorrente dentro do limiar).
+    """
+    if len(candidates) < 2:
+        return 1.0
+    if metric == "cosine":
+        best, runner_up = 1.0 - candidates[0][1], 1.0 - candidates[1][1]
+    else:
+        best, runner_up = candidates[0][1], candidates[1][1]
+    if runner_up <= 0:
+        return 0.0
+    return max(0.0, min(1.0, 1.0 - best / runner_up))
 
 #  Default - Rota de abertura - tela principal - lista Cães cadastrados
 @app.route("/")
 def index():
+    """
+    Listagem dos cães (mais recentes primeiro), paginada por chave e sem os vetores.
+
+    Parâmetros de consulta: `q` (trecho do nome), `after` (cursor da página anterior,
+    devolvido como `next_cursor`) e `limit`.
+    """
     try:
-        dogs = database.fetch_dogs_from_database()  
-        if dogs:
-            return render_template('index.html', dogs=dogs)
-        else:
-            return render_template('error.html', error="Nenhum registro encontrado na tabela 'dogs'.")
+        search = request.args.get('q', '').strip()
+        after = decode_list_cursor(request.args.get('after', ''))
+        limit = min(max(request.args.get('limit', config.DOG_LIST_PAGE_SIZE, type=int), 1), 200)
+        # Uma linha a mais indica se há próxima página
+        rows = database.list_dogs(limit=limit + 1, after=after, search=search or None)
+        dogs = [
+            {"dog_id": dog_id, "dog_name": dog_name, "has_image": bool(image_path), "created_at": created_at}
+            for dog_id, dog_name, image_path, created_at in rows[:limit]
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            last = dogs[-1]
+            next_cursor = encode_list_cursor(last["created_at"], last["dog_id"])
+        return render_template('index.html', dogs=dogs, search=search, limit=limit, next_cursor=next_cursor)
     except Exception as e:
         return render_template('error.html', error=str(e))
 
+def encode_list_cursor(created_at, dog_id):
+    """Cursor da listagem: data de cadastro e ID do último cão da página."""
+    return f"{created_at.isoformat()}_{dog_id}"
+
+def decode_list_cursor(cursor):
+    """(created_at, dog_id) do cursor, ou None se vazio ou inválido (volta à primeira página)."""
+    created_at, _, dog_id = cursor.rpartition('_')
+    try:
+        return datetime.fromisoformat(created_at), int(dog_id)
+    except ValueError:
+        return None
+
+thumbnail_cache = ThumbnailCache(
+    max_bytes=config.THUMBNAIL_CACHE_MAX_BYTES,
+    disk_dir=config.THUMBNAIL_CACHE_DIR or None,
+    disk_max_bytes=config.THUMBNAIL_CACHE_DISK_MAX_BYTES,
+)
+
+@app.route('/thumbnails/<int:dog_id>.jpg', methods=['GET'])
+def dog_thumbnail(dog_id):
+    """
+    Miniatura da foto do cão para a listagem. A imagem original é baixada (pelo cache de
+    imagens) só na primeira vez; depois a miniatura vem do cache, e o navegador revalida
+    pelo ETag.
+    """
+    image_path = database.get_dog_image_path(dog_id)
+    if not image_path:
+        return jsonify({"error": "Cão sem imagem cadastrada."}), 404
+
+    key = ThumbnailCache.key(image_path, config.THUMBNAIL_MAX_SIDE, config.THUMBNAIL_QUALITY)
+    etag = key[:32]
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        thumbnail = thumbnail_cache.get(key)
+        if thumbnail is None:
+            try:
+                thumbnail = cpu_executor.run(
+                    make_thumbnail, load_image_bytes(image_path), config.THUMBNAIL_MAX_SIDE, config.THUMBNAIL_QUALITY
+                )
+            except Exception as e:
+                return jsonify({"error": f"Falha ao gerar a miniatura: {str(e)}"}), 502
+            thumbnail_cache.put(key, thumbnail)
+        response = Response(thumbnail, mimetype='image/jpeg')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = config.THUMBNAIL_MAX_AGE
+    return response
+
 #
 #  Versao 1 
 #
@@ -58,17 +541,15 @@ def add_dog_v1():
         if not image_url:
             return jsonify({"error": "URL da imagem não fornecida"}), 400
 
-        # Inicializar o FeatureExtractionManager com a estratégia SIFT
-        manager = FeatureExtractionManager([SIFTExtractor()])
-
-        # Extração das características
-        feature_vector = manager.extract_features(image_url)
+        # Extração das características com o gerenciador compartilhado (todas as estratégias)
+        feature_vector, extras = extract_for_enrollment(image_url)
         
         if not feature_vector:
             return jsonify({"error": "Falha ao extrair características"}), 500
 
-        # Inserir no banco de dados
-        dog_id = database.insert_dog(dog_name, feature_vector, image_url)
+        # Inserir no banco de dados (dogs + features por estratégia + keypoints)
+        dog_id = database.insert_dog(dog_name, feature_vector, image_url, extractor_record(), **extras)
+        on_enrolled(dog_id, feature_vector)
         
         return jsonify({"message": "Cão e informações biomêtricas inseridas com sucesso", "dog_id": dog_id, "dog_name": dog_name}), 201
 
@@ -82,6 +563,7 @@ def identify_dog_v1():
     image_url = request.json.get('image_url')
     
     similarity_metric_name = request.json.get('similarity_metric', 'cosine')
+    search_backend = request.json.get('search_backend', config.IDENTIFY_BACKEND)
 
     if not image_url:
         return jsonify({"error": "image_url is required"}), 400
@@ -90,41 +572,21 @@ def identify_dog_v1():
     if similarity_metric_name not in similarity_metrics:
         return jsonify({"error": f"Invalid similarity metric: '{similarity_metric_name}'. Available metrics: {list(similarity_metrics.keys())}"}), 400
 
+    if search_backend not in SEARCH_BACKENDS:
+        return jsonify({"error": f"Invalid search backend: '{search_backend}'. Available backends: {list(SEARCH_BACKENDS)}"}), 400
+
     # Seleciona a métrica de similaridade
     similarity_metric = similarity_metrics[similarity_metric_name]
 
-    # Seleciona o extrator de características (usando SIFT no exemplo)
-    feature_extractor = SIFTExtractor()
-
-    # Cria o gerenciador de extração de características
-    extractor = FeatureExtractionManager(strategies=[feature_extractor])
-
     try:
         # Extrai as características da imagem fornecida
-        provided_image_features = extractor.extract_features(image_url)
-
-        # Recupera as características dos cachorros no banco de dados
-        saved_features_list = database.get_saved_features()  # Função que retorna as características salvas
-
-        closest_dog = None
-        closest_score = float('inf')  # Para comparação, menor distância significa maior similaridade
-
-        # Compara a imagem fornecida com as imagens salvas no banco de dados
-        for saved_dog_id, saved_features in saved_features_list:
-            # Garante que os vetores de características sejam compatíveis (convertendo em arrays 2D para o cálculo de similaridade)
-            provided_features_array = np.array(provided_image_features).reshape(1, -1)  # Redimensiona para um vetor 2D
-            saved_features_array = np.array(saved_features).reshape(1, -1)  # Redimensiona para um vetor 2D
-
-            # Calcula a similaridade entre as características usando a métrica de similaridade escolhida
-            similarity_score = similarity_metric(provided_features_array, saved_features_array)[0][0]
+        provided_image_features = extract_primary(image_url)
 
-            # Atualiza o cachorro mais próximo
-            if similarity_score < closest_score:  # Quanto menor o valor, maior a similaridade no caso do cosine
-                closest_score = similarity_score
-                closest_dog = saved_dog_id
+        # Busca o cão mais próximo na galeria em cache ou no índice pgvector
+        closest_dog, closest_score = find_closest_dog(provided_image_features, similarity_metric, search_backend)
 
         # Se encontrar um cachorro correspondente, retorna o ID e a pontuação de similaridade
-        if closest_dog:
+        if closest_dog is not None:
             return jsonify({"dog_id": closest_dog, "similarity_score": closest_score}), 200
         else:
             return jsonify({"message": "No matching dog found"}), 404
@@ -135,8 +597,10 @@ def identify_dog_v1():
 #  Versao 2 
 #
 
+# Métricas aceitas pela galeria: 'cosine' (maior similaridade) e 'euclidean' (menor distância)
 similarity_metrics = {
-    "cosine": cosine_similarity
+    "cosine": "cosine",
+    "euclidean": "euclidean"
 }
 
 @app.route('/v2/add_dog', methods=['POST'])
@@ -149,22 +613,94 @@ def add_dog_v2():
         if not image_url:
             return jsonify({"error": "URL da imagem não fornecida"}), 400
 
-        # Inicializar o FeatureExtractionManager com a estratégia SIFT
-        
-        manager = FeatureExtractionManager([SIFTExtractor()])
-
-        # Extração das características
-        feature_vector = manager.extract_features(image_url)
+        # Extração das características com o gerenciador compartilhado (todas as estratégias)
+        feature_vector, extras = extract_for_enrollment(image_url)
         if not feature_vector:
             return jsonify({"error": "Falha ao extrair características"}), 500
 
-        # Inserir no banco de dados
-        dog_id = database.insert_dog(dog_name, feature_vector, image_url)
+        # Inserir no banco de dados (dogs + features por estratégia + keypoints)
+        dog_id = database.insert_dog(dog_name, feature_vector, image_url, extractor_record(), **extras)
+        on_enrolled(dog_id, feature_vector)
         return jsonify({"message": "Cão e informações biomêtricas inseridas com sucesso", "dog_id": dog_id, "dog_name": dog_name}), 201
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/v2/add_dogs', methods=['POST'])
+def add_dogs_v2():
+    """
+    Cadastro em lote: baixa e extrai as imagens em paralelo e grava todos os cães
+    extraídos com sucesso em uma única transação.
+
+    Corpo JSON:
+        dogs (list): Itens {"dog_name": str, "image_url": str}.
+
+    Retorna o resultado por item, na ordem recebida: status 201 se todos foram cadastrados,
+    207 se algum falhou.
+    """
+    data = request.json or {}
+    items = data.get("dogs")
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Lista 'dogs' não fornecida"}), 400
+
+    if len(items) > config.BULK_ENROLL_MAX_ITEMS:
+        return jsonify({"error": f"Máximo de {config.BULK_ENROLL_MAX_ITEMS} cães por requisição"}), 400
+
+    results = [{"index": index} for index in range(len(items))]
+    pending = []
+    for index, item in enumerate(items):
+        image_url = item.get("image_url") if isinstance(item, dict) else None
+        if not image_url:
+            results[index].update(status="error", error="URL da imagem não fornecida")
+        else:
+            pending.append(index)
+
+    try:
+        extractions = extract_many_for_enrollment(
+            [items[index]["image_url"] for index in pending], max_workers=config.BULK_ENROLL_WORKERS
+        )
+
+        extracted = []
+        for index, extraction in zip(pending, extractions):
+            if isinstance(extraction, Exception):
+                results[index].update(status="error", error=str(extraction))
+            elif not extraction[0]:
+                results[index].update(status="error", error="Falha ao extrair características")
+            else:
+                extracted.append((index, extraction))
+
+        # Inserir todos no banco de dados em uma única transação
+        dog_ids = database.insert_dogs(
+            [
+                (items[index].get("dog_name"), feature_vector, items[index]["image_url"],
+                 extras["strategy_features"], extras["keypoints"])
+                for index, (feature_vector, extras) in extracted
+            ],
+            extractor_record(),
+            strategy_params=extraction_manager.strategy_records(),
+            keypoint_params=geometric_verifier.params,
+        )
+        for position, (index, _) in enumerate(extracted):
+            if dog_ids is None:
+                results[index].update(status="error", error="Falha ao inserir no banco de dados")
+            else:
+                results[index].update(status="ok", dog_id=dog_ids[position], dog_name=items[index].get("dog_name"))
+        if dog_ids:
+            on_enrolled_many([
+                (dog_id, feature_vector) for dog_id, (_, (feature_vector, _)) in zip(dog_ids, extracted)
+            ])
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    inserted = sum(1 for result in results if result["status"] == "ok")
+    return jsonify({
+        "inserted": inserted,
+        "failed": len(results) - inserted,
+        "results": results
+    }), 201 if inserted == len(results) else 207
+
 @app.route('/v2/identify_dog', methods=['POST'])
 def compare_dog_features_v2():
     """
@@ -173,48 +709,25 @@ def compare_dog_features_v2():
     """
     # Recebe a URL da imagem
     image_url = request.json.get('image_url')
+    search_backend = request.json.get('search_backend', config.IDENTIFY_BACKEND)
 
     if not image_url:
         return jsonify({"error": "image_url is required"}), 400
 
-    # Seleciona o extrator de características (usando SIFT no exemplo)
-    feature_extractor = SIFTExtractor()
-
-    # Cria o gerenciador de extração de características
-    extractor = FeatureExtractionManager(strategies=[feature_extractor])
+    if search_backend not in SEARCH_BACKENDS:
+        return jsonify({"error": f"Invalid search backend: '{search_backend}'. Available backends: {list(SEARCH_BACKENDS)}"}), 400
 
     try:
         # Extrai as características da imagem fornecida
-        provided_image_features = extractor.extract_features(image_url)
-
-        # Recupera as características dos cachorros no banco de dados
-        saved_features_list = database.get_saved_features()  # Função que retorna as características salvas
-
-        # Inicializa variáveis para rastrear o cachorro mais próximo
-        closest_dog_euclidean = None
-        closest_dog_cosine = None
-        closest_score_euclidean = float('inf')  # Para distância Euclidiana, menor é melhor
-        closest_score_cosine = -1.0  # Para similaridade do cosseno, maior é melhor
-
-        # Compara a imagem fornecida com as imagens salvas no banco de dados
-        for saved_dog_id, saved_features in saved_features_list:
-            # Converte os vetores de características em arrays numpy
-            provided_features_array = np.array(provided_image_features).flatten()
-            saved_features_array = np.array(saved_features).flatten()
-
-            # Calcula a distância Euclidiana
-            euclidean_distance = np.linalg.norm(provided_features_array - saved_features_array)
-            if euclidean_distance < closest_score_euclidean:
-                closest_score_euclidean = euclidean_distance
-                closest_dog_euclidean = saved_dog_id
-
-            # Calcula a similaridade do cosseno
-            cosine_similarity = np.dot(provided_features_array, saved_features_array) / (
-                np.linalg.norm(provided_features_array) * np.linalg.norm(saved_features_array)
-            )
-            if cosine_similarity > closest_score_cosine:
-                closest_score_cosine = cosine_similarity
-                closest_dog_cosine = saved_dog_id
+        provided_image_features = extract_primary(image_url)
+
+        # Busca o cão mais próximo por cada métrica na galeria em cache ou no índice pgvector
+        closest_dog_euclidean, closest_score_euclidean = find_closest_dog(provided_image_features, "euclidean", search_backend)
+        closest_dog_cosine, closest_score_cosine = find_closest_dog(provided_image_features, "cosine", search_backend)
+
+        if closest_dog_euclidean is None:
+            closest_score_euclidean = float('inf')  # Para distância Euclidiana, menor é melhor
+            closest_score_cosine = -1.0  # Para similaridade do cosseno, maior é melhor
 
         # Retorna os resultados
         return jsonify({
@@ -231,8 +744,291 @@ def compare_dog_features_v2():
     except Exception as e:
         return jsonify({"error": f"Failed to extract features: {str(e)}"}), 500
 
+#  Versao 3
+#
+
+MAX_TOP_K = 100
+
+@app.route('/v3/add_dog', methods=['POST'])
+def add_dog_v3():
+    """
+    Cadastro assíncrono: enfileira o cadastro e responde imediatamente com 202 e o ID do job.
+    O andamento é consultado em GET /jobs/<job_id>.
+    """
+    data = request.json or {}
+    image_url = data.get("image_url")
+    dog_name = data.get('dog_name')
+
+    if not image_url:
+        return jsonify({"error": "URL da imagem não fornecida"}), 400
+
+    job_id = enrollment_queue.submit(dog_name, image_url)
+    if job_id is None:
+        return jsonify({"error": "Falha ao enfileirar o cadastro"}), 500
+
+    return jsonify({"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}), 202
+
+@app.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """Estado de um cadastro assíncrono: queued, running, done (com dog_id) ou failed (com error)."""
+    job = enrollment_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job não encontrado"}), 404
+    return jsonify(job), 200
+
+@app.route('/v3/identify_dog', methods=['POST'])
+def identify_dog_v3():
+    """
+    Retorna uma lista ranqueada dos cães mais parecidos com a imagem fornecida.
+
+    Corpo JSON:
+        image_url (str): URL da imagem (obrigatório).
+        k (int): Quantidade máxima de candidatos (padrão 5, máximo 100).
+        similarity_metric (str): 'cosine' (padrão) ou 'euclidean'.
+        min_similarity (float): Similaridade mínima, apenas para 'cosine'.
+        max_distance (float): Distância máxima, apenas para 'euclidean'.
+        search_backend (str): 'memory', 'pgvector' ou 'pq'.
+        rerank (bool): Se True, verifica geometricamente (keypoints + RANSAC) os `shortlist`
+                       melhores candidatos e os reordena pela quantidade de inliers.
+        shortlist (int): Candidatos verificados no re-ranking (padrão RERANK_SHORTLIST).
+    """
+    data = request.json or {}
+    image_url = data.get('image_url')
+    similarity_metric_name = data.get('similarity_metric', 'cosine')
+    search_backend = data.get('search_backend', config.IDENTIFY_BACKEND)
+    min_similarity = data.get('min_similarity')
+    max_distance = data.get('max_distance')
+    rerank = bool(data.get('rerank', False))
+
+    if not image_url:
+        return jsonify({"error": "image_url is required"}), 400
+
+    if similarity_metric_name not in similarity_metrics:
+        return jsonify({"error": f"Invalid similarity metric: '{similarity_metric_name}'. Available metrics: {list(similarity_metrics.keys())}"}), 400
+
+    if search_backend not in SEARCH_BACKENDS:
+        return jsonify({"error": f"Invalid search backend: '{search_backend}'. Available backends: {list(SEARCH_BACKENDS)}"}), 400
+
+    try:
+        k = int(data.get('k', 5))
+        shortlist = int(data.get('shortlist', config.RERANK_SHORTLIST))
+        threshold = None
+        if similarity_metric_name == "cosine":
+            if max_distance is not None:
+                return jsonify({"error": "max_distance applies only to the 'euclidean' metric; use min_similarity"}), 400
+            threshold = float(min_similarity) if min_similarity is not None else None
+        else:
+            if min_similarity is not None:
+                return jsonify({"error": "min_similarity applies only to the 'cosine' metric; use max_distance"}), 400
+            threshold = float(max_distance) if max_distance is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "k, shortlist, min_similarity and max_distance must be numbers"}), 400
+
+    if not 1 <= k <= MAX_TOP_K:
+        return jsonify({"error": f"k must be between 1 and {MAX_TOP_K}"}), 400
+
+    if rerank and not k <= shortlist <= MAX_TOP_K:
+        return jsonify({"error": f"shortlist must be between k and {MAX_TOP_K}"}), 400
+
+    similarity_metric = similarity_metrics[similarity_metric_name]
+    try:
+        if rerank:
+            return identify_with_rerank(image_url, similarity_metric, k, shortlist, threshold, search_backend)
+
+        provided_image_features = extract_primary(image_url)
+
+        # Busca um candidato extra para medir a separação do melhor em relação ao segundo
+        candidates = find_top_dogs(provided_image_features, similarity_metric, k + 1, threshold, search_backend)
+        if not candidates:
+            return jsonify({"message": "No matching dog found", "candidates": []}), 404
+
+        score_name = "similarity" if similarity_metric == "cosine" else "distance"
+        return jsonify({
+            "metric": similarity_metric,
+            "match_confidence": match_confidence(candidates, similarity_metric),
+            "candidates": [
+                {"rank": rank, "dog_id": dog_id, score_name: score}
+                for rank, (dog_id, score) in enumerate(candidates[:k], start=1)
+            ]
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": f"Failed to identify dog: {str(e)}"}), 500
+
+def identify_with_rerank(image_url, metric, k, shortlist, threshold, backend):
+    """
+    Identificação em duas etapas: lista curta pelo vetor global e verificação geométrica
+    (teste de razão + homografia por RANSAC) apenas desses candidatos, em paralelo.
+    """
+    # A mesma imagem decodificada serve ao vetor global e aos keypoints da consulta
+    image = extraction_manager.load_image(load_image_bytes(image_url))
+    provided_image_features = cpu_executor.run(
+        extraction_manager.extract_features_by_strategy, image, names=[PRIMARY_STRATEGY]
+    )[PRIMARY_STRATEGY]
+
+    candidates = find_top_dogs(provided_image_features, metric, shortlist, threshold, backend)
+    if not candidates:
+        return jsonify({"message": "No matching dog found", "candidates": []}), 404
+
+    with metrics.timer("rerank", "describe"):
+        query = cpu_executor.run(geometric_verifier.describe, image)
+    if query is None:
+        return jsonify({"error": "No keypoints found in the provided image"}), 422
+
+    stored = keypoint_cache.get_many([dog_id for dog_id, _ in candidates])
+    with metrics.timer("rerank", "verify"):
+        ranked = cpu_executor.run(geometric_verifier.rerank, query, candidates, stored)
+    score_name = "similarity" if metric == "cosine" else "distance"
+    return jsonify({
+        "metric": metric,
+        "reranked": True,
+        "shortlist": len(candidates),
+        "match_confidence": ranked[0]["confidence"],
+        "candidates": [
+            {
+                "rank": rank,
+                "dog_id": result["dog_id"],
+                score_name: result["score"],
+                "inliers": result["inliers"],
+                "matches": result["matches"],
+                "geometric_confidence": result["confidence"],
+                "verified": result["verified"],
+            }
+            for rank, result in enumerate(ranked[:k], start=1)
+        ]
+    }), 200
+
+#  Versao 4 - identificação por estratégia com fusão ponderada das pontuações
+#
+
+@app.route('/v4/identify_dog', methods=['POST'])
+def identify_dog_v4():
+    """
+    Compara cada estratégia de extração apenas com os vetores da mesma estratégia (tabela
+    `features`) e combina as similaridades do cosseno por média ponderada.
+
+    Corpo JSON:
+        image_url (str): URL da imagem (obrigatório).
+        k (int): Quantidade máxima de candidatos (padrão 5, máximo 100).
+        min_similarity (float): Similaridade combinada mínima.
+        weights (dict): Pesos por estratégia, ex. {"SIFT": 1.0, "HOG": 0.5}
+                        (padrão: FUSION_WEIGHTS). Peso 0 desliga a estratégia.
+    """
+    data = request.json or {}
+    image_url = data.get('image_url')
+    weights = data.get('weights', FUSION_WEIGHTS)
+
+    if not image_url:
+        return jsonify({"error": "image_url is required"}), 400
+
+    try:
+        k = int(data.get('k', 5))
+        min_similarity = data.get('min_similarity')
+        threshold = float(min_similarity) if min_similarity is not None else None
+        if not isinstance(weights, dict):
+            raise TypeError
+        weights = {str(name): float(weight) for name, weight in weights.items()}
+    except (TypeError, ValueError):
+        return jsonify({"error": "k and min_similarity must be numbers and weights an object of numbers"}), 400
+
+    if not 1 <= k <= MAX_TOP_K:
+        return jsonify({"error": f"k must be between 1 and {MAX_TOP_K}"}), 400
+
+    unknown = sorted(set(weights) - set(extraction_manager.strategy_names()))
+    if unknown:
+        return jsonify({"error": f"Unknown strategies in weights: {unknown}. Available strategies: {extraction_manager.strategy_names()}"}), 400
+
+    names = [name for name, weight in weights.items() if weight > 0]
+    if not names:
+        return jsonify({"error": "At least one strategy must have a positive weight"}), 400
+
+    try:
+        queries = extract_strategies(image_url, names=names)
+
+        gallery = feature_gallery_cache.get()
+        mismatched = gallery.mismatched_dimensions(queries)
+        if mismatched:
+            details = {name: {"query": query_dim, "gallery": gallery_dim}
+                       for name, (query_dim, gallery_dim) in mismatched.items()}
+            return jsonify({
+                "error": "Strategy vectors do not match the stored gallery dimensions; re-enroll the dogs with the current extraction parameters",
+                "dimensions": details,
+            }), 400
+
+        with metrics.timer("match", "fused.cosine"):
+            candidates = cpu_executor.run(gallery.top_k, queries, weights, k=k + 1, threshold=threshold)
+        if not candidates:
+            return jsonify({"message": "No matching dog found", "candidates": []}), 404
+
+        return jsonify({
+            "metric": "cosine",
+            "weights": {name: weights[name] for name in names},
+            "match_confidence": match_confidence([(dog_id, score) for dog_id, score, _ in candidates], "cosine"),
+            "candidates": [
+                {"rank": rank, "dog_id": dog_id, "similarity": score, "strategy_similarities": per_strategy}
+                for rank, (dog_id, score, per_strategy) in enumerate(candidates[:k], start=1)
+            ]
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": f"Failed to identify dog: {str(e)}"}), 500
+
+
+@app.route('/v2/gallery/invalidate', methods=['POST'])
+def invalidate_gallery():
+    """
+    Descarta a galeria em cache deste processo; a próxima identificação recarrega do banco.
+    Útil após alterações feitas diretamente na tabela `dogs`.
+    """
+    gallery_cache.invalidate()
+    feature_gallery_cache.invalidate()
+    keypoint_cache.invalidate()
+    if pq_gallery_cache is not None:
+        pq_gallery_cache.invalidate()
+    return jsonify({"message": "Galeria invalidada"}), 200
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Prontidão do processo (probe de inicialização do Cloud Run): 503 até o fim do pré-aquecimento."""
+    if not startup_report.ready:
+        return jsonify({"ready": False}), 503
+    return jsonify({"ready": True}), 200
+
+@app.route('/v2/startup', methods=['GET'])
+def startup_stats():
+    """Tempo de cada etapa da inicialização deste processo e se ficou dentro do orçamento."""
+    return jsonify(startup_report.as_dict()), 200
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Histogramas de latência por etapa e por endpoint, tamanho das galerias, caches e pool (formato Prometheus)."""
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/v2/serving/stats', methods=['GET'])
+def serving_stats():
+    """Modo de atendimento deste processo e ocupação do executor de CPU."""
+    return jsonify(cpu_executor.stats()), 200
+
+@app.route('/v2/db/pool_stats', methods=['GET'])
+def db_pool_stats():
+    """Métricas do pool de conexões com o Postgres deste processo."""
+    return jsonify(database.pool_stats()), 200
+
+@app.route('/v2/cache/stats', methods=['GET'])
+def cache_stats():
+    """
+    Contadores do cache de vetores extraídos, cache de miniaturas e tamanho da galeria em
+    memória (None enquanto não carregada; a consulta não carrega nem atualiza a galeria).
+    """
+    feature_cache = extraction_manager.feature_cache
+    return jsonify({
+        "feature_cache": feature_cache.stats() if feature_cache else None,
+        "thumbnail_cache": thumbnail_cache.stats(),
+        "gallery_size": gallery_cache.size(),
+    }), 200
+
 
 if __name__ == "__main__":
     with app.app_context():
-        db.create_all()
+        init_database_tools().create_all()
     app.run(host="0.0.0.0", port=8080,debug=True)   
\ No newline at end of file
@@ -0,0 +1,183 @@
+# src/cache_store.py
+"""
+Armazenamento comum dos caches do processo (imagens baixadas, vetores extraídos,
+miniaturas): um LRU em memória limitado por bytes e um diretório em disco limitado por
+bytes, com gravação atômica (arquivo temporário + `os.replace`).
+
+O diretório em disco pode ser compartilhado por vários workers. Cada `DiskStore` mantém
+o total ocupado em memória e só percorre o diretório quando esse total passa do limite;
+a limpeza remove os arquivos mais antigos até `prune_ratio` do limite e ressincroniza o
+total com o que está de fato no disco (inclusive o gravado por outros processos).
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import metrics
+
+
+def prune_directory(path, max_bytes):
+    """
+    Remove os arquivos mais antigos (por data de modificação) do diretório até que o
+    total ocupado fique abaixo de `max_bytes`. Arquivos temporários (.tmp) são ignorados.
+
+    Returns:
+        int: Bytes ocupados no diretório depois da limpeza.
+    """
+    entries = []
+    total = 0
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+    if total <= max_bytes:
+        return total
+    for _, size, file_path in sorted(entries):
+        try:
+            os.remove(file_path)
+        except OSError:
+            continue
+        total -= size
+        if total <= max_bytes:
+            break
+    return total
+
+
+class MemoryLRU:
+    """LRU em memória de valores `bytes`, limitado pela soma dos tamanhos."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "max_bytes": self.max_bytes}
+
+
+class DiskStore:
+    """Arquivos em um diretório limitado por bytes, um por chave."""
+
+    def __init__(self, directory, max_bytes, suffix="", prune_ratio=0.9):
+        """
+        Args:
+            directory (str): Diretório dos arquivos (criado se não existir).
+            max_bytes (int): Limite do total ocupado no diretório.
+            suffix (str): Extensão acrescentada ao nome de cada arquivo (ex.: '.jpg').
+            prune_ratio (float): Fração do limite mantida após uma limpeza, para a próxima
+                                 gravação não disparar outra imediatamente.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.prune_ratio = prune_ratio
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # Única varredura fora das limpezas: o total inicial do diretório
+        self._size = prune_directory(directory, max_bytes)
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def read(self, key):
+        """Conteúdo gravado para a chave, ou None."""
+        try:
+            with open(self.path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def write(self, key, data):
+        """Grava o conteúdo (se ainda não existir) e limpa o diretório se passar do limite."""
+        if len(data) > self.max_bytes:
+            return
+        path = self.path(key)
+        if os.path.exists(path):
+            return
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Erro ao gravar no cache em disco ({self.directory}): {e}")
+            return
+        with self._lock:
+            self._size += len(data)
+            if self._size <= self.max_bytes:
+                return
+            try:
+                self._size = prune_directory(self.directory, int(self.max_bytes * self.prune_ratio))
+            except OSError as e:
+                print(f"Erro ao limpar o cache em disco ({self.directory}): {e}")
+
+    def stats(self):
+        with self._lock:
+            return {"bytes": self._size, "max_bytes": self.max_bytes}
+
+
+class TieredCache:
+    """
+    Cache de `bytes` em dois níveis: `MemoryLRU` e, opcionalmente, `DiskStore`. Um acerto
+    em disco volta para a memória.
+
+    Com `metric`, cada consulta conta em `idealpet_cache_requests_total{cache=metric}` como
+    hit, disk_hit ou miss.
+    """
+
+    def __init__(self, max_bytes, disk_dir=None, disk_max_bytes=0, suffix="", metric=None):
+        self.memory = MemoryLRU(max_bytes)
+        self.disk = DiskStore(disk_dir, disk_max_bytes, suffix=suffix) if disk_dir else None
+        self.metric = metric
+
+    def _count(self, result):
+        if self.metric:
+            metrics.CACHE_REQUESTS.inc(cache=self.metric, result=result)
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("hit")
+            return value
+        value = self.disk.read(key) if self.disk else None
+        if value is None:
+            self._count("miss")
+            return None
+        self._count("disk_hit")
+        self.memory.put(key, value)
+        return value
+
+    def put(self, key, value):
+        self.memory.put(key, value)
+        if self.disk:
+            self.disk.write(key, value)
+
+    def stats(self):
+        stats = self.memory.stats()
+        if self.disk:
+            stats["disk"] = self.disk.stats()
+        return stats
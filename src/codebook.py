@@ -0,0 +1,274 @@
+# src/codebook.py
+"""
+Vocabulário visual (codebook) para codificar os descritores SIFT brutos em VLAD ou BoVW.
+
+O codebook é treinado offline (k-means sobre descritores amostrados da galeria) e salvo
+em um arquivo .npz. Uso pela linha de comando:
+
+    python src/codebook.py train --images /caminho/fotos --words 64 --output codebook.npz
+    python src/codebook.py train --from-db --words 64 --output codebook.npz
+    python src/codebook.py encode --codebook codebook.npz --encoding vlad
+
+`train` (re)treina o codebook; `encode` recalcula apenas os vetores da estratégia VLAD/BoVW
+de todos os cães cadastrados (tabela `features`), sem tocar nas demais estratégias.
+Após retreinar, os vetores antigos deixam de ser comparáveis: rode `encode` em seguida.
+"""
+import argparse
+import glob
+import hashlib
+import os
+
+import cv2
+import numpy as np
+
+ENCODINGS = ("vlad", "bovw")
+
+
+class VisualCodebook:
+    """
+    Centros do k-means (palavras visuais) e pesos idf, com os encoders VLAD e BoVW.
+
+    - BoVW: histograma de palavras ponderado por tf-idf e normalizado (L2);
+    - VLAD: soma dos resíduos (descritor - centro) por palavra, com normalização por raiz
+      com sinal, por bloco (intra-normalização) e global (L2).
+
+    Em ambos, as posições de palavras ausentes na imagem ficam zeradas, o que permite
+    indexar os vetores por palavra (ver `gallery.InvertedFileIndex`).
+    """
+
+    def __init__(self, centers, idf=None):
+        """
+        Args:
+            centers (np.array): Matriz K x D com os centros das palavras visuais.
+            idf (np.array): Peso idf de cada palavra (padrão: 1).
+        """
+        self.centers = np.ascontiguousarray(centers, dtype=np.float32)
+        self.idf = np.ones(len(self.centers), dtype=np.float32) if idf is None else np.asarray(idf, dtype=np.float32)
+        self._center_sq = np.einsum("ij,ij->i", self.centers, self.centers)
+
+    @property
+    def n_words(self):
+        return self.centers.shape[0]
+
+    @property
+    def dim(self):
+        return self.centers.shape[1]
+
+    @property
+    def version(self):
+        """Hash curto do conteúdo do codebook; muda a cada retreino."""
+        digest = hashlib.sha1(self.centers.tobytes())
+        digest.update(self.idf.tobytes())
+        return digest.hexdigest()[:16]
+
+    def encoded_dim(self, encoding):
+        return self.n_words * self.dim if encoding == "vlad" else self.n_words
+
+    @classmethod
+    def train(cls, descriptor_sets, n_words=64, iterations=20, attempts=3, max_descriptors=200000, seed=0):
+        """
+        Treina o codebook com k-means (OpenCV) sobre os descritores das imagens de amostra.
+
+        Args:
+            descriptor_sets (list): Descritores (N x D) de cada imagem de treino.
+            n_words (int): Quantidade de palavras visuais (K).
+            iterations (int): Iterações máximas do k-means.
+            attempts (int): Inicializações do k-means; fica a de menor erro.
+            max_descriptors (int): Amostra máxima de descritores usada no k-means.
+            seed (int): Semente da amostragem e da inicialização.
+
+        Returns:
+            VisualCodebook: Codebook treinado, com idf calculado sobre as imagens de treino.
+        """
+        descriptor_sets = [np.asarray(d, dtype=np.float32) for d in descriptor_sets if d is not None and len(d)]
+        if not descriptor_sets:
+            raise ValueError("Nenhum descritor para treinar o codebook.")
+        data = np.concatenate(descriptor_sets)
+        rng = np.random.default_rng(seed)
+        if len(data) > max_descriptors:
+            data = data[rng.choice(len(data), max_descriptors, replace=False)]
+        if len(data) < n_words:
+            raise ValueError(f"Descritores insuficientes ({len(data)}) para {n_words} palavras.")
+
+        cv2.setRNGSeed(seed)
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, iterations, 1e-3)
+        _, _, centers = cv2.kmeans(data, n_words, None, criteria, attempts, cv2.KMEANS_PP_CENTERS)
+
+        codebook = cls(centers)
+        document_frequency = np.zeros(n_words, dtype=np.float64)
+        for descriptors in descriptor_sets:
+            document_frequency[np.unique(codebook.assign(descriptors))] += 1
+        codebook.idf = np.log(len(descriptor_sets) / (1.0 + document_frequency)).clip(min=0.0).astype(np.float32)
+        # Palavras presentes em todas as imagens ficariam com peso 0 e sumiriam do BoVW
+        codebook.idf = np.maximum(codebook.idf, 1e-3)
+        return codebook
+
+    def assign(self, descriptors):
+        """Índice da palavra visual mais próxima de cada descritor."""
+        descriptors = np.asarray(descriptors, dtype=np.float32)
+        distances = self._center_sq[None, :] - 2.0 * (descriptors @ self.centers.T)
+        return np.argmin(distances, axis=1)
+
+    def bovw(self, descriptors):
+        words = self.assign(descriptors)
+        histogram = np.bincount(words, minlength=self.n_words).astype(np.float32) * self.idf
+        norm = np.linalg.norm(histogram)
+        return histogram / norm if norm > 0 else histogram
+
+    def vlad(self, descriptors):
+        descriptors = np.asarray(descriptors, dtype=np.float32)
+        words = self.assign(descriptors)
+        residuals = np.zeros((self.n_words, self.dim), dtype=np.float32)
+        np.add.at(residuals, words, descriptors - self.centers[words])
+        residuals = np.sign(residuals) * np.sqrt(np.abs(residuals))
+        block_norms = np.linalg.norm(residuals, axis=1, keepdims=True)
+        residuals = np.divide(residuals, block_norms, out=np.zeros_like(residuals), where=block_norms > 0)
+        vector = residuals.ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def encode(self, descriptors, encoding="vlad"):
+        if encoding == "vlad":
+            return self.vlad(descriptors)
+        if encoding == "bovw":
+            return self.bovw(descriptors)
+        raise ValueError(f"Codificação inválida: '{encoding}'. Disponíveis: {list(ENCODINGS)}")
+
+    def save(self, path):
+        # Grava em arquivo temporário e renomeia, para workers nunca lerem um arquivo parcial
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, centers=self.centers, idf=self.idf)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["centers"], data["idf"])
+
+
+def sample_descriptors(image_bytes, sift, max_side=None, reduced_decode=False, max_per_image=500, rng=None):
+    """Descritores SIFT de uma imagem, com no máximo `max_per_image` linhas amostradas."""
+    from image_data import ImageData
+
+    _, descriptors = sift.detect(ImageData(data=image_bytes, max_side=max_side, reduced_decode=reduced_decode))
+    if descriptors is None:
+        return None
+    if rng is not None and len(descriptors) > max_per_image:
+        descriptors = descriptors[rng.choice(len(descriptors), max_per_image, replace=False)]
+    return descriptors
+
+
+def _gallery_images(args):
+    if args.images:
+        for ext in ("jpg", "jpeg", "png"):
+            for path in sorted(glob.glob(os.path.join(args.images, f"*.{ext}"))):
+                with open(path, "rb") as f:
+                    yield None, path, f.read()
+        return
+
+    from config import config
+    from database import DB
+    from image_fetcher import fetch_image
+
+    database = DB(config)
+    try:
+        for dog_id, image_url in database.get_dog_images():
+            try:
+                yield dog_id, image_url, fetch_image(image_url)
+            except Exception as e:
+                print(f"Imagem do cão {dog_id} ignorada: {e}")
+    finally:
+        database.close()
+
+
+def _pipeline_options(args):
+    if args.max_side is not None:
+        return args.max_side, args.reduced_decode
+    from config import Config
+    return Config.IMAGE_MAX_SIDE, Config.IMAGE_REDUCED_DECODE
+
+
+def train_command(args):
+    from strategies.sift_extractor import SIFTExtractor
+
+    max_side, reduced_decode = _pipeline_options(args)
+    sift = SIFTExtractor(nfeatures=args.nfeatures)
+    rng = np.random.default_rng(args.seed)
+    descriptor_sets = []
+    for dog_id, source, data in _gallery_images(args):
+        try:
+            descriptors = sample_descriptors(data, sift, max_side, reduced_decode, args.max_per_image, rng)
+        except Exception as e:
+            print(f"Imagem {source} ignorada: {e}")
+            continue
+        if descriptors is not None:
+            descriptor_sets.append(descriptors)
+
+    codebook = VisualCodebook.train(descriptor_sets, n_words=args.words, iterations=args.iterations, seed=args.seed)
+    codebook.save(args.output)
+    print(f"Codebook {codebook.version}: {codebook.n_words} palavras, {len(descriptor_sets)} imagens -> {args.output}")
+
+
+def encode_command(args):
+    from config import Config, config
+    from database import DB
+    from feature_extraction_manager import FeatureExtractionManager
+    from image_fetcher import fetch_image
+    from strategies.vlad_extractor import VLADExtractor
+
+    codebook = VisualCodebook.load(args.codebook)
+    manager = FeatureExtractionManager(
+        [VLADExtractor(codebook, encoding=args.encoding, nfeatures=Config.SIFT_NFEATURES)],
+        max_side=Config.IMAGE_MAX_SIDE,
+        reduced_decode=Config.IMAGE_REDUCED_DECODE,
+    )
+    records = manager.strategy_records()
+    database = DB(config)
+    encoded = failed = 0
+    try:
+        for dog_id, image_url in database.get_dog_images():
+            try:
+                strategy_features = manager.extract_features_by_strategy(fetch_image(image_url))
+            except Exception as e:
+                print(f"Cão {dog_id} ignorado: {e}")
+                failed += 1
+                continue
+            if database.save_features_to_db(dog_id, strategy_features, image_url, records) is None:
+                failed += 1
+            else:
+                encoded += 1
+    finally:
+        database.close()
+    print(f"Codebook {codebook.version}: {encoded} cães codificados, {failed} falhas.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train = commands.add_parser("train", help="Treina (ou retreina) o codebook.")
+    source = train.add_mutually_exclusive_group(required=True)
+    source.add_argument("--images", help="Diretório com imagens de treino (jpg/png).")
+    source.add_argument("--from-db", action="store_true", help="Usa as imagens dos cães cadastrados.")
+    train.add_argument("--output", required=True, help="Arquivo .npz de saída.")
+    train.add_argument("--words", type=int, default=64, help="Quantidade de palavras visuais.")
+    train.add_argument("--iterations", type=int, default=20)
+    train.add_argument("--max-per-image", type=int, default=500, help="Descritores amostrados por imagem.")
+    train.add_argument("--nfeatures", type=int, default=0, help="nfeatures do SIFT (use o mesmo de SIFT_NFEATURES).")
+    train.add_argument("--max-side", type=int, help="Normalização de resolução (padrão: IMAGE_MAX_SIDE).")
+    train.add_argument("--reduced-decode", action="store_true")
+    train.add_argument("--seed", type=int, default=0)
+    train.set_defaults(func=train_command)
+
+    encode = commands.add_parser("encode", help="Recalcula os vetores VLAD/BoVW de todos os cães.")
+    encode.add_argument("--codebook", required=True, help="Arquivo .npz do codebook.")
+    encode.add_argument("--encoding", choices=ENCODINGS, default="vlad")
+    encode.set_defaults(func=encode_command)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,112 @@ class Config:
     if not all([POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_DB, POSTGRES_HOST, POSTGRES_PORT]):
         raise Exception("Variáveis de ambiente do banco não estão todas definidas.")
 
+    # Intervalo (segundos) entre buscas incrementais da galeria em cache por cães novos
+    GALLERY_REFRESH_SECONDS = float(os.getenv("GALLERY_REFRESH_SECONDS", "30"))
+    # Folga das buscas incrementais para transações que terminam fora de ordem: IDs abaixo
+    # da marca d'água (cães) e segundos antes dela (vetores por estratégia) verificados de novo
+    GALLERY_REFRESH_WINDOW = int(os.getenv("GALLERY_REFRESH_WINDOW", "1000"))
+    GALLERY_REFRESH_SLACK_SECONDS = float(os.getenv("GALLERY_REFRESH_SLACK_SECONDS", "300"))
+    # Snapshot da galeria mapeado em memória e compartilhado pelos workers (vazio desativa):
+    # idade máxima do snapshot com cadastros pendentes e tamanho da delta que força a reconstrução
+    GALLERY_SNAPSHOT_DIR = os.getenv("GALLERY_SNAPSHOT_DIR", "")
+    GALLERY_SNAPSHOT_REBUILD_SECONDS = float(os.getenv("GALLERY_SNAPSHOT_REBUILD_SECONDS", "600"))
+    GALLERY_SNAPSHOT_DELTA_MAX = int(os.getenv("GALLERY_SNAPSHOT_DELTA_MAX", "5000"))
+
+    # Onde a busca de identificação roda: 'memory' (galeria em cache) ou 'pgvector' (índice no Postgres)
+    IDENTIFY_BACKEND = os.getenv("IDENTIFY_BACKEND", "memory")
+
+    # Pool de conexões do psycopg2 (database.DB)
+    DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+    DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_HEALTHCHECK_SECONDS = float(os.getenv("DB_POOL_HEALTHCHECK_SECONDS", "30"))
+
+    # Download de imagens (image_fetcher.ImageFetcher)
+    IMAGE_FETCH_CONNECT_TIMEOUT = float(os.getenv("IMAGE_FETCH_CONNECT_TIMEOUT", "3.05"))
+    IMAGE_FETCH_READ_TIMEOUT = float(os.getenv("IMAGE_FETCH_READ_TIMEOUT", "10"))
+    IMAGE_FETCH_MAX_BYTES = int(os.getenv("IMAGE_FETCH_MAX_BYTES", str(20 * 1024 * 1024)))
+    # Conexões keep-alive por host; no modo gevent uma única sessão atende todas as requisições
+    IMAGE_FETCH_POOL_SIZE = int(os.getenv(
+        "IMAGE_FETCH_POOL_SIZE", "100" if os.getenv("SERVING_MODE", "sync").lower() == "gevent" else "10"))
+    IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+    IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "")  # vazio desativa o cache em disco
+    IMAGE_CACHE_DISK_MAX_BYTES = int(os.getenv("IMAGE_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+    IMAGE_CACHE_TTL = float(os.getenv("IMAGE_CACHE_TTL", "300"))
+
+    # Normalização de resolução antes da extração (0 desativa). Alterar estes valores muda
+    # os vetores gerados: a galeria precisa ser recadastrada com os mesmos parâmetros.
+    IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "0"))
+    IMAGE_REDUCED_DECODE = os.getenv("IMAGE_REDUCED_DECODE", "false").lower() in ("1", "true", "yes")
+    SIFT_NFEATURES = int(os.getenv("SIFT_NFEATURES", "0"))
+
+    # Cadastro em lote (/v2/add_dogs)
+    BULK_ENROLL_MAX_ITEMS = int(os.getenv("BULK_ENROLL_MAX_ITEMS", "1000"))
+    BULK_ENROLL_WORKERS = int(os.getenv("BULK_ENROLL_WORKERS", str(os.cpu_count() or 4)))
+
+    # Fila de cadastros assíncronos (/v3/add_dog)
+    ENROLL_QUEUE_WORKERS = int(os.getenv("ENROLL_QUEUE_WORKERS", "2"))
+    ENROLL_QUEUE_POLL_SECONDS = float(os.getenv("ENROLL_QUEUE_POLL_SECONDS", "2"))
+    ENROLL_JOB_MAX_ATTEMPTS = int(os.getenv("ENROLL_JOB_MAX_ATTEMPTS", "3"))
+    ENROLL_JOB_STALE_SECONDS = float(os.getenv("ENROLL_JOB_STALE_SECONDS", "600"))
+
+    # Pool de processos para extração (0 extrai na própria thread da requisição)
+    EXTRACTION_PROCESSES = int(os.getenv("EXTRACTION_PROCESSES", "0"))
+    EXTRACTION_MAX_PENDING = int(os.getenv("EXTRACTION_MAX_PENDING", "0"))  # 0 = 2 x processos
+    EXTRACTION_SUBMIT_TIMEOUT = float(os.getenv("EXTRACTION_SUBMIT_TIMEOUT", "30"))
+    # Estratégias de extração (a primeira é a principal, gravada em dogs.feature_vector) e
+    # pesos da fusão de pontuações por estratégia, ex. "SIFT=1.0,HOG=0.5" (vazio = pesos iguais)
+    EXTRACTION_STRATEGIES = os.getenv("EXTRACTION_STRATEGIES", "SIFT")
+    FUSION_WEIGHTS = os.getenv("FUSION_WEIGHTS", "")
+    # Codebook das estratégias VLAD/BoVW (python src/codebook.py train) e quantas palavras
+    # da consulta o índice invertido visita (0 = todas)
+    CODEBOOK_PATH = os.getenv("CODEBOOK_PATH", "")
+    IVF_PROBE = int(os.getenv("IVF_PROBE", "16"))
+    # Re-ranking geométrico: candidatos da 1ª etapa, keypoints guardados por cão, threads de
+    # verificação, inliers mínimos e keypoints mantidos em cache (0 desativa a gravação)
+    RERANK_SHORTLIST = int(os.getenv("RERANK_SHORTLIST", "20"))
+    RERANK_MAX_KEYPOINTS = int(os.getenv("RERANK_MAX_KEYPOINTS", "500"))
+    RERANK_WORKERS = int(os.getenv("RERANK_WORKERS", "4"))
+    RERANK_MIN_INLIERS = int(os.getenv("RERANK_MIN_INLIERS", "8"))
+    RERANK_CACHE_ENTRIES = int(os.getenv("RERANK_CACHE_ENTRIES", "5000"))
+    # Galeria comprimida por PQ (python src/pq_gallery.py train; vazio desativa o backend 'pq')
+    # e quantos sobreviventes da busca aproximada são reordenados pelo vetor exato (0 = nenhum)
+    PQ_PATH = os.getenv("PQ_PATH", "")
+    PQ_SHORTLIST = int(os.getenv("PQ_SHORTLIST", "100"))
+    # Threads para executar as estratégias de uma mesma imagem em paralelo (0 = em sequência)
+    EXTRACTION_STRATEGY_WORKERS = int(os.getenv("EXTRACTION_STRATEGY_WORKERS", "0"))
+
+    # Cache de vetores extraídos por hash da imagem + parâmetros (0 entradas desativa)
+    FEATURE_CACHE_ENTRIES = int(os.getenv("FEATURE_CACHE_ENTRIES", "1024"))
+    FEATURE_CACHE_DIR = os.getenv("FEATURE_CACHE_DIR", "")  # vazio desativa o nível em disco
+    FEATURE_CACHE_DISK_MAX_BYTES = int(os.getenv("FEATURE_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+
+    # Inicialização rápida (Cloud Run): adia SQLAlchemy/Flask-Migrate para a linha de comando,
+    # abre o pool do banco no primeiro uso e pré-aquece galeria e detectores em segundo plano.
+    # STARTUP_BUDGET_MS (0 = sem limite) gera um aviso se a prontidão passar do orçamento.
+    LAZY_STARTUP = os.getenv("LAZY_STARTUP", "false").lower() in ("1", "true", "yes")
+    SWAGGER_ENABLED = os.getenv("SWAGGER_ENABLED", "false" if LAZY_STARTUP else "true").lower() in ("1", "true", "yes")
+    STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "0"))
+
+    # Cabeçalho Server-Timing com o tempo de cada etapa (download, decodificação, extração,
+    # banco, busca) nas respostas; desative se os clientes não devem ver esses tempos
+    SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() in ("1", "true", "yes")
+
+    # Trabalho de CPU no modo de atendimento gevent (SERVING_MODE=gevent, ver serving.py):
+    # threads nativas, tarefas em andamento (0 = 4 x threads) e espera máxima por uma vaga
+    CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(os.cpu_count() or 1)))
+    CPU_MAX_PENDING = int(os.getenv("CPU_MAX_PENDING", "0"))
+    CPU_SUBMIT_TIMEOUT = float(os.getenv("CPU_SUBMIT_TIMEOUT", "30"))
+
+    # Listagem de cães da página inicial e miniaturas (thumbnails.ThumbnailCache)
+    DOG_LIST_PAGE_SIZE = int(os.getenv("DOG_LIST_PAGE_SIZE", "50"))
+    THUMBNAIL_MAX_SIDE = int(os.getenv("THUMBNAIL_MAX_SIDE", "160"))
+    THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+    THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv("THUMBNAIL_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    THUMBNAIL_CACHE_DIR = os.getenv("THUMBNAIL_CACHE_DIR", "")  # vazio desativa o cache em disco
+    THUMBNAIL_CACHE_DISK_MAX_BYTES = int(os.getenv("THUMBNAIL_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+    THUMBNAIL_MAX_AGE = int(os.getenv("THUMBNAIL_MAX_AGE", "86400"))  # Cache-Control, em segundos
+
     SQLALCHEMY_DATABASE_URI = (
         f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
     )
@@ -1,103 +1,939 @@
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2.extras import Json, execute_values
+
+import metrics
+from vector_codec import pack_vector, unpack_rows
+
+# Operadores de distância do pgvector por métrica
+PGVECTOR_OPERATORS = {
+    "euclidean": "<->",
+    "cosine": "<=>",
+}
+
+# Dimensão da coluna dogs.embedding (postgres/migrations/001_dogs_embedding.sql)
+EMBEDDING_DIM = 128
+
+# Erros que indicam conexão quebrada (servidor reiniciado, rede caiu, etc.)
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+class PoolTimeout(Exception):
+    """Nenhuma conexão do pool ficou livre dentro do tempo limite."""
+
+
+def vector_literal(values):
+    """Representação textual de um vetor pgvector ('[1.0,2.0,...]'), para uso com `%s::vector`."""
+    return "[" + ",".join(str(float(value)) for value in values) + "]"
+
+
+def packed_binary(values):
+    """Vetor no formato compacto (`vector_codec`) pronto para uma coluna bytea, ou None."""
+    packed = pack_vector(values)
+    return psycopg2.Binary(packed) if packed is not None else None
+
+
+def dog_vector_columns(values):
+    """
+    Valores de (feature_vector, feature_packed, embedding) para cadastrar um cão.
+
+    O vetor é gravado só na coluna compacta; o float8[] fica nulo, exceto quando o vetor
+    não cabe no formato compacto (postgres/migrations/010). Sem o float8[] o trigger da
+    migração 001 não deriva o embedding, então ele é gravado aqui (`%s::vector`).
+    """
+    packed = packed_binary(values)
+    embedding = vector_literal(values) if len(values) == EMBEDDING_DIM else None
+    return (list(values) if packed is None else None), packed, embedding
+
+
+def strategy_vector_columns(values):
+    """
+    Valores de (feature_vector, vector_packed) para gravar o vetor de uma estratégia.
+
+    Como em `dog_vector_columns`, o vetor pgvector fica nulo quando o vetor cabe no formato
+    compacto (postgres/migrations/011); nenhuma consulta busca em `features` pelo pgvector.
+    """
+    packed = packed_binary(values)
+    return (vector_literal(values) if packed is None else None), packed
+
 
 class DB:
-    def __init__(self, config):
-        self.conn = psycopg2.connect(
-            host=config.POSTGRES_HOST,
-            port=config.POSTGRES_PORT,
-            dbname=config.POSTGRES_DB,
-            user=config.POSTGRES_USER,
-            password=config.POSTGRES_PASSWORD
+    def __init__(self, config, lazy=False):
+        """
+        Acesso ao Postgres por meio de um pool limitado de conexões, seguro entre threads.
+
+        Cada operação retira uma conexão do pool (`connection()`), e a devolve ao final.
+        Conexões ociosas há mais de `DB_POOL_HEALTHCHECK_SECONDS` são testadas antes do uso,
+        e conexões quebradas são descartadas e recriadas automaticamente.
+
+        Args:
+            config (Config): Configuração com os dados de conexão e limites do pool.
+            lazy (bool): Se True, o pool (e as conexões mínimas) só é aberto no primeiro uso
+                         ou em `connect()`, e não na construção.
+        """
+        self.config = config
+        self.max_connections = config.DB_POOL_MAX
+        self.checkout_timeout = config.DB_POOL_TIMEOUT
+        self.healthcheck_interval = config.DB_POOL_HEALTHCHECK_SECONDS
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        if not lazy:
+            self.connect()
+        # O pool do psycopg2 lança PoolError quando esgotado; o semáforo faz as threads
+        # aguardarem uma conexão livre (até o tempo limite) em vez de falharem.
+        self._slots = threading.BoundedSemaphore(config.DB_POOL_MAX)
+        self._stats_lock = threading.Lock()
+        self._last_used = {}
+        self._stats = {
+            "in_use": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "reconnects": 0,
+            "checkout_seconds_total": 0.0,
+            "checkout_seconds_max": 0.0,
+        }
+
+    def connect(self):
+        """Abre o pool de conexões, se ainda não estiver aberto."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = pg_pool.ThreadedConnectionPool(
+                        self.config.DB_POOL_MIN,
+                        self.config.DB_POOL_MAX,
+                        host=self.config.POSTGRES_HOST,
+                        port=self.config.POSTGRES_PORT,
+                        dbname=self.config.POSTGRES_DB,
+                        user=self.config.POSTGRES_USER,
+                        password=self.config.POSTGRES_PASSWORD
+                    )
+        return self._pool
+
+    @property
+    def pool(self):
+        return self.connect()
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn), 0.0)
+        if time.monotonic() - last_used < self.healthcheck_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except CONNECTION_ERRORS:
+            return False
+
+    def _discard(self, conn):
+        self._last_used.pop(id(conn), None)
+        try:
+            self.pool.putconn(conn, close=True)
+        except Exception as e:
+            print(f"Erro ao descartar conexão: {e}")
+        with self._stats_lock:
+            self._stats["reconnects"] += 1
+
+    def _checkout(self):
+        started = time.monotonic()
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self._stats["waits"] += 1
+            if not self._slots.acquire(timeout=self.checkout_timeout):
+                with self._stats_lock:
+                    self._stats["timeouts"] += 1
+                raise PoolTimeout(f"Nenhuma conexão livre em {self.checkout_timeout}s.")
+        try:
+            conn = self.pool.getconn()
+            if not self._is_healthy(conn):
+                self._discard(conn)
+                conn = self.pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        elapsed = time.monotonic() - started
+        with self._stats_lock:
+            self._stats["in_use"] += 1
+            self._stats["checkouts"] += 1
+            self._stats["checkout_seconds_total"] += elapsed
+            self._stats["checkout_seconds_max"] = max(self._stats["checkout_seconds_max"], elapsed)
+        # Espera por uma conexão livre, separada do tempo da consulta em si
+        metrics.observe("db", "checkout", elapsed)
+        return conn
+
+    def _release(self, conn, broken=False):
+        try:
+            if broken or conn.closed:
+                self._discard(conn)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+                self.pool.putconn(conn)
+        finally:
+            with self._stats_lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Retira uma conexão do pool durante o bloco `with` e a devolve ao final.
+
+        Em caso de erro a transação é desfeita; se a conexão estiver quebrada, ela é
+        descartada e o pool abre uma nova na próxima retirada.
+        """
+        conn = self._checkout()
+        broken = False
+        try:
+            yield conn
+        except CONNECTION_ERRORS:
+            broken = True
+            raise
+        except Exception:
+            try:
+                conn.rollback()
+            except CONNECTION_ERRORS:
+                broken = True
+            raise
+        finally:
+            self._release(conn, broken=broken)
+
+    def pool_stats(self):
+        """
+        Métricas do pool de conexões.
+
+        Returns:
+            dict: Conexões em uso, retiradas, esperas, timeouts, reconexões e latência de retirada.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["max_connections"] = self.max_connections
+        stats["checkout_seconds_avg"] = (
+            stats["checkout_seconds_total"] / stats["checkouts"] if stats["checkouts"] else 0.0
         )
+        return stats
 
+    @metrics.timed("db")
     def execute(self, query, params=None):
         try:
-            with self.conn.cursor() as cursor:
+            with self.connection() as conn, conn.cursor() as cursor:
                 cursor.execute(query, params)
                 if query.strip().upper().startswith("SELECT"):
                     return cursor.fetchall()
                 else:
-                    self.conn.commit()
+                    conn.commit()
                     return None
         except Exception as e:
-            self.conn.rollback()
             print(f"Erro ao executar a consulta: {e}")
             return None
 
     def close(self):
-        if self.conn:
-            self.conn.close()
+        if self._pool:
+            self._pool.closeall()
+
+    @metrics.timed("db")
+    def list_dogs(self, limit=50, after=None, search=None):
+        """
+        Página da listagem de cães, dos mais recentes para os mais antigos, só com as
+        colunas exibidas (sem os vetores).
 
-    def fetch_dogs_from_database(self):
+        A paginação é por chave (keyset) em (created_at, dog_id): a próxima página começa
+        depois do último cão da anterior, então o custo não cresce com o número da página.
+        Usa o índice `dogs_listing_idx` (postgres/migrations/007).
+
+        Args:
+            limit (int): Máximo de cães retornados.
+            after (tuple): (created_at, dog_id) do último cão da página anterior; None na primeira.
+            search (str): Trecho do nome (sem diferenciar maiúsculas); None ou vazio lista todos.
+
+        Returns:
+            list: Tuplas (dog_id, dog_name, image_path, created_at).
+        """
+        conditions = []
+        params = []
+        if after is not None:
+            conditions.append("(created_at, dog_id) < (%s, %s)")
+            params.extend(after)
+        if search:
+            # % e _ digitados pelo usuário são literais, não curingas
+            escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append("dog_name ILIKE %s")
+            params.append(f"%{escaped}%")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
         try:
-            query = "SELECT * FROM dogs"
-            return self.execute(query) or []
+            with self.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    SELECT dog_id, dog_name, image_path, created_at
+                      FROM public.dogs {where}
+                     ORDER BY created_at DESC, dog_id DESC
+                     LIMIT %s;
+                    """,
+                    (*params, limit)
+                )
+                return cursor.fetchall()
         except Exception as e:
             print(f"Erro ao buscar dados dos cães: {e}")
             return []
 
-    def insert_dog(self, dog_name, feature_vector, image_url):
+    @metrics.timed("db")
+    def get_dog_image_path(self, dog_id):
+        """
+        Returns:
+            str: `image_path` do cão, ou None se o cão não existir ou não tiver imagem.
+        """
+        try:
+            with self.connection() as conn, conn.cursor() as cursor:
+                cursor.execute("SELECT image_path FROM public.dogs WHERE dog_id = %s;", (dog_id,))
+                row = cursor.fetchone()
+                return row[0] if row else None
+        except Exception as e:
+            print(f"Erro ao buscar a imagem do cão: {e}")
+            return None
+
+    def _insert_strategy_features(self, cursor, dog_id, strategy_features, image_url, strategy_params=None):
+        # Uma linha de `features` por estratégia; recadastrar uma estratégia substitui a linha
+        if not strategy_features:
+            return
+        strategy_params = strategy_params or {}
+        rows = []
+        for descriptor_type, feature_vector in strategy_features.items():
+            params = strategy_params.get(descriptor_type)
+            rows.append((
+                dog_id, descriptor_type, *strategy_vector_columns(feature_vector),
+                image_url, Json(params) if params is not None else None,
+            ))
+        execute_values(
+            cursor,
+            """
+            INSERT INTO public.features (dog_id, descriptor_type, feature_vector, vector_packed, image_url, params)
+            VALUES %s
+            ON CONFLICT (dog_id, descriptor_type) DO UPDATE
+               SET feature_vector = EXCLUDED.feature_vector,
+                   vector_packed = EXCLUDED.vector_packed,
+                   image_url = EXCLUDED.image_url,
+                   params = EXCLUDED.params,
+                   created_at = CURRENT_TIMESTAMP;
+            """,
+            rows,
+            template="(%s, %s, %s::vector, %s, %s, %s)",
+        )
+
+    def _insert_keypoints(self, cursor, dog_id, keypoints, keypoint_params=None):
+        # keypoints: (pontos, descritores, quantidade) já serializados (ver rerank.pack_keypoints)
+        if keypoints is None:
+            return
+        points, descriptors, count = keypoints
+        cursor.execute(
+            """
+            INSERT INTO public.dog_keypoints (dog_id, keypoint_count, points, descriptors, params)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (dog_id) DO UPDATE
+               SET keypoint_count = EXCLUDED.keypoint_count,
+                   points = EXCLUDED.points,
+                   descriptors = EXCLUDED.descriptors,
+                   params = EXCLUDED.params,
+                   created_at = CURRENT_TIMESTAMP;
+            """,
+            (dog_id, count, psycopg2.Binary(points), psycopg2.Binary(descriptors),
+             Json(keypoint_params) if keypoint_params is not None else None)
+        )
+
+    @metrics.timed("db")
+    def insert_dog(self, dog_name, feature_vector, image_url, extractor_params=None,
+                   strategy_features=None, strategy_params=None, keypoints=None, keypoint_params=None):
+        """
+        Cadastra um cão com seu vetor de características.
+
+        Args:
+            extractor_params (dict): Parâmetros de extração que geraram o vetor
+                                     (`FeatureExtractionManager.params()` + assinatura).
+            strategy_features (dict): Vetor de cada estratégia ({descriptor_type: vetor}),
+                                      gravado na tabela `features` na mesma transação.
+            strategy_params (dict): Parâmetros de cada estratégia ({descriptor_type: dict}).
+            keypoints (tuple): Keypoints SIFT brutos serializados, gravados em `dog_keypoints`.
+            keypoint_params (dict): Parâmetros do detector que gerou os keypoints.
+        """
         try:
-            with self.conn.cursor() as cursor:
+            with self.connection() as conn, conn.cursor() as cursor:
                 query = """
-                INSERT INTO public.dogs (dog_name, feature_vector, image_path, created_at)
-                VALUES (%s, %s, %s, CURRENT_TIMESTAMP) RETURNING dog_id;
+                INSERT INTO public.dogs (dog_name, feature_vector, feature_packed, embedding, image_path, created_at, extractor_params)
+                VALUES (%s, %s, %s, %s::vector, %s, CURRENT_TIMESTAMP, %s) RETURNING dog_id;
                 """
-                cursor.execute(query, (dog_name, feature_vector, image_url))
+                params = Json(extractor_params) if extractor_params is not None else None
+                cursor.execute(query, (dog_name, *dog_vector_columns(feature_vector), image_url, params))
                 dog_id = cursor.fetchone()[0]
-                self.conn.commit()
+                self._insert_strategy_features(cursor, dog_id, strategy_features, image_url, strategy_params)
+                self._insert_keypoints(cursor, dog_id, keypoints, keypoint_params)
+                conn.commit()
                 return dog_id
         except Exception as e:
-            self.conn.rollback()
             print(f"Erro ao inserir cachorro: {e}")
             return None
 
+    @metrics.timed("db")
+    def insert_dogs(self, dogs, extractor_params=None, strategy_params=None, keypoint_params=None):
+        """
+        Cadastra vários cães em uma única transação, com um único INSERT multi-linha.
+
+        Args:
+            dogs (list): Tuplas (dog_name, feature_vector, image_url), opcionalmente seguidas
+                         de strategy_features e keypoints.
+            extractor_params (dict): Parâmetros de extração comuns a todos os vetores.
+            strategy_params (dict): Parâmetros de cada estratégia ({descriptor_type: dict}).
+            keypoint_params (dict): Parâmetros do detector que gerou os keypoints.
+
+        Returns:
+            list: IDs dos cães, na mesma ordem de `dogs`, ou None em caso de erro
+                  (nesse caso nenhum cão é cadastrado).
+        """
+        if not dogs:
+            return []
+        params = Json(extractor_params) if extractor_params is not None else None
+        try:
+            with self.connection() as conn, conn.cursor() as cursor:
+                query = """
+                INSERT INTO public.dogs (dog_name, feature_vector, feature_packed, embedding, image_path, created_at, extractor_params)
+                VALUES %s RETURNING dog_id;
+                """
+                rows = execute_values(
+                    cursor,
+                    query,
+                    [(dog[0], *dog_vector_columns(dog[1]), dog[2], params) for dog in dogs],
+                    template="(%s, %s, %s, %s::vector, %s, CURRENT_TIMESTAMP, %s)",
+                    page_size=len(dogs),
+                    fetch=True,
+                )
+                dog_ids = [row[0] for row in rows]
+                for dog_id, dog in zip(dog_ids, dogs):
+                    if len(dog) > 3:
+                        self._insert_strategy_features(cursor, dog_id, dog[3], dog[2], strategy_params)
+                    if len(dog) > 4:
+                        self._insert_keypoints(cursor, dog_id, dog[4], keypoint_params)
+                conn.commit()
+                return dog_ids
+        except Exception as e:
+            print(f"Erro ao inserir cachorros em lote: {e}")
+            return None
+
+    @metrics.timed("db")
+    def insert_enrollment_job(self, dog_name, image_url):
+        """
+        Enfileira um cadastro assíncrono.
+
+        Returns:
+            int: ID do job criado, ou None em caso de erro.
+        """
+        try:
+            with self.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO public.enrollment_jobs (dog_name, image_url)
+                    VALUES (%s, %s) RETURNING job_id;
+                    """,
+                    (dog_name, image_url)
+                )
+                job_id = cursor.fetchone()[0]
+                conn.commit()
+                return job_id
+        except Exception as e:
+            print(f"Erro ao enfileirar cadastro: {e}")
+            return None
+
+    @metrics.timed("db")
+    def claim_enrollment_job(self):
+        """
+        Retira o próximo job pendente da fila, marcando-o como 'running'.
+
+        Usa FOR UPDATE SKIP LOCKED para que vários workers (e instâncias) nunca peguem o
+        mesmo job. Cada retirada grava um `claim_token` novo, exigido para concluir ou
+        marcar o job como falho.
+
+        Returns:
+            tuple: (job_id, dog_name, image_url, attempts, claim_token) ou None se a fila
+                   estiver vazia.
+        """
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE public.enrollment_jobs
+                   SET status = 'running', started_at = CURRENT_TIMESTAMP, attempts = attempts + 1,
+                       claim_token = gen_random_uuid()
+                 WHERE job_id = (
+                       SELECT job_id FROM public.enrollment_jobs
+                        WHERE status = 'queued'
+                        ORDER BY job_id
+                        FOR UPDATE SKIP LOCKED
+                        LIMIT 1)
+                RETURNING job_id, dog_name, image_url, attempts, claim_token::text;
+                """
+            )
+            job = cursor.fetchone()
+            conn.commit()
+            return job
+
+    @metrics.timed("db")
+    def complete_enrollment_job(self, job_id, claim_token, dog_name, feature_vector, image_url, extractor_params=None,
+                                strategy_features=None, strategy_params=None, keypoints=None, keypoint_params=None):
+        """
+        Cadastra o cão do job e marca o job como concluído na mesma transação, assim um
+        job nunca gera dois cadastros, mesmo se o worker cair logo após o INSERT.
+
+        O job só é concluído se ainda estiver 'running' com o `claim_token` deste worker;
+        se ele foi devolvido à fila (e talvez retirado por outro worker), nada é gravado.
+
+        Returns:
+            int: ID do cão cadastrado, ou None se o worker perdeu a reserva do job.
+        """
+        params = Json(extractor_params) if extractor_params is not None else None
+        with self.connection() as conn, conn.cursor() as cursor:
+            # Trava a linha do job antes do cadastro: a recuperação de jobs parados espera
+            # esta transação terminar e então não encontra mais o job em 'running'
+            cursor.execute(
+                """
+                UPDATE public.enrollment_jobs
+                   SET status = 'done', error = NULL, finished_at = CURRENT_TIMESTAMP
+                 WHERE job_id = %s AND status = 'running' AND claim_token = %s::uuid;
+                """,
+                (job_id, claim_token)
+            )
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return None
+            cursor.execute(
+                """
+                INSERT INTO public.dogs (dog_name, feature_vector, feature_packed, embedding, image_path, created_at, extractor_params)
+                VALUES (%s, %s, %s, %s::vector, %s, CURRENT_TIMESTAMP, %s) RETURNING dog_id;
+                """,
+                (dog_name, *dog_vector_columns(feature_vector), image_url, params)
+            )
+            dog_id = cursor.fetchone()[0]
+            self._insert_strategy_features(cursor, dog_id, strategy_features, image_url, strategy_params)
+            self._insert_keypoints(cursor, dog_id, keypoints, keypoint_params)
+            cursor.execute(
+                "UPDATE public.enrollment_jobs SET dog_id = %s WHERE job_id = %s;",
+                (dog_id, job_id)
+            )
+            conn.commit()
+            return dog_id
+
+    @metrics.timed("db")
+    def fail_enrollment_job(self, job_id, claim_token, error, retry=False):
+        """
+        Marca o job como falho, ou o devolve à fila se `retry` for True. Não altera o job
+        se o worker já perdeu a reserva dele (`claim_token`).
+        """
+        try:
+            with self.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    UPDATE public.enrollment_jobs
+                       SET status = %s, error = %s,
+                           finished_at = CASE WHEN %s THEN NULL ELSE CURRENT_TIMESTAMP END,
+                           claim_token = NULL
+                     WHERE job_id = %s AND status = 'running' AND claim_token = %s::uuid;
+                    """,
+                    ("queued" if retry else "failed", error, retry, job_id, claim_token)
+                )
+                conn.commit()
+        except Exception as e:
+            print(f"Erro ao atualizar job {job_id}: {e}")
+
+    @metrics.timed("db")
+    def requeue_stale_enrollment_jobs(self, stale_seconds, max_attempts):
+        """
+        Devolve à fila jobs 'running' parados há mais de `stale_seconds` (por exemplo,
+        quando a instância que os processava foi reiniciada). Jobs que já usaram
+        `max_attempts` tentativas são marcados como 'failed' em vez de voltar à fila.
+
+        Em ambos os casos o `claim_token` é apagado, então o worker antigo, se ainda
+        estiver vivo, não consegue mais concluir nem marcar o job.
+
+        Returns:
+            int: Quantidade de jobs devolvidos à fila ou marcados como falhos.
+        """
+        try:
+            with self.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    UPDATE public.enrollment_jobs
+                       SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'queued' END,
+                           error = CASE WHEN attempts >= %s
+                                        THEN 'Job parado em todas as tentativas' ELSE error END,
+                           finished_at = CASE WHEN attempts >= %s THEN CURRENT_TIMESTAMP END,
+                           claim_token = NULL
+                     WHERE status = 'running'
+                       AND started_at < CURRENT_TIMESTAMP - make_interval(secs => %s);
+                    """,
+                    (max_attempts, max_attempts, max_attempts, stale_seconds)
+                )
+                conn.commit()
+                return cursor.rowcount
+        except Exception as e:
+            print(f"Erro ao recuperar jobs parados: {e}")
+            return 0
+
+    @metrics.timed("db")
+    def get_enrollment_job(self, job_id):
+        """
+        Returns:
+            dict: Estado do job, ou None se não existir.
+        """
+        try:
+            with self.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT job_id, status, dog_name, image_url, dog_id, error, attempts,
+                           created_at, started_at, finished_at
+                      FROM public.enrollment_jobs WHERE job_id = %s;
+                    """,
+                    (job_id,)
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    return None
+                return dict(zip([column.name for column in cursor.description], row))
+        except Exception as e:
+            print(f"Erro ao buscar job {job_id}: {e}")
+            return None
+
     def insert_dog1(self, dog_name, feature_vector, image_url):
         try:
-            with self.conn.cursor() as cursor:
+            with self.connection() as conn, conn.cursor() as cursor:
                 query = """
                 INSERT INTO public.dogs (dog_name, feature_vector, image_path, created_at, is_registered)
                 VALUES (%s, %s, %s, CURRENT_TIMESTAMP, FALSE) RETURNING dog_id;
                 """
                 cursor.execute(query, (dog_name, feature_vector, image_url))
                 dog_id = cursor.fetchone()[0]
-                self.conn.commit()
+                conn.commit()
                 return dog_id
         except Exception as e:
-            self.conn.rollback()
             print(f"Erro ao inserir cachorro: {e}")
             return None
 
-    def get_saved_features(self):
+    @metrics.timed("db")
+    def get_dog_images(self):
+        """
+        Returns:
+            list: Tuplas (dog_id, image_path) de todos os cães com imagem, em ordem de `dog_id`.
+        """
         try:
-            with self.conn.cursor() as cursor:
-                cursor.execute("SELECT dog_id, feature_vector FROM public.dogs;")
+            with self.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT dog_id, image_path FROM public.dogs WHERE image_path IS NOT NULL ORDER BY dog_id;"
+                )
                 return cursor.fetchall()
+        except Exception as e:
+            print(f"Erro ao buscar imagens dos cães: {e}")
+            return []
+
+    @metrics.timed("db")
+    def get_saved_features(self):
+        """
+        Returns:
+            list: Tuplas (dog_id, feature_vector); o vetor vem da coluna compacta
+                  (np.array float16) quando preenchida, senão do float8[] original.
+        """
+        try:
+            with self.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT dog_id, feature_packed,
+                           CASE WHEN feature_packed IS NULL THEN feature_vector END
+                      FROM public.dogs;
+                    """
+                )
+                return unpack_rows(cursor.fetchall())
         except Exception as e:
             print(f"Erro ao buscar características salvas: {e}")
             return []
 
+    @metrics.timed("db")
+    def get_saved_features_since(self, last_dog_id, limit=None, exclude=None):
+        """
+        Busca apenas os cães cadastrados depois da marca d'água informada.
+
+        Args:
+            last_dog_id (int): Maior `dog_id` já carregado pela galeria em cache.
+            limit (int): Máximo de linhas retornadas (paginação por `dog_id`); None retorna todas.
+            exclude (list): IDs acima de `last_dog_id` que não devem ser retornados (já carregados).
+
+        Returns:
+            list: Tuplas (dog_id, feature_vector) em ordem crescente de `dog_id`
+                  (mesmo formato de `get_saved_features`).
+        """
+        try:
+            with self.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT dog_id, feature_packed,
+                           CASE WHEN feature_packed IS NULL THEN feature_vector END
+                      FROM public.dogs
+                     WHERE dog_id > %s AND NOT (dog_id = ANY(%s::int[]))
+                     ORDER BY dog_id LIMIT %s;
+                    """,
+                    (last_dog_id, list(exclude or []), limit)
+                )
+                return unpack_rows(cursor.fetchall())
+        except Exception as e:
+            print(f"Erro ao buscar características novas: {e}")
+            return []
+
+    @metrics.timed("db")
+    def get_dog_vectors(self, dog_ids):
+        """
+        Vetores originais de alguns cães, por exemplo para a pontuação exata dos
+        sobreviventes de uma busca aproximada.
+
+        Returns:
+            list: Tuplas (dog_id, feature_vector) no formato de `get_saved_features`.
+        """
+        if not dog_ids:
+            return []
+        try:
+            with self.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT dog_id, feature_packed,
+                           CASE WHEN feature_packed IS NULL THEN feature_vector END
+                      FROM public.dogs WHERE dog_id = ANY(%s);
+                    """,
+                    (list(dog_ids),)
+                )
+                return unpack_rows(cursor.fetchall())
+        except Exception as e:
+            print(f"Erro ao buscar vetores dos cães: {e}")
+            return []
+
+    @metrics.timed("db")
+    def save_dog_keypoints(self, dog_id, keypoints, keypoint_params=None):
+        """
+        Grava (ou substitui) os keypoints brutos de um cão já cadastrado.
+
+        Returns:
+            int: ID do cão, ou None em caso de erro.
+        """
+        try:
+            with self.connection() as conn, conn.cursor() as cursor:
+                self._insert_keypoints(cursor, dog_id, keypoints, keypoint_params)
+                conn.commit()
+                return dog_id
+        except Exception as e:
+            print(f"Erro ao gravar keypoints: {e}")
+            return None
+
+    @metrics.timed("db")
+    def get_dog_keypoints(self, dog_ids):
+        """
+        Args:
+            dog_ids (list): IDs dos cães.
+
+        Returns:
+            list: Tuplas (dog_id, points, descriptors) dos cães que têm keypoints guardados.
+        """
+        if not dog_ids:
+            return []
+        try:
+            with self.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT dog_id, points, descriptors FROM public.dog_keypoints WHERE dog_id = ANY(%s);",
+                    (list(dog_ids),)
+                )
+                return cursor.fetchall()
+        except Exception as e:
+            print(f"Erro ao buscar keypoints: {e}")
+            return []
+
+    @metrics.timed("db")
+    def get_dogs_without_keypoints(self):
+        """
+        Returns:
+            list: Tuplas (dog_id, image_path) dos cães com imagem e sem keypoints guardados.
+        """
+        try:
+            with self.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT d.dog_id, d.image_path FROM public.dogs d
+                     WHERE d.image_path IS NOT NULL
+                       AND NOT EXISTS (SELECT 1 FROM public.dog_keypoints k WHERE k.dog_id = d.dog_id)
+                     ORDER BY d.dog_id;
+                    """
+                )
+                return cursor.fetchall()
+        except Exception as e:
+            print(f"Erro ao buscar cães sem keypoints: {e}")
+            return []
+
+    @metrics.timed("db")
+    def get_strategy_features_since(self, since=None, exclude=None):
+        """
+        Busca os vetores por estratégia (tabela `features`) gravados ou alterados depois da
+        marca d'água (coluna `updated_at`, postgres/migrations/008).
+
+        Args:
+            since (datetime): Carrega as linhas com `updated_at` posterior; None carrega tudo.
+            exclude (list): Pares (id, updated_at) já carregados, que não devem ser retornados.
+
+        Returns:
+            list: Tuplas (id, dog_id, descriptor_type, updated_at, feature_vector) em ordem
+                  crescente de `updated_at`.
+        """
+        exclude = exclude or []
+        try:
+            with self.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT f.id, f.dog_id, f.descriptor_type, f.updated_at, f.vector_packed,
+                           CASE WHEN f.vector_packed IS NULL THEN f.feature_vector::real[] END
+                      FROM public.features f
+                     WHERE (%s::timestamptz IS NULL OR f.updated_at > %s::timestamptz)
+                       AND NOT EXISTS (
+                           SELECT 1 FROM unnest(%s::int[], %s::timestamptz[]) AS seen(id, updated_at)
+                            WHERE seen.id = f.id AND seen.updated_at = f.updated_at)
+                     ORDER BY f.updated_at, f.id;
+                    """,
+                    (since, since, [row[0] for row in exclude], [row[1] for row in exclude])
+                )
+                return unpack_rows(cursor.fetchall())
+        except Exception as e:
+            print(f"Erro ao buscar características por estratégia: {e}")
+            return []
+
+    def pack_stored_vectors(self, batch_size=1000):
+        """
+        Compacta as linhas que ainda têm o vetor original (`dogs.feature_vector`,
+        `features.feature_vector`), em lotes: grava a coluna compacta (`feature_packed`,
+        `vector_packed`) e apaga o original (postgres/migrations/010 e 011). Vetores que não
+        cabem no formato compacto mantêm só o original.
+
+        Returns:
+            tuple: (linhas convertidas em dogs, linhas convertidas em features).
+        """
+        tables = (
+            ("dogs", "dog_id", "feature_vector", "feature_vector", "feature_packed"),
+            ("features", "id", "feature_vector", "feature_vector::real[]", "vector_packed"),
+        )
+        counts = []
+        for table, key, original, source, target in tables:
+            converted = 0
+            last_key = 0
+            while True:
+                with self.connection() as conn, conn.cursor() as cursor:
+                    cursor.execute(
+                        f"""
+                        SELECT {key}, {source} FROM public.{table}
+                         WHERE {original} IS NOT NULL AND {key} > %s
+                         ORDER BY {key} LIMIT %s;
+                        """,
+                        (last_key, batch_size)
+                    )
+                    rows = cursor.fetchall()
+                    if not rows:
+                        break
+                    last_key = rows[-1][0]
+                    packed = [(row_key, packed_binary(vector)) for row_key, vector in rows if vector is not None]
+                    packed = [row for row in packed if row[1] is not None]
+                    if packed:
+                        execute_values(
+                            cursor,
+                            f"""
+                            UPDATE public.{table} AS t SET {target} = v.packed, {original} = NULL
+                              FROM (VALUES %s) AS v(row_key, packed)
+                             WHERE t.{key} = v.row_key;
+                            """,
+                            packed,
+                            template="(%s, %s::bytea)",
+                        )
+                    conn.commit()
+                    converted += len(packed)
+            counts.append(converted)
+        return tuple(counts)
+
+    @metrics.timed("db")
+    def search_nearest(self, feature_vector, metric="euclidean", k=1, max_distance=None):
+        """
+        Busca os cães mais próximos diretamente no Postgres, usando o índice pgvector.
+
+        Requer a coluna `embedding` criada por `postgres/migrations/001_dogs_embedding.sql`.
+
+        Args:
+            feature_vector (list): Vetor de características da consulta.
+            metric (str): 'euclidean' (operador <->) ou 'cosine' (operador <=>).
+            k (int): Quantidade máxima de cães retornados.
+            max_distance (float): Se informado, descarta cães mais distantes que esse valor.
+                                  É só um filtro sobre as linhas que o índice produz: a
+                                  varredura não para na distância, só no LIMIT k (e, no
+                                  HNSW, em até `hnsw.ef_search` candidatos). Com um limite
+                                  apertado, a busca pode devolver menos de k cães mesmo
+                                  havendo outros dentro do limite.
+
+        Returns:
+            list: Tuplas (dog_id, distância) em ordem crescente de distância.
+                  Para 'cosine' a distância é 1 - similaridade.
+        """
+        operator = PGVECTOR_OPERATORS.get(metric)
+        if operator is None:
+            raise ValueError(f"Métrica inválida para pgvector: '{metric}'.")
+        vector = vector_literal(feature_vector)
+        params = [vector]
+        distance_filter = ""
+        if max_distance is not None:
+            distance_filter = f"AND embedding {operator} %s::vector <= %s"
+            params += [vector, max_distance]
+        params += [vector, k]
+        query = f"""
+        SELECT dog_id, embedding {operator} %s::vector AS distance
+        FROM public.dogs
+        WHERE embedding IS NOT NULL {distance_filter}
+        ORDER BY embedding {operator} %s::vector
+        LIMIT %s;
+        """
+        try:
+            with self.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(query, params)
+                return cursor.fetchall()
+        except Exception as e:
+            print(f"Erro na busca vetorial: {e}")
+            raise
+
+    @metrics.timed("db")
     def get_dog_features(self, dog_id):
         try:
-            with self.conn.cursor() as cursor:
+            with self.connection() as conn, conn.cursor() as cursor:
                 cursor.execute("SELECT * FROM dogs WHERE dog_id = %s;", (dog_id,))
                 return cursor.fetchall()
         except Exception as e:
             print(f"Erro ao buscar características salvas: {e}")
             return []
 
-    def save_features_to_db(self, dog_id, feature_vector, image_url, mean_color):
+    @metrics.timed("db")
+    def save_features_to_db(self, dog_id, strategy_features, image_url, strategy_params=None):
+        """
+        Grava (ou substitui) os vetores por estratégia de um cão já cadastrado, por exemplo
+        ao incluir uma estratégia nova sem recadastrar a galeria inteira.
+
+        Args:
+            dog_id (int): ID do cão.
+            strategy_features (dict): {descriptor_type: vetor}.
+            image_url (str): URL da imagem de origem.
+            strategy_params (dict): Parâmetros de cada estratégia ({descriptor_type: dict}).
+
+        Returns:
+            int: ID do cão, ou None em caso de erro.
+        """
         try:
-            with self.conn.cursor() as cursor:
-                query = """
-                INSERT INTO public.features (dog_id, feature_vector, image_url, mean_color, data_criacao)
-                VALUES (%s, %s, %s, %s, CURRENT_DATE) RETURNING dog_id;
-                """
-                cursor.execute(query, (dog_id, str(feature_vector), image_url, str(mean_color)))
-                result = cursor.fetchone()[0]
-                self.conn.commit()
-                return result
+            with self.connection() as conn, conn.cursor() as cursor:
+                self._insert_strategy_features(cursor, dog_id, strategy_features, image_url, strategy_params)
+                conn.commit()
+                return dog_id
         except Exception as e:
-            self.conn.rollback()
             print(f"Erro ao inserir features: {e}")
             return None
@@ -0,0 +1,111 @@
+# src/extraction_engine.py
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+
+class EngineBusy(RuntimeError):
+    """Há extrações demais em andamento; a requisição não entrou na fila a tempo."""
+
+
+# Gerenciador de extração do processo worker, criado uma vez pelo inicializador do pool
+_worker_manager = None
+
+
+def _worker_init(manager):
+    global _worker_manager
+    _worker_manager = manager
+    _worker_manager.warmup()
+
+
+def _worker_extract(shm_name, size, names):
+    # Importado aqui: o módulo é carregado também no processo web, que não precisa dele
+    from image_data import ImageData
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        image = ImageData(
+            data=shm.buf[:size],
+            max_side=_worker_manager.max_side,
+            reduced_decode=_worker_manager.reduced_decode,
+        )
+        try:
+            return _worker_manager.extract_features_by_strategy(image, names=names)
+        finally:
+            # As visões precisam ser liberadas antes de fechar a memória compartilhada
+            image.data = None
+            del image
+    finally:
+        shm.close()
+
+
+class ProcessExtractionEngine:
+    """
+    Executa a extração de features em um pool de processos pré-criados.
+
+    Cada processo recebe uma cópia do `FeatureExtractionManager` na inicialização e
+    pré-aquece os detectores; assim um único processo web usa todos os núcleos na
+    extração, sem sofrer com o GIL, e o lado HTTP continua leve.
+
+    As imagens vão para os workers por memória compartilhada (`SharedMemory`): só o nome
+    do segmento e o tamanho passam pelo pickle, e o worker decodifica direto do buffer.
+    O número de extrações em andamento é limitado por `max_pending`; acima disso,
+    `extract` espera até `submit_timeout` segundos e então lança `EngineBusy`.
+    """
+
+    def __init__(self, manager, processes, max_pending=None, submit_timeout=30.0):
+        """
+        Args:
+            manager (FeatureExtractionManager): Gerenciador copiado para cada processo.
+            processes (int): Quantidade de processos do pool.
+            max_pending (int): Máximo de extrações em andamento (padrão: 2 x processos).
+            submit_timeout (float): Espera máxima por uma vaga, em segundos.
+        """
+        self.processes = processes
+        self.max_pending = max_pending or 2 * processes
+        self.submit_timeout = submit_timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        # 'spawn' evita herdar threads e conexões do processo web por fork
+        self._executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_worker_init,
+            initargs=(manager,),
+        )
+
+    def extract(self, data, names=None):
+        """
+        Extrai as features dos bytes codificados de uma imagem em um processo do pool.
+
+        Args:
+            data (bytes): Conteúdo da imagem (JPEG, PNG, ...).
+            names (list): Estratégias a executar (padrão: todas).
+
+        Returns:
+            dict: {nome da estratégia: vetor}, na ordem das estratégias.
+
+        Raises:
+            EngineBusy: Se nenhuma vaga abrir dentro de `submit_timeout`.
+        """
+        if not self._slots.acquire(timeout=self.submit_timeout):
+            raise EngineBusy(f"Mais de {self.max_pending} extrações em andamento.")
+        shm = None
+        try:
+            shm = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+            shm.buf[:len(data)] = data
+            return self._executor.submit(_worker_extract, shm.name, len(data), names).result()
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+            self._slots.release()
+
+    def warmup(self):
+        """Garante que todos os processos do pool estejam iniciados e inicializados."""
+        futures = [self._executor.submit(int) for _ in range(self.processes)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
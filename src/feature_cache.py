@@ -0,0 +1,103 @@
+# src/feature_cache.py
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import metrics
+from cache_store import DiskStore
+
+
+class FeatureCache:
+    """
+    Cache de vetores já extraídos, para não repetir a extração da mesma foto.
+
+    A chave combina o hash (sha256) dos bytes da imagem com a assinatura do pipeline de
+    extração (`FeatureExtractionManager.signature()`), então qualquer mudança nas
+    estratégias ou nos seus parâmetros gera chaves novas. Como a chave depende do
+    conteúdo, a imagem ainda é baixada (ou lida do `ImageCache`); um acerto evita só a
+    decodificação e as estratégias. Há um nível em memória (LRU limitado por quantidade
+    de entradas) e um nível opcional em disco (`cache_store.DiskStore`, arquivos .npy).
+    """
+
+    def __init__(self, max_entries=1024, disk_dir=None, disk_max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.disk = DiskStore(disk_dir, disk_max_bytes, suffix=".npy") if disk_dir else None
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(image_bytes, signature):
+        """Chave do vetor: sha256 do conteúdo da imagem + assinatura do pipeline."""
+        return f"{hashlib.sha256(image_bytes).hexdigest()}-{signature}"
+
+    def get(self, key):
+        """
+        Returns:
+            list: Cópia do vetor em cache, ou None.
+        """
+        with self._lock:
+            features = self._entries.get(key)
+            if features is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.CACHE_REQUESTS.inc(cache="feature", result="hit")
+                return list(features)
+
+        features = self._read_disk(key)
+        with self._lock:
+            if features is None:
+                self.misses += 1
+                metrics.CACHE_REQUESTS.inc(cache="feature", result="miss")
+                return None
+            self.disk_hits += 1
+        metrics.CACHE_REQUESTS.inc(cache="feature", result="disk_hit")
+        self._store_memory(key, features)
+        return list(features)
+
+    def put(self, key, features):
+        self._store_memory(key, list(features))
+        self._write_disk(key, features)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            stats = {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+        if self.disk:
+            stats["disk"] = self.disk.stats()
+        return stats
+
+    def _store_memory(self, key, features):
+        with self._lock:
+            self._entries[key] = features
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _read_disk(self, key):
+        data = self.disk.read(key) if self.disk else None
+        if data is None:
+            return None
+        try:
+            return np.load(io.BytesIO(data)).tolist()
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, features):
+        if not self.disk:
+            return
+        buffer = io.BytesIO()
+        np.save(buffer, np.asarray(features, dtype=np.float64))
+        self.disk.write(key, buffer.getvalue())
@@ -1,11 +1,19 @@
 # src/feature_extraction_manager.py
-import requests
-from PIL import Image
-from io import BytesIO
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from image_data import ImageData, as_image_data, load_image_bytes
 
 
 from features import FeatureExtractor
 
+logger = logging.getLogger(__name__)
+
 class FeatureExtractionContext:
     def __init__(self, extractor: FeatureExtractor):
         self._extractor = extractor
@@ -18,57 +26,257 @@ class FeatureExtractionContext:
 
 
 class FeatureExtractionManager:
-    def __init__(self, strategies):
+    def __init__(self, strategies, max_side=None, reduced_decode=False, strategy_workers=0):
         """
         Inicializa o gerenciador com uma lista de estratégias de extração.
         
         Args:
             strategies (list): Lista de instâncias de extratores de features.
+            max_side (int): Etapa de normalização: limita o maior lado da imagem antes das
+                            estratégias (None ou 0 desativa). Cadastro e consulta devem usar
+                            o mesmo valor, pois ele altera os vetores gerados.
+            reduced_decode (bool): Decodifica JPEGs grandes já reduzidos (1/2, 1/4, 1/8).
+            strategy_workers (int): Modo paralelo: executa as estratégias de uma mesma imagem
+                                    simultaneamente em um pool de threads compartilhado com
+                                    esse tamanho (0 executa em sequência).
         """
         self.strategies = strategies
+        self.max_side = max_side or None
+        self.reduced_decode = reduced_decode
+        self.strategy_workers = strategy_workers
+        self.engine = None
+        self.feature_cache = None
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def __getstate__(self):
+        # O engine (pool de processos) não é enviado aos próprios workers
+        state = self.__dict__.copy()
+        state["engine"] = None
+        state["feature_cache"] = None
+        state["_executor"] = None
+        del state["_executor_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._executor_lock = threading.Lock()
+
+    def set_engine(self, engine):
+        """
+        Direciona a extração para um engine externo (ex.: `ProcessExtractionEngine`).
+
+        Com engine, `extract_features` só obtém os bytes da imagem neste processo; a
+        decodificação e as estratégias rodam no engine. None volta a extrair na thread atual.
+        """
+        self.engine = engine
+
+    def set_feature_cache(self, feature_cache):
+        """
+        Ativa o cache de vetores (`FeatureCache`): imagens com o mesmo conteúdo, extraídas
+        com a mesma configuração, não passam de novo pelas estratégias.
+        """
+        self.feature_cache = feature_cache
+
+    def params(self):
+        """
+        Parâmetros completos do pipeline (normalização + cada estratégia), gravados junto
+        a cada vetor cadastrado para saber exatamente como ele foi gerado.
+
+        Returns:
+            dict: Parâmetros serializáveis em JSON.
+        """
+        return {
+            "max_side": self.max_side,
+            "reduced_decode": self.reduced_decode,
+            "strategies": [
+                getattr(strategy, "params", {"strategy": strategy.__class__.__name__})
+                for strategy in self.strategies
+            ],
+        }
+
+    def signature(self):
+        """Hash curto e estável de `params()`; muda sempre que a configuração muda."""
+        encoded = json.dumps(self.params(), sort_keys=True).encode("utf-8")
+        return hashlib.sha1(encoded).hexdigest()[:16]
+
+    @staticmethod
+    def strategy_name(strategy):
+        """Nome da estratégia, usado como `descriptor_type` na tabela `features`."""
+        return getattr(strategy, "name", strategy.__class__.__name__)
+
+    def strategy_names(self):
+        return [self.strategy_name(strategy) for strategy in self.strategies]
+
+    def strategy_params(self, strategy):
+        """
+        Parâmetros de uma única estratégia, com a normalização de resolução que a precede.
+        Vetores de uma estratégia só são comparáveis entre si se estes parâmetros forem iguais.
+        """
+        return {
+            "max_side": self.max_side,
+            "reduced_decode": self.reduced_decode,
+            "strategy": getattr(strategy, "params", {"strategy": strategy.__class__.__name__}),
+        }
+
+    def strategy_signature(self, strategy):
+        """Hash curto de `strategy_params(strategy)`."""
+        encoded = json.dumps(self.strategy_params(strategy), sort_keys=True).encode("utf-8")
+        return hashlib.sha1(encoded).hexdigest()[:16]
+
+    def strategy_records(self):
+        """
+        Registro dos parâmetros de cada estratégia, gravado junto a cada linha de `features`.
+
+        Returns:
+            dict: {nome da estratégia: parâmetros + assinatura}.
+        """
+        return {
+            self.strategy_name(strategy): dict(self.strategy_params(strategy), signature=self.strategy_signature(strategy))
+            for strategy in self.strategies
+        }
+
+    def warmup(self):
+        """Pré-aquece os detectores das estratégias na thread atual."""
+        for strategy in self.strategies:
+            if hasattr(strategy, "warmup"):
+                strategy.warmup()
+
+    def load_image(self, image_path):
+        """Carrega a imagem aplicando a etapa de normalização de resolução do gerenciador."""
+        return as_image_data(image_path, max_side=self.max_side, reduced_decode=self.reduced_decode)
+
+    def _same_pipeline(self, image):
+        return image.max_side == self.max_side and image.reduced_decode == self.reduced_decode
 
     def set_strategy(self, strategies):
             self.strategies = strategies  # Permite alternar a estratégia dinamicamente
 
-    def extract_features(self, image_path):
+    def extract_features(self, image_path, timings=None):
         """
         Extrai e combina as features de acordo com as estratégias fornecidas.
 
         Args:
-            image_path (str ou PIL.Image): URL, caminho local ou objeto PIL da imagem.
+            image_path (str, bytes, PIL.Image ou ImageData): URL, caminho local, bytes ou imagem já carregada.
+            timings (dict): Se informado, recebe o tempo de cada estratégia em milissegundos
+                            (vazio quando o vetor vem do cache ou do engine).
 
         Returns:
             list: Vetor combinado de features extraídas.
         """
-        # Verifica se `image_path` é uma URL, caminho local, ou objeto `PIL.Image`
-        if isinstance(image_path, str) and image_path.startswith("http"):
-            # Caso seja uma URL, baixa e abre a imagem
-            response = requests.get(image_path)
-            response.raise_for_status()
-            image = Image.open(BytesIO(response.content))
-        elif isinstance(image_path, str):
-            # Caso seja um caminho local, abre a imagem diretamente
-            image = Image.open(image_path)
-        elif isinstance(image_path, Image.Image):
-            # Caso já seja um objeto PIL.Image, usa diretamente
-            image = image_path
-        else:
-            raise ValueError("Invalid image_path provided. Must be a URL, local path, or PIL.Image object.")
-
         combined_features = []
+        for features in self.extract_features_by_strategy(image_path, timings=timings).values():
+            combined_features.extend(features)
+        return combined_features
 
-        for strategy in self.strategies:
-            # Extrai as features para cada estratégia
-            features = strategy.extract(image)
-            print(f"strategy: {strategy.name}")
-            print(f"Características: {features}")  # Depuração
-            # Confere se o retorno é uma lista (no caso de tolist)
-            if isinstance(features, list):
-                combined_features.extend(features)
+    def extract_features_by_strategy(self, image_path, names=None, timings=None):
+        """
+        Extrai as features de cada estratégia separadamente.
+
+        Com cache de vetores ativo, cada estratégia tem a sua própria entrada (chave com a
+        assinatura da estratégia), então incluir ou alterar uma estratégia não invalida
+        os vetores já calculados pelas demais.
+
+        Args:
+            image_path (str, bytes, PIL.Image ou ImageData): URL, caminho local, bytes ou imagem já carregada.
+            names (list): Se informado, extrai apenas as estratégias com esses nomes.
+            timings (dict): Se informado, recebe o tempo de cada estratégia em milissegundos.
+
+        Returns:
+            dict: {nome da estratégia: vetor}, na ordem das estratégias.
+        """
+        strategies = self.strategies
+        if names is not None:
+            strategies = [strategy for strategy in self.strategies if self.strategy_name(strategy) in names]
+
+        image_bytes = None
+        if self.engine is not None or self.feature_cache is not None:
+            if not isinstance(image_path, ImageData):
+                image_bytes = load_image_bytes(image_path)
+            elif image_path.data is not None and self._same_pipeline(image_path):
+                # ImageData criada por `load_image`: os bytes servem de chave do cache e de
+                # entrada do engine, e a extração local reaproveita as visões já calculadas
+                image_bytes = bytes(image_path.data)
+
+        results = {}
+        cache_keys = {}
+        if self.feature_cache is not None and image_bytes is not None:
+            for strategy in strategies:
+                name = self.strategy_name(strategy)
+                cache_keys[name] = self.feature_cache.key(image_bytes, self.strategy_signature(strategy))
+                cached = self.feature_cache.get(cache_keys[name])
+                if cached is not None:
+                    results[name] = cached
+
+        missing = [strategy for strategy in strategies if self.strategy_name(strategy) not in results]
+        if missing:
+            if self.engine is not None and image_bytes is not None:
+                with metrics.timer("extract", "engine"):
+                    extracted = self.engine.extract(image_bytes, [self.strategy_name(strategy) for strategy in missing])
+            elif isinstance(image_path, ImageData):
+                extracted = self._extract_local(image_path, missing, timings)
             else:
+                extracted = self._extract_local(image_bytes if image_bytes is not None else image_path, missing, timings)
+            for name, features in extracted.items():
+                results[name] = features
+                if name in cache_keys:
+                    self.feature_cache.put(cache_keys[name], features)
+
+        return {self.strategy_name(strategy): results[self.strategy_name(strategy)] for strategy in strategies}
+
+    def _strategy_executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.strategy_workers, thread_name_prefix="strategy"
+                    )
+        return self._executor
+
+    def shutdown(self):
+        """Encerra o pool de threads do modo paralelo, se tiver sido criado."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    @staticmethod
+    def _run_strategy(strategy, image):
+        start = time.perf_counter()
+        features = strategy.extract(image)
+        return features, (time.perf_counter() - start) * 1000.0
+
+    def _extract_local(self, image_path, strategies=None, timings=None):
+        # Baixa/decodifica a imagem uma única vez; as estratégias compartilham as visões derivadas
+        image = self.load_image(image_path)
+        strategies = self.strategies if strategies is None else strategies
+        # Decodificação + normalização medidas à parte, antes das estratégias
+        with metrics.timer("decode"):
+            image.bgr
+
+        if self.strategy_workers > 0 and len(strategies) > 1:
+            # Modo paralelo: as visões de ImageData são protegidas por lock e o OpenCV/NumPy
+            # liberam o GIL; os resultados são lidos na ordem das estratégias
+            executor = self._strategy_executor()
+            futures = [executor.submit(self._run_strategy, strategy, image) for strategy in strategies]
+            results = [future.result() for future in futures]
+        else:
+            results = [self._run_strategy(strategy, image) for strategy in strategies]
+
+        features_by_strategy = {}
+        elapsed = {}
+        for strategy, (features, elapsed_ms) in zip(strategies, results):
+            name = self.strategy_name(strategy)
+            elapsed[name] = round(elapsed_ms, 2)
+            metrics.observe("extract", name, elapsed_ms / 1000.0)
+            # Confere se o retorno é uma lista (no caso de tolist)
+            if not isinstance(features, list):
                 raise TypeError(f"Feature extraction failed: output from {strategy} is not a list.")
+            features_by_strategy[name] = features
 
-        return combined_features
+        logger.debug("Tempo por estratégia (ms): %s", elapsed)
+        if timings is not None:
+            timings.update(elapsed)
+        return features_by_strategy
 
 
 
@@ -91,19 +299,8 @@ class FeatureExtractionManager:
         Returns:
             list: Vetor combinado de features extraídas.
         """
-        # Se image_path for uma URL (string começando com 'http')
-        if isinstance(image_path, str) and image_path.startswith("http"):
-            response = requests.get(image_path)
-            response.raise_for_status()
-            image = Image.open(BytesIO(response.content))
-        elif isinstance(image_path, str):
-            # Se for um caminho local, abre a imagem
-            image = Image.open(image_path)
-        elif isinstance(image_path, Image.Image):
-            # Se for um objeto PIL.Image já, usa diretamente
-            image = image_path
-        else:
-            raise ValueError("Invalid image_path provided. Must be a URL, local path, or PIL.Image object.")
+        # Baixa/decodifica a imagem uma única vez (URL, caminho local, PIL.Image ou ImageData)
+        image = self.load_image(image_path)
 
         # Extrair as características
         combined_features = []
@@ -126,12 +323,7 @@ class FeatureExtractionManager:
             list ou dict: Vetor combinado de features ou dicionário de features por estratégia.
         """
         # Carrega a imagem, seja de URL ou do caminho local
-        if image_path.startswith("http"):
-            response = requests.get(image_path)
-            response.raise_for_status()
-            image = Image.open(BytesIO(response.content))
-        else:
-            image = Image.open(image_path)
+        image = self.load_image(image_path)
 
         if combined:
             # Combina todas as features em um único vetor
@@ -159,7 +351,7 @@ class FeatureExtractionManager:
         Returns:
             list: Vetor combinado de features extraídas.
         """
-        image = Image.open(image_url)
+        image = self.load_image(image_url)
         combined_features = []
 
         for strategy in self.strategies:
@@ -0,0 +1,753 @@
+# src/gallery.py
+import datetime
+import threading
+import time
+
+import numpy as np
+
+
+def has_vector(feature_vector):
+    """True se a linha tem vetor (lista do float8[] antigo ou np.array do formato compacto)."""
+    return feature_vector is not None and len(feature_vector) > 0
+
+
+class GalleryMatcher:
+    """
+    Galeria em memória com os vetores de características de todos os cães cadastrados.
+
+    Os vetores ficam em uma única matriz float32 contígua (um cão por linha), com as
+    normas pré-calculadas, de modo que cada consulta é resolvida com uma única
+    multiplicação matriz-vetor em vez de um laço Python por cão.
+    """
+
+    METRICS = ("euclidean", "cosine")
+
+    def __init__(self, dog_ids=None, vectors=None):
+        """
+        Args:
+            dog_ids (list): IDs dos cães, na mesma ordem das linhas de `vectors`.
+            vectors (list ou np.array): Vetores de características (um por cão).
+        """
+        if dog_ids is None or len(dog_ids) == 0:
+            ids = np.empty(0, dtype=np.int64)
+            matrix = np.empty((0, 0), dtype=np.float32)
+        else:
+            ids = np.asarray(dog_ids, dtype=np.int64)
+            matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+            if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+                raise ValueError("Os vetores da galeria devem formar uma matriz com uma linha por cão.")
+
+        sq_norms = np.einsum("ij,ij->i", matrix, matrix)
+        # O estado é trocado atomicamente como uma única tupla, assim leitores concorrentes
+        # sempre enxergam buffers e tamanho consistentes entre si.
+        self._state = (ids, matrix, sq_norms, np.sqrt(sq_norms), len(ids))
+
+    def _view(self):
+        ids, matrix, sq_norms, norms, size = self._state
+        return ids[:size], matrix[:size], sq_norms[:size], norms[:size]
+
+    @property
+    def dog_ids(self):
+        return self._view()[0]
+
+    @property
+    def matrix(self):
+        return self._view()[1]
+
+    def add(self, dog_id, feature_vector):
+        """
+        Acrescenta um cão à galeria sem reconstruir a matriz inteira.
+
+        Os buffers crescem por duplicação de capacidade; as linhas novas são escritas além
+        do tamanho visível e só então o tamanho é publicado. Chamadas concorrentes a `add`
+        devem ser serializadas por quem chama (ver `GalleryCache`).
+
+        Args:
+            dog_id (int): ID do cão.
+            feature_vector (list ou np.array): Vetor de características do cão.
+
+        Returns:
+            bool: True se o vetor foi adicionado, False se a dimensão for incompatível.
+        """
+        vector = np.asarray(feature_vector, dtype=np.float32).ravel()
+        ids, matrix, sq_norms, norms, size = self._state
+
+        if size == 0:
+            ids = np.empty(0, dtype=np.int64)
+            matrix = np.empty((0, vector.shape[0]), dtype=np.float32)
+            sq_norms = np.empty(0, dtype=np.float32)
+            norms = np.empty(0, dtype=np.float32)
+        elif vector.shape[0] != matrix.shape[1]:
+            print(f"Aviso: vetor do cão {dog_id} ignorado (dimensão {vector.shape[0]} != {matrix.shape[1]}).")
+            return False
+
+        if size == matrix.shape[0]:
+            capacity = max(16, 2 * size)
+            new_ids = np.empty(capacity, dtype=np.int64)
+            new_matrix = np.empty((capacity, matrix.shape[1]), dtype=np.float32)
+            new_sq = np.empty(capacity, dtype=np.float32)
+            new_norms = np.empty(capacity, dtype=np.float32)
+            new_ids[:size] = ids[:size]
+            new_matrix[:size] = matrix[:size]
+            new_sq[:size] = sq_norms[:size]
+            new_norms[:size] = norms[:size]
+            ids, matrix, sq_norms, norms = new_ids, new_matrix, new_sq, new_norms
+
+        sq_norm = float(np.dot(vector, vector))
+        ids[size] = dog_id
+        matrix[size] = vector
+        sq_norms[size] = sq_norm
+        norms[size] = np.sqrt(sq_norm)
+        self._state = (ids, matrix, sq_norms, norms, size + 1)
+        return True
+
+    def with_updates(self, updates):
+        """
+        Cópia da galeria com os vetores de alguns cães substituídos (por exemplo, depois de
+        um recadastro). A galeria atual não muda, então consultas em andamento continuam
+        vendo um estado consistente; quem chama publica a cópia no lugar dela.
+
+        Args:
+            updates (dict): {dog_id: vetor novo}. Cães que não estão na galeria são ignorados.
+
+        Returns:
+            GalleryMatcher: Nova galeria.
+        """
+        ids, matrix, _, _ = self._view()
+        matrix = matrix.copy()
+        for position in np.flatnonzero(np.isin(ids, list(updates))):
+            dog_id = int(ids[position])
+            vector = np.asarray(updates[dog_id], dtype=np.float32).ravel()
+            if vector.shape[0] != matrix.shape[1]:
+                print(f"Aviso: vetor do cão {dog_id} ignorado (dimensão {vector.shape[0]} != {matrix.shape[1]}).")
+                continue
+            matrix[position] = vector
+        return GalleryMatcher(ids.copy(), matrix)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Monta a galeria a partir das linhas retornadas por `DB.get_saved_features()`.
+
+        Linhas sem vetor ou com dimensão diferente da primeira linha válida são ignoradas,
+        já que não podem ser comparadas na mesma matriz.
+
+        Args:
+            rows (list): Lista de tuplas (dog_id, feature_vector).
+
+        Returns:
+            GalleryMatcher: Galeria pronta para consultas.
+        """
+        dog_ids = []
+        vectors = []
+        dim = None
+        for dog_id, feature_vector in rows:
+            if not has_vector(feature_vector):
+                continue
+            if dim is None:
+                dim = len(feature_vector)
+            if len(feature_vector) != dim:
+                print(f"Aviso: vetor do cão {dog_id} ignorado (dimensão {len(feature_vector)} != {dim}).")
+                continue
+            dog_ids.append(dog_id)
+            vectors.append(feature_vector)
+        return cls(dog_ids, vectors)
+
+    def __len__(self):
+        return self._state[4]
+
+    @property
+    def dim(self):
+        return self._state[1].shape[1]
+
+    @staticmethod
+    def _prepare_query(query, matrix):
+        query = np.asarray(query, dtype=np.float32).ravel()
+        if matrix.shape[0] and query.shape[0] != matrix.shape[1]:
+            raise ValueError(f"Dimensão do vetor de consulta ({query.shape[0]}) difere da galeria ({matrix.shape[1]}).")
+        return query
+
+    def euclidean(self, query):
+        """
+        Calcula a distância Euclidiana da consulta para todos os cães da galeria.
+
+        Usa a expansão ||a - b||² = ||a||² + ||b||² - 2·a·b, reaproveitando as normas
+        pré-calculadas da galeria.
+
+        Args:
+            query (list ou np.array): Vetor de características da imagem fornecida.
+
+        Returns:
+            np.array: Distâncias, na mesma ordem de `dog_ids`.
+        """
+        _, matrix, sq_norms, _ = self._view()
+        query = self._prepare_query(query, matrix)
+        sq_dist = sq_norms + np.dot(query, query) - 2.0 * (matrix @ query)
+        np.maximum(sq_dist, 0.0, out=sq_dist)
+        return np.sqrt(sq_dist)
+
+    def cosine(self, query):
+        """
+        Calcula a similaridade do cosseno da consulta para todos os cães da galeria.
+
+        Args:
+            query (list ou np.array): Vetor de características da imagem fornecida.
+
+        Returns:
+            np.array: Similaridades, na mesma ordem de `dog_ids` (0 para vetores nulos).
+        """
+        _, matrix, _, norms = self._view()
+        query = self._prepare_query(query, matrix)
+        denom = norms * np.linalg.norm(query)
+        dots = matrix @ query
+        return np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+
+    def cosine_scores(self, query):
+        """
+        Similaridade do cosseno junto com os IDs correspondentes (interface comum com
+        `InvertedFileIndex`, que só pontua parte da galeria).
+
+        Returns:
+            tuple: (dog_ids, similaridades).
+        """
+        return self.dog_ids, self.cosine(query)
+
+    def scores(self, query, metric):
+        """Retorna as pontuações da consulta para toda a galeria segundo a métrica."""
+        if metric == "euclidean":
+            return self.euclidean(query)
+        if metric == "cosine":
+            return self.cosine(query)
+        raise ValueError(f"Métrica inválida: '{metric}'. Métricas disponíveis: {list(self.METRICS)}")
+
+    def closest(self, query, metric):
+        """
+        Encontra o cão mais próximo da consulta.
+
+        Args:
+            query (list ou np.array): Vetor de características da imagem fornecida.
+            metric (str): 'euclidean' (menor distância) ou 'cosine' (maior similaridade).
+
+        Returns:
+            tuple: (dog_id, pontuação) do cão mais próximo, ou (None, None) se a galeria estiver vazia.
+        """
+        dog_ids = self.dog_ids
+        if not len(dog_ids):
+            return None, None
+        scores = self.scores(query, metric)[:len(dog_ids)]
+        idx = int(np.argmin(scores)) if metric == "euclidean" else int(np.argmax(scores))
+        return int(dog_ids[idx]), float(scores[idx])
+
+    def top_k(self, query, metric, k=1, threshold=None):
+        """
+        Retorna os k cães mais próximos da consulta, do melhor para o pior.
+
+        Toda a galeria é pontuada; o limiar só filtra as pontuações. A seleção parcial
+        (`np.argpartition`) sobre os candidatos que passam no limiar ordena apenas os k
+        sobreviventes em vez da galeria inteira.
+
+        Args:
+            query (list ou np.array): Vetor de características da imagem fornecida.
+            metric (str): 'euclidean' (menor distância) ou 'cosine' (maior similaridade).
+            k (int): Quantidade máxima de candidatos.
+            threshold (float): Distância máxima ('euclidean') ou similaridade mínima ('cosine').
+
+        Returns:
+            list: Tuplas (dog_id, pontuação) ordenadas da melhor para a pior.
+        """
+        dog_ids = self.dog_ids
+        if not len(dog_ids) or k <= 0:
+            return []
+        scores = self.scores(query, metric)[:len(dog_ids)]
+        # Chave de ordenação em que menor é sempre melhor
+        keys = scores if metric == "euclidean" else -scores
+
+        if threshold is None:
+            candidates = np.arange(len(keys))
+        else:
+            limit = threshold if metric == "euclidean" else -threshold
+            candidates = np.flatnonzero(keys <= limit)
+
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(keys[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(keys[candidates], kind="stable")]
+        return [(int(dog_ids[i]), float(scores[i])) for i in candidates]
+
+
+class InvertedFileIndex:
+    """
+    Índice invertido por palavra visual sobre vetores VLAD ou BoVW (ver `codebook.py`).
+
+    Nesses vetores, cada palavra do codebook ocupa um bloco (128 posições no VLAD, uma no
+    BoVW), zerado quando a palavra não aparece na imagem. O índice guarda, para cada
+    palavra, as linhas da galeria em que o bloco não é nulo. Uma consulta visita apenas as
+    listas das suas `probe` palavras de maior peso e calcula o cosseno exato somente para
+    os cães dessas listas; cães sem nenhuma palavra em comum teriam similaridade 0.
+    """
+
+    def __init__(self, n_words, probe=None):
+        """
+        Args:
+            n_words (int): Quantidade de palavras do codebook.
+            probe (int): Palavras da consulta usadas para buscar candidatos (None = todas).
+        """
+        self.n_words = n_words
+        self.probe = probe
+        self._matcher = GalleryMatcher()
+        self._postings = [[] for _ in range(n_words)]
+        # Cópias numpy das listas, refeitas só para as palavras alteradas desde a última consulta
+        self._posting_arrays = [None] * n_words
+
+    def __len__(self):
+        return len(self._matcher)
+
+    @property
+    def dog_ids(self):
+        return self._matcher.dog_ids
+
+    @property
+    def dim(self):
+        return self._matcher.dim
+
+    def _word_weights(self, vector):
+        blocks = vector.reshape(self.n_words, -1)
+        return np.linalg.norm(blocks, axis=1)
+
+    def add(self, dog_id, feature_vector):
+        """
+        Acrescenta um cão ao índice. Como em `GalleryMatcher.add`, chamadas concorrentes
+        devem ser serializadas por quem chama.
+
+        Returns:
+            bool: True se o vetor foi adicionado.
+        """
+        vector = np.asarray(feature_vector, dtype=np.float32).ravel()
+        if vector.shape[0] % self.n_words:
+            print(f"Aviso: vetor do cão {dog_id} ignorado (dimensão {vector.shape[0]} incompatível com {self.n_words} palavras).")
+            return False
+        row = len(self._matcher)
+        if not self._matcher.add(dog_id, vector):
+            return False
+        for word in np.flatnonzero(self._word_weights(vector)):
+            self._postings[word].append(row)
+            self._posting_arrays[word] = None
+        return True
+
+    def _posting(self, word):
+        array = self._posting_arrays[word]
+        if array is None:
+            array = np.asarray(self._postings[word], dtype=np.int64)
+            self._posting_arrays[word] = array
+        return array
+
+    @classmethod
+    def from_rows(cls, rows, n_words, probe=None):
+        index = cls(n_words, probe=probe)
+        for dog_id, feature_vector in rows:
+            if has_vector(feature_vector):
+                index.add(dog_id, feature_vector)
+        return index
+
+    def with_updates(self, updates):
+        """
+        Cópia do índice com os vetores de alguns cães substituídos (ver
+        `GalleryMatcher.with_updates`); as listas invertidas são refeitas do zero.
+        """
+        dog_ids, matrix, _, _ = self._matcher._view()
+        rows = ((int(dog_id), updates.get(int(dog_id), vector)) for dog_id, vector in zip(dog_ids, matrix))
+        return InvertedFileIndex.from_rows(rows, self.n_words, probe=self.probe)
+
+    def candidates(self, query, probe=None):
+        """Linhas da galeria que compartilham alguma das `probe` palavras mais fortes da consulta."""
+        weights = self._word_weights(np.asarray(query, dtype=np.float32).ravel())
+        words = np.flatnonzero(weights)
+        probe = probe or self.probe
+        if probe and len(words) > probe:
+            words = words[np.argpartition(-weights[words], probe - 1)[:probe]]
+        size = len(self._matcher)
+        postings = [self._posting(word) for word in words]
+        if not postings:
+            return np.empty(0, dtype=np.int64)
+        rows = np.unique(np.concatenate(postings))
+        # Linhas acrescentadas por um `add` concorrente ainda não publicadas
+        return rows[rows < size]
+
+    def cosine_scores(self, query, probe=None):
+        """
+        Returns:
+            tuple: (dog_ids, similaridades) apenas dos cães candidatos.
+        """
+        dog_ids, matrix, _, norms = self._matcher._view()
+        rows = self.candidates(query, probe)
+        query = GalleryMatcher._prepare_query(query, matrix)
+        if 2 * len(rows) > len(dog_ids):
+            # Com muitos candidatos, multiplicar a matriz inteira sai mais barato que copiar as linhas
+            dots = (matrix @ query)[rows]
+        else:
+            dots = matrix[rows] @ query
+        denom = norms[rows] * np.linalg.norm(query)
+        return dog_ids[rows], np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+
+    def top_k(self, query, k=1, threshold=None, probe=None):
+        """
+        Returns:
+            list: Tuplas (dog_id, similaridade do cosseno), da melhor para a pior.
+        """
+        dog_ids, scores = self.cosine_scores(query, probe)
+        if not len(dog_ids) or k <= 0:
+            return []
+        candidates = np.arange(len(scores)) if threshold is None else np.flatnonzero(scores >= threshold)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(dog_ids[i]), float(scores[i])) for i in candidates]
+
+
+class GalleryCache:
+    """
+    Cache da galeria no processo (worker), compartilhado entre as requisições.
+
+    A galeria é carregada do banco uma única vez; depois disso, só são buscados os cães
+    novos, e apenas quando o intervalo de atualização expira. Cadastros feitos neste
+    processo entram na galeria diretamente via `add`, sem ida ao banco.
+
+    Os IDs vêm de uma sequência, mas as transações não terminam na ordem dos IDs: o cão 10
+    pode ficar visível depois do 11. Por isso a busca incremental não começa na marca
+    d'água (o maior `dog_id` já carregado), e sim `refresh_window` IDs abaixo dela,
+    excluindo os IDs dessa janela que já estão na galeria.
+    """
+
+    def __init__(self, database, refresh_interval=30.0, refresh_window=1000):
+        """
+        Args:
+            database (DB): Acesso ao banco de dados.
+            refresh_interval (float): Segundos entre buscas incrementais por cães cadastrados
+                                      em outros processos. Use 0 para sempre consultar.
+            refresh_window (int): IDs abaixo da marca d'água verificados de novo a cada busca,
+                                  para pegar cadastros cuja transação terminou fora de ordem.
+        """
+        self.database = database
+        self.refresh_interval = refresh_interval
+        self.refresh_window = refresh_window
+        self._lock = threading.Lock()
+        self._matcher = None
+        self._high_water_mark = 0
+        # IDs já carregados dentro da janela (dog_id > marca d'água - refresh_window)
+        self._recent = set()
+        self._last_refresh = 0.0
+
+    def get(self):
+        """
+        Retorna a galeria atual, carregando-a ou atualizando-a quando necessário.
+
+        Returns:
+            GalleryMatcher: Galeria com os cães cadastrados.
+        """
+        matcher = self._matcher
+        if matcher is not None and time.monotonic() - self._last_refresh < self.refresh_interval:
+            return matcher
+
+        with self._lock:
+            if self._matcher is None:
+                self._load()
+            elif time.monotonic() - self._last_refresh >= self.refresh_interval:
+                self._refresh()
+            return self._matcher
+
+    def _load(self):
+        rows = self.database.get_saved_features()
+        self._matcher = GalleryMatcher.from_rows(rows)
+        self._high_water_mark = max((row[0] for row in rows), default=0)
+        self._recent = set()
+        self._remember(row[0] for row in rows)
+        self._last_refresh = time.monotonic()
+
+    def _window_floor(self):
+        return max(0, self._high_water_mark - self.refresh_window)
+
+    def _remember(self, dog_ids):
+        """Registra IDs carregados e descarta os que saíram da janela."""
+        floor = self._window_floor()
+        self._recent.update(dog_id for dog_id in dog_ids if dog_id > floor)
+        self._recent = {dog_id for dog_id in self._recent if dog_id > floor}
+
+    def _refresh(self):
+        rows = self.database.get_saved_features_since(self._window_floor(), exclude=sorted(self._recent))
+        for dog_id, feature_vector in rows:
+            self._add_locked(dog_id, feature_vector)
+        self._remember(())
+        self._last_refresh = time.monotonic()
+
+    def _add_locked(self, dog_id, feature_vector):
+        if dog_id in self._recent:
+            return
+        # Abaixo da janela só chega um `add` atrasado; o cão pode já ter vindo do banco
+        if dog_id <= self._window_floor() and dog_id in self._matcher.dog_ids:
+            return
+        if has_vector(feature_vector):
+            self._matcher.add(dog_id, feature_vector)
+        self._high_water_mark = max(self._high_water_mark, dog_id)
+        self._recent.add(dog_id)
+
+    def add(self, dog_id, feature_vector):
+        """
+        Registra na galeria um cão recém-cadastrado, sem recarregar do banco.
+
+        Se a galeria ainda não foi carregada, não faz nada: o cão virá na carga inicial.
+
+        Args:
+            dog_id (int): ID retornado por `DB.insert_dog`.
+            feature_vector (list): Vetor de características do cão.
+        """
+        if dog_id is None:
+            return
+        with self._lock:
+            if self._matcher is None:
+                return
+            # Cães com ID menor cadastrados por outros processos continuam dentro da janela
+            # e chegam na próxima busca incremental
+            self._add_locked(dog_id, feature_vector)
+
+    def size(self):
+        """Cães na galeria já carregada (sem carregar nem atualizar), ou None se não carregada."""
+        matcher = self._matcher
+        return len(matcher) if matcher is not None else None
+
+    def invalidate(self):
+        """Descarta a galeria em cache; a próxima consulta recarrega tudo do banco."""
+        with self._lock:
+            self._matcher = None
+            self._high_water_mark = 0
+            self._recent = set()
+            self._last_refresh = 0.0
+
+
+class FusedGallery:
+    """
+    Galerias separadas por estratégia (`descriptor_type`), consultadas em conjunto.
+
+    Cada estratégia é comparada apenas com vetores da mesma estratégia, e as similaridades
+    do cosseno são combinadas por média ponderada. Um cão sem vetor de alguma estratégia
+    contribui com 0 para aquele termo, então perde para cães com cobertura completa.
+    """
+
+    def __init__(self, matchers=None):
+        """
+        Args:
+            matchers (dict): {descriptor_type: GalleryMatcher}.
+        """
+        self.matchers = matchers or {}
+
+    def __len__(self):
+        return max((len(matcher) for matcher in self.matchers.values()), default=0)
+
+    def sizes(self):
+        """Quantidade de vetores por estratégia."""
+        return {descriptor_type: len(matcher) for descriptor_type, matcher in self.matchers.items()}
+
+    def mismatched_dimensions(self, queries):
+        """
+        Estratégias cujo vetor de consulta não tem a dimensão dos vetores salvos (por
+        exemplo, cadastrados com outros parâmetros de extração).
+
+        Returns:
+            dict: {descriptor_type: (dimensão da consulta, dimensão da galeria)}.
+        """
+        mismatched = {}
+        for name, query in queries.items():
+            matcher = self.matchers.get(name)
+            if matcher is not None and len(matcher) and len(query) != matcher.dim:
+                mismatched[name] = (len(query), matcher.dim)
+        return mismatched
+
+    def top_k(self, queries, weights, k=1, threshold=None):
+        """
+        Retorna os k cães com maior similaridade combinada, do melhor para o pior.
+
+        Args:
+            queries (dict): {descriptor_type: vetor da imagem fornecida}.
+            weights (dict): {descriptor_type: peso}. Estratégias sem peso positivo são ignoradas.
+            k (int): Quantidade máxima de candidatos.
+            threshold (float): Similaridade combinada mínima.
+
+        Returns:
+            list: Tuplas (dog_id, similaridade combinada, {descriptor_type: similaridade}).
+
+        Raises:
+            ValueError: Se nenhuma estratégia da consulta tiver peso positivo.
+        """
+        active = {name: weight for name, weight in weights.items() if weight > 0 and name in queries}
+        if not active:
+            raise ValueError(f"Nenhuma estratégia com peso positivo entre {sorted(queries)}.")
+        total_weight = float(sum(active.values()))
+
+        per_type = {}
+        for name in active:
+            matcher = self.matchers.get(name)
+            if matcher is not None and len(matcher):
+                per_type[name] = matcher.cosine_scores(queries[name])
+        if not per_type or k <= 0:
+            return []
+
+        dog_ids = np.unique(np.concatenate([ids for ids, _ in per_type.values()]))
+        if not len(dog_ids):
+            return []
+        fused = np.zeros(len(dog_ids), dtype=np.float64)
+        breakdown = {}
+        for name, (ids, scores) in per_type.items():
+            positions = np.searchsorted(dog_ids, ids)
+            fused[positions] += active[name] * scores
+            column = np.full(len(dog_ids), np.nan)
+            column[positions] = scores
+            breakdown[name] = column
+        fused /= total_weight
+
+        candidates = np.arange(len(fused)) if threshold is None else np.flatnonzero(fused >= threshold)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-fused[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-fused[candidates], kind="stable")]
+        return [
+            (
+                int(dog_ids[i]),
+                float(fused[i]),
+                {name: float(column[i]) for name, column in breakdown.items() if not np.isnan(column[i])},
+            )
+            for i in candidates
+        ]
+
+
+class FeatureGalleryCache:
+    """
+    Cache no processo das galerias por estratégia (tabela `features`).
+
+    Segue o mesmo esquema de `GalleryCache`: carga completa uma única vez e, depois,
+    buscas incrementais quando o intervalo de atualização expira ou após um cadastro
+    neste processo. Como recadastrar uma estratégia atualiza a linha existente (mesmo
+    `features.id`), a marca d'água é a coluna `updated_at` (postgres/migrations/008), e
+    não o `id`: vetores alterados voltam na busca e substituem o antigo na galeria.
+
+    A busca recomeça `refresh_slack` segundos antes da marca d'água, excluindo as linhas
+    (id, updated_at) já carregadas, para pegar transações que terminaram depois de outras
+    mais novas.
+
+    Estratégias listadas em `index_factories` usam o índice criado pela fábrica (por
+    exemplo, `InvertedFileIndex` para VLAD/BoVW); as demais, uma `GalleryMatcher`.
+    """
+
+    def __init__(self, database, refresh_interval=30.0, index_factories=None, refresh_slack=300.0):
+        """
+        Args:
+            database (DB): Acesso ao banco de dados.
+            refresh_interval (float): Segundos entre buscas incrementais. Use 0 para sempre consultar.
+            index_factories (dict): {descriptor_type: callable que cria um índice vazio}.
+            refresh_slack (float): Segundos antes da marca d'água verificados de novo a cada busca.
+        """
+        self.database = database
+        self.refresh_interval = refresh_interval
+        self.index_factories = index_factories or {}
+        self.refresh_slack = datetime.timedelta(seconds=refresh_slack)
+        self._lock = threading.Lock()
+        self._gallery = None
+        self._high_water_mark = None
+        # {features.id: updated_at} das linhas carregadas dentro da folga
+        self._recent = {}
+        self._last_refresh = 0.0
+
+    def get(self):
+        """
+        Returns:
+            FusedGallery: Galerias por estratégia com os cães cadastrados.
+        """
+        gallery = self._gallery
+        if gallery is not None and time.monotonic() - self._last_refresh < self.refresh_interval:
+            return gallery
+
+        with self._lock:
+            if self._gallery is None:
+                self._load()
+            elif time.monotonic() - self._last_refresh >= self.refresh_interval:
+                self._refresh()
+            return self._gallery
+
+    def _load(self):
+        rows = self.database.get_strategy_features_since()
+        grouped = {}
+        for _, dog_id, descriptor_type, _, feature_vector in rows:
+            grouped.setdefault(descriptor_type, []).append((dog_id, feature_vector))
+        matchers = {}
+        for descriptor_type, type_rows in grouped.items():
+            if descriptor_type in self.index_factories:
+                matchers[descriptor_type] = self._new_index(descriptor_type)
+                for dog_id, feature_vector in type_rows:
+                    if has_vector(feature_vector):
+                        matchers[descriptor_type].add(dog_id, feature_vector)
+            else:
+                matchers[descriptor_type] = GalleryMatcher.from_rows(type_rows)
+        self._gallery = FusedGallery(matchers)
+        self._high_water_mark = None
+        self._recent = {}
+        self._remember(rows)
+        self._last_refresh = time.monotonic()
+
+    def _remember(self, rows):
+        """Avança a marca d'água e guarda as linhas que ainda estão dentro da folga."""
+        for feature_id, _, _, updated_at, _ in rows:
+            if self._high_water_mark is None or updated_at > self._high_water_mark:
+                self._high_water_mark = updated_at
+            self._recent[feature_id] = updated_at
+        if self._high_water_mark is not None:
+            floor = self._high_water_mark - self.refresh_slack
+            self._recent = {key: value for key, value in self._recent.items() if value > floor}
+
+    def _refresh(self):
+        since = self._high_water_mark - self.refresh_slack if self._high_water_mark is not None else None
+        rows = self.database.get_strategy_features_since(since, exclude=list(self._recent.items()))
+        grouped = {}
+        for _, dog_id, descriptor_type, _, feature_vector in rows:
+            if has_vector(feature_vector):
+                grouped.setdefault(descriptor_type, []).append((dog_id, feature_vector))
+        matchers = dict(self._gallery.matchers)
+        replaced = False
+        for descriptor_type, type_rows in grouped.items():
+            matcher = matchers.get(descriptor_type)
+            if matcher is None:
+                matcher = matchers[descriptor_type] = self._new_index(descriptor_type)
+            # Cães que já estão na galeria desta estratégia tiveram o vetor recadastrado
+            present = np.isin([dog_id for dog_id, _ in type_rows], matcher.dog_ids)
+            updates = {}
+            for (dog_id, feature_vector), is_update in zip(type_rows, present):
+                if is_update:
+                    updates[dog_id] = feature_vector
+                else:
+                    matcher.add(dog_id, feature_vector)
+            if updates:
+                matchers[descriptor_type] = matcher.with_updates(updates)
+                replaced = True
+        if replaced or matchers.keys() != self._gallery.matchers.keys():
+            # Publica um novo objeto em vez de alterar o dicionário lido por outras threads
+            self._gallery = FusedGallery(matchers)
+        self._remember(rows)
+        self._last_refresh = time.monotonic()
+
+    def _new_index(self, descriptor_type):
+        factory = self.index_factories.get(descriptor_type)
+        return factory() if factory else GalleryMatcher()
+
+    def refresh(self):
+        """Busca imediatamente os vetores novos (por exemplo, logo após um cadastro)."""
+        with self._lock:
+            if self._gallery is not None:
+                self._refresh()
+
+    def sizes(self):
+        """Vetores por estratégia nas galerias já carregadas (sem carregar nem atualizar)."""
+        gallery = self._gallery
+        return gallery.sizes() if gallery is not None else {}
+
+    def invalidate(self):
+        """Descarta as galerias em cache; a próxima consulta recarrega tudo do banco."""
+        with self._lock:
+            self._gallery = None
+            self._high_water_mark = None
+            self._recent = {}
+            self._last_refresh = 0.0
@@ -0,0 +1,318 @@
+# src/gallery_snapshot.py
+"""
+Snapshot da galeria em disco, mapeado em memória (somente leitura) por todos os workers.
+
+Sem o snapshot, cada worker do gunicorn carrega a própria cópia da galeria do Postgres.
+Com ele, os vetores e os IDs ficam em arquivos binários versionados (float32 / int64,
+descritos por um manifesto JSON); os workers os abrem com `np.memmap`, e as páginas são
+compartilhadas pelo cache de páginas do sistema operacional. Cadastros mais novos que o
+snapshot ficam em uma galeria delta pequena em memória, em cada worker.
+
+O snapshot é reconstruído em segundo plano (um worker por vez, sob um `flock`) quando a
+delta cresce demais ou o snapshot envelhece; o manifesto é trocado com `os.replace`, e
+cada worker passa a usar a versão nova na próxima atualização da galeria.
+
+Para gerar o snapshot antes de subir os workers:
+
+    python src/gallery_snapshot.py build --dir /var/cache/idealpet/gallery
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from gallery import GalleryCache, GalleryMatcher, has_vector
+
+MANIFEST = "current.json"
+LOCK_FILE = "build.lock"
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def open_snapshot(directory):
+    """
+    Abre o snapshot atual do diretório.
+
+    Returns:
+        tuple: (manifesto, IDs int64, vetores float32 N x D), ambos mapeados somente
+               leitura, ou None se ainda não houver snapshot.
+    """
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return None
+    count, dim = manifest["count"], manifest["dim"]
+    if count == 0:
+        return manifest, np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+    ids = np.memmap(os.path.join(directory, manifest["ids"]), dtype=np.int64, mode="r", shape=(count,))
+    vectors = np.memmap(os.path.join(directory, manifest["vectors"]), dtype=np.float32, mode="r", shape=(count, dim))
+    return manifest, ids, vectors
+
+
+def build_snapshot(database, directory, page_size=10000, keep=3, blocking=True, if_missing=False):
+    """
+    Grava um snapshot novo com todos os cães do banco, lidos em páginas por `dog_id`.
+
+    Args:
+        database (DB): Acesso ao banco de dados.
+        directory (str): Diretório dos snapshots (compartilhado pelos workers).
+        page_size (int): Cães lidos por consulta.
+        keep (int): Versões mantidas no disco (a atual e as anteriores, ainda mapeadas
+                    por workers que não trocaram de versão).
+        blocking (bool): Se False e outro processo já estiver gravando, retorna None.
+        if_missing (bool): Se já houver snapshot quando o lock for obtido (gravado por outro
+                           worker enquanto este esperava), retorna o manifesto dele sem
+                           gravar outro.
+
+    Returns:
+        dict: Manifesto do snapshot gravado (ou do existente, com `if_missing`), ou None.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+
+        if if_missing:
+            manifest = read_manifest(directory)
+            if manifest is not None:
+                return manifest
+
+        # Ordenável por data (para a limpeza) e único mesmo para gravações no mesmo segundo
+        now = time.time()
+        version = f"{time.strftime('%Y%m%d%H%M%S', time.gmtime(now))}{int(now * 1000) % 1000:03d}-{os.urandom(3).hex()}"
+        names = {"ids": f"gallery-{version}.ids", "vectors": f"gallery-{version}.vectors"}
+        count = 0
+        dim = None
+        high_water_mark = 0
+        with open(os.path.join(directory, names["ids"]), "wb") as ids_file, \
+                open(os.path.join(directory, names["vectors"]), "wb") as vectors_file:
+            while True:
+                rows = database.get_saved_features_since(high_water_mark, limit=page_size)
+                if not rows:
+                    break
+                high_water_mark = rows[-1][0]
+                page_ids = []
+                page_vectors = []
+                for dog_id, feature_vector in rows:
+                    if not has_vector(feature_vector):
+                        continue
+                    if dim is None:
+                        dim = len(feature_vector)
+                    if len(feature_vector) != dim:
+                        print(f"Aviso: vetor do cão {dog_id} ignorado (dimensão {len(feature_vector)} != {dim}).")
+                        continue
+                    page_ids.append(dog_id)
+                    page_vectors.append(feature_vector)
+                if page_ids:
+                    ids_file.write(np.asarray(page_ids, dtype=np.int64).tobytes())
+                    vectors_file.write(np.asarray(page_vectors, dtype=np.float32).tobytes())
+                    count += len(page_ids)
+
+        manifest = dict(
+            names, version=version, count=count, dim=dim or 0,
+            high_water_mark=high_water_mark, created_at=time.time(),
+        )
+        tmp_path = os.path.join(directory, f"{MANIFEST}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, os.path.join(directory, MANIFEST))
+        _prune(directory, keep, version)
+        return manifest
+
+
+def _prune(directory, keep, current):
+    # Remover arquivos ainda mapeados por outros workers é seguro: o mapeamento continua válido.
+    # A versão atual nunca é removida, mesmo se outra gravada no mesmo milissegundo ordenar depois
+    versions = {}
+    for name in os.listdir(directory):
+        if name.startswith("gallery-") and name.endswith((".ids", ".vectors")):
+            versions.setdefault(name.rsplit(".", 1)[0], []).append(name)
+    older = sorted((prefix for prefix in versions if prefix != f"gallery-{current}"), reverse=True)
+    for prefix in older[max(keep - 1, 0):]:
+        for name in versions[prefix]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+class SnapshotGallery:
+    """
+    Galeria do snapshot (mapeada em disco, somente leitura) + delta em memória com os
+    cadastros mais novos, com a mesma interface de consulta da `GalleryMatcher`.
+    """
+
+    def __init__(self, base, version=None):
+        self.base = base
+        self.delta = GalleryMatcher()
+        self.version = version
+
+    def __len__(self):
+        return len(self.base) + len(self.delta)
+
+    @property
+    def dog_ids(self):
+        return np.concatenate([self.base.dog_ids, self.delta.dog_ids])
+
+    def add(self, dog_id, feature_vector):
+        if len(self.base) and len(feature_vector) != self.base.dim:
+            print(f"Aviso: vetor do cão {dog_id} ignorado (dimensão {len(feature_vector)} != {self.base.dim}).")
+            return False
+        return self.delta.add(dog_id, feature_vector)
+
+    def cosine_scores(self, query):
+        base_ids, base_scores = self.base.cosine_scores(query)
+        if not len(self.delta):
+            return base_ids, base_scores
+        delta_ids, delta_scores = self.delta.cosine_scores(query)
+        return np.concatenate([base_ids, delta_ids]), np.concatenate([base_scores, delta_scores])
+
+    def top_k(self, query, metric, k=1, threshold=None):
+        candidates = self.base.top_k(query, metric, k=k, threshold=threshold)
+        if len(self.delta):
+            candidates += self.delta.top_k(query, metric, k=k, threshold=threshold)
+            candidates.sort(key=lambda candidate: candidate[1], reverse=metric == "cosine")
+        return candidates[:k]
+
+    def closest(self, query, metric):
+        best = self.top_k(query, metric, k=1)
+        return best[0] if best else (None, None)
+
+
+class SnapshotGalleryCache(GalleryCache):
+    """
+    `GalleryCache` servida a partir do snapshot mapeado em disco.
+
+    `get`, `add` e `invalidate` mantêm o comportamento da classe base; as atualizações
+    periódicas também verificam se há uma versão nova do snapshot e disparam a
+    reconstrução em segundo plano quando necessário.
+    """
+
+    def __init__(self, database, directory, refresh_interval=30.0, rebuild_interval=600.0,
+                 delta_max=5000, page_size=10000, refresh_window=1000):
+        """
+        Args:
+            database (DB): Acesso ao banco de dados.
+            directory (str): Diretório dos snapshots, compartilhado pelos workers.
+            refresh_interval (float): Segundos entre buscas incrementais (ver `GalleryCache`).
+            rebuild_interval (float): Idade, em segundos, a partir da qual o snapshot é
+                                      reconstruído se houver cadastros na delta.
+            delta_max (int): Tamanho da delta que dispara a reconstrução imediatamente.
+            page_size (int): Cães lidos por consulta ao gravar o snapshot.
+            refresh_window (int): Janela de IDs das buscas incrementais (ver `GalleryCache`).
+        """
+        super().__init__(database, refresh_interval=refresh_interval, refresh_window=refresh_window)
+        self.directory = directory
+        self.rebuild_interval = rebuild_interval
+        self.delta_max = delta_max
+        self.page_size = page_size
+        self._manifest = None
+        self._rebuild_thread = None
+        self._force_rebuild = False
+
+    def _load(self):
+        snapshot = open_snapshot(self.directory)
+        if snapshot is None:
+            # Primeira subida: um worker grava o snapshot e os demais esperam pelo lock e
+            # usam o que ele gravou
+            build_snapshot(self.database, self.directory, self.page_size, if_missing=True)
+            snapshot = open_snapshot(self.directory)
+        self._install(snapshot)
+        self._refresh()
+
+    def _install(self, snapshot):
+        manifest, ids, vectors = snapshot
+        previous = self._matcher
+        gallery = SnapshotGallery(GalleryMatcher(ids, vectors), version=manifest["version"])
+        # Cadastros da delta que o snapshot novo ainda não inclui continuam na delta (inclusive
+        # os de ID menor que a marca do snapshot, cuja transação terminou depois da leitura)
+        if previous is not None:
+            delta_ids = previous.delta.dog_ids
+            delta_matrix = previous.delta.matrix
+            for position in np.flatnonzero(~np.isin(delta_ids, ids)):
+                gallery.add(int(delta_ids[position]), delta_matrix[position])
+        self._matcher = gallery
+        self._manifest = manifest
+        self._high_water_mark = max(self._high_water_mark, manifest["high_water_mark"])
+        self._remember(int(dog_id) for dog_id in ids[ids > self._window_floor()])
+        self._remember(int(dog_id) for dog_id in gallery.delta.dog_ids)
+
+    def _refresh(self):
+        manifest = read_manifest(self.directory)
+        if manifest is not None and manifest["version"] != self._manifest["version"]:
+            try:
+                self._install(open_snapshot(self.directory))
+            except (OSError, ValueError) as e:
+                print(f"Erro ao abrir o snapshot da galeria {manifest['version']}: {e}")
+        super()._refresh()
+        if self._needs_rebuild():
+            self._start_rebuild()
+
+    def _needs_rebuild(self):
+        if self._force_rebuild:
+            return True
+        delta = len(self._matcher.delta)
+        age = time.time() - self._manifest["created_at"]
+        return delta >= self.delta_max or (delta > 0 and age >= self.rebuild_interval)
+
+    def _start_rebuild(self):
+        if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+            return
+        self._force_rebuild = False
+        self._rebuild_thread = threading.Thread(target=self._rebuild, name="gallery-snapshot", daemon=True)
+        self._rebuild_thread.start()
+
+    def _rebuild(self):
+        try:
+            if build_snapshot(self.database, self.directory, self.page_size, blocking=False) is not None:
+                # Antecipa a próxima atualização para trocar de versão logo
+                self._last_refresh = 0.0
+        except Exception as e:
+            print(f"Erro ao reconstruir o snapshot da galeria: {e}")
+
+    def invalidate(self):
+        """
+        Descarta a galeria em cache e agenda a reconstrução do snapshot; até a versão nova
+        ficar pronta, a consulta usa o snapshot atual + cadastros mais novos.
+        """
+        super().invalidate()
+        self._force_rebuild = True
+
+
+def build_command(args):
+    from config import Config, config
+    from database import DB
+
+    database = DB(config)
+    try:
+        manifest = build_snapshot(database, args.dir or Config.GALLERY_SNAPSHOT_DIR, args.page_size)
+    finally:
+        database.close()
+    print(f"Snapshot {manifest['version']}: {manifest['count']} cães, dimensão {manifest['dim']}.")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Snapshot da galeria compartilhado pelos workers.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Grava um snapshot novo com os cães cadastrados.")
+    build.add_argument("--dir", help="Diretório dos snapshots (padrão: GALLERY_SNAPSHOT_DIR).")
+    build.add_argument("--page-size", type=int, default=10000, help="Cães lidos por consulta.")
+    build.set_defaults(func=build_command)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
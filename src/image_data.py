@@ -0,0 +1,210 @@
+# src/image_data.py
+import threading
+from io import BytesIO
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Fatores de redução aceitos por cv2.imdecode (decodificação reduzida de JPEG)
+REDUCED_COLOR_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+}
+
+
+def limit_side(image, max_side):
+    """
+    Reduz a imagem para que o maior lado tenha no máximo `max_side` pixels (sem ampliar).
+
+    Args:
+        image (np.array): Imagem BGR ou em escala de cinza.
+        max_side (int): Tamanho máximo do maior lado, em pixels.
+
+    Returns:
+        np.array: Imagem redimensionada, ou a própria imagem se já couber no limite.
+    """
+    height, width = image.shape[:2]
+    scale = max_side / float(max(height, width))
+    if scale >= 1.0:
+        return image
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+class ImageData:
+    """
+    Imagem decodificada uma única vez e compartilhada entre as estratégias de extração.
+
+    A decodificação (`cv2.imdecode`) e as visões derivadas (BGR, RGB, escala de cinza,
+    PIL e versões redimensionadas) são calculadas sob demanda e guardadas, de modo que
+    várias estratégias sobre a mesma imagem custam uma decodificação e uma conversão
+    de cor por requisição.
+
+    Quando `max_side` é informado, a imagem passa por uma etapa de normalização de
+    resolução logo após a decodificação: todas as visões partem da imagem com o maior
+    lado limitado a `max_side`. Com `reduced_decode`, imagens JPEG grandes já são
+    decodificadas em resolução reduzida (1/2, 1/4 ou 1/8), evitando decodificar pixels
+    que seriam descartados. Cadastro e consulta devem usar os mesmos parâmetros.
+    """
+
+    def __init__(self, data=None, bgr=None, max_side=None, reduced_decode=False):
+        """
+        Args:
+            data (bytes): Conteúdo codificado da imagem (JPEG, PNG, ...).
+            bgr (np.array): Imagem já decodificada, no formato BGR do OpenCV.
+            max_side (int): Limite do maior lado após a normalização (None ou 0 desativa).
+            reduced_decode (bool): Usa decodificação reduzida quando `max_side` permite.
+        """
+        if data is None and bgr is None:
+            raise ValueError("Forneça os bytes da imagem ou uma matriz BGR.")
+        self.data = data
+        self.max_side = max_side or None
+        self.reduced_decode = reduced_decode
+        self._views = {}
+        if bgr is not None:
+            self._views["source"] = bgr
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_path(cls, path, **kwargs):
+        with open(path, "rb") as f:
+            return cls(data=f.read(), **kwargs)
+
+    @classmethod
+    def from_pil(cls, image, **kwargs):
+        return cls(bgr=cv2.cvtColor(np.array(image.convert("RGB")), cv2.COLOR_RGB2BGR), **kwargs)
+
+    def _view(self, name, build):
+        view = self._views.get(name)
+        if view is None:
+            with self._lock:
+                view = self._views.get(name)
+                if view is None:
+                    view = build()
+                    self._views[name] = view
+        return view
+
+    def _decode_flag(self):
+        if not (self.max_side and self.reduced_decode):
+            return cv2.IMREAD_COLOR
+        try:
+            # Lê apenas o cabeçalho para descobrir as dimensões originais
+            width, height = Image.open(BytesIO(self.data)).size
+        except Exception:
+            return cv2.IMREAD_COLOR
+        for factor, flag in REDUCED_COLOR_FLAGS.items():
+            if max(width, height) / factor >= self.max_side:
+                return flag
+        return cv2.IMREAD_COLOR
+
+    def _decode(self):
+        image = cv2.imdecode(np.frombuffer(self.data, np.uint8), self._decode_flag())
+        if image is None or image.size == 0:
+            raise ValueError("Erro ao carregar a imagem. A imagem pode estar corrompida ou o formato não é suportado.")
+        return image
+
+    @property
+    def source(self):
+        """Imagem BGR como decodificada, antes da normalização de resolução."""
+        return self._view("source", self._decode)
+
+    @property
+    def bgr(self):
+        """Imagem colorida (H x W x 3, uint8) na ordem BGR do OpenCV, já normalizada."""
+        if not self.max_side:
+            return self.source
+        return self._view("bgr", lambda: limit_side(self.source, self.max_side))
+
+    @property
+    def rgb(self):
+        """Imagem colorida (H x W x 3, uint8) na ordem RGB."""
+        return self._view("rgb", lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB))
+
+    @property
+    def gray(self):
+        """Imagem em escala de cinza (H x W, uint8)."""
+        return self._view("gray", lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def pil(self):
+        """Imagem como objeto PIL (modo RGB), para estratégias que ainda esperam PIL."""
+        return self._view("pil", lambda: Image.fromarray(self.rgb))
+
+    @property
+    def shape(self):
+        return self.bgr.shape
+
+    def derived(self, name, build):
+        """
+        Resultado intermediário calculado uma única vez por imagem e compartilhado entre as
+        estratégias (por exemplo, keypoints e descritores SIFT usados por mais de um encoder).
+
+        Args:
+            name (str): Chave do resultado; deve incluir os parâmetros que o determinam.
+            build (callable): Calcula o resultado na primeira chamada.
+        """
+        return self._view(f"derived:{name}", build)
+
+    def resized(self, max_side, gray=False):
+        """
+        Versão reduzida da imagem com o maior lado limitado a `max_side` (sem ampliar).
+
+        Args:
+            max_side (int): Tamanho máximo do maior lado, em pixels.
+            gray (bool): Se True, reduz a visão em escala de cinza; caso contrário, a BGR.
+
+        Returns:
+            np.array: Imagem redimensionada (ou a própria visão, se já couber no limite).
+        """
+        source_name = "gray" if gray else "bgr"
+
+        def build():
+            return limit_side(self.gray if gray else self.bgr, max_side)
+
+        return self._view(f"{source_name}@{max_side}", build)
+
+
+def load_image_bytes(image):
+    """
+    Obtém os bytes codificados de uma imagem informada por URL, caminho local ou bytes.
+
+    Returns:
+        bytes: Conteúdo da imagem, ou None se a entrada já estiver decodificada (PIL, matriz).
+    """
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return bytes(image)
+    if isinstance(image, str):
+        if image.startswith("http"):
+            from image_fetcher import fetch_image
+            return fetch_image(image)
+        with open(image, "rb") as f:
+            return f.read()
+    return None
+
+
+def as_image_data(image, max_side=None, reduced_decode=False):
+    """
+    Converte a entrada recebida por uma estratégia em `ImageData`.
+
+    Args:
+        image (ImageData, PIL.Image, bytes, np.array ou str): Imagem já carregada, bytes
+            codificados, matriz BGR, URL ou caminho local.
+        max_side (int): Normalização de resolução (ver `ImageData`). Ignorado se `image`
+            já for `ImageData`, que mantém a normalização com que foi criada.
+        reduced_decode (bool): Usa decodificação reduzida quando possível.
+
+    Returns:
+        ImageData: Imagem pronta para uso pelas estratégias.
+    """
+    if isinstance(image, ImageData):
+        return image
+    options = {"max_side": max_side, "reduced_decode": reduced_decode}
+    if isinstance(image, Image.Image):
+        return ImageData.from_pil(image, **options)
+    if isinstance(image, np.ndarray):
+        return ImageData(bgr=image, **options)
+    if isinstance(image, (bytes, bytearray, memoryview, str)):
+        return ImageData(data=load_image_bytes(image), **options)
+    raise ValueError("Invalid image provided. Must be a URL, local path, bytes, numpy array, PIL.Image or ImageData.")
@@ -0,0 +1,193 @@
+# src/image_fetcher.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from cache_store import TieredCache
+
+
+class ImageFetchError(ValueError):
+    """Falha ao baixar uma imagem (status HTTP, tempo esgotado ou tamanho excedido)."""
+
+
+class ImageCache:
+    """
+    Cache limitado de imagens baixadas, em dois níveis de chave:
+
+    - por URL: guarda o ETag/Last-Modified e o hash do conteúdo da última resposta;
+    - por hash do conteúdo (sha256): guarda os bytes, em memória (LRU limitado por bytes)
+      e, opcionalmente, em disco (diretório limitado por bytes), ver `cache_store.TieredCache`.
+
+    URLs diferentes com o mesmo conteúdo compartilham uma única cópia dos bytes.
+    """
+
+    def __init__(self, max_bytes, disk_dir=None, disk_max_bytes=0, max_urls=10000):
+        self.max_urls = max_urls
+        self._lock = threading.Lock()
+        self._urls = OrderedDict()
+        self._contents = TieredCache(max_bytes, disk_dir=disk_dir, disk_max_bytes=disk_max_bytes)
+
+    def get_url(self, url):
+        """Retorna (etag, last_modified, content_hash, stored_at) da URL, ou None."""
+        with self._lock:
+            return self._urls.get(url)
+
+    def get_content(self, content_hash):
+        """Retorna os bytes do conteúdo com o hash informado, ou None."""
+        return self._contents.get(content_hash)
+
+    def put(self, url, content, etag=None, last_modified=None):
+        """Armazena o conteúdo baixado da URL e retorna o seu hash."""
+        content_hash = hashlib.sha256(content).hexdigest()
+        self._contents.put(content_hash, content)
+        with self._lock:
+            self._urls[url] = (etag, last_modified, content_hash, time.monotonic())
+            self._urls.move_to_end(url)
+            while len(self._urls) > self.max_urls:
+                self._urls.popitem(last=False)
+        return content_hash
+
+    def touch_url(self, url):
+        """Marca a entrada da URL como revalidada agora (resposta 304)."""
+        with self._lock:
+            entry = self._urls.get(url)
+            if entry:
+                self._urls[url] = entry[:3] + (time.monotonic(),)
+
+
+class ImageFetcher:
+    """
+    Componente único para baixar imagens por HTTP.
+
+    - Sessões `requests` com keep-alive reaproveitadas: uma por thread ou, com
+      `shared_session` (modo gevent), uma só para o processo. Com o gevent, `threading.local`
+      vira local ao greenlet e cada requisição abriria uma sessão (e conexões) nova;
+    - Tempo limite de conexão e de leitura;
+    - Download em streaming, interrompido ao ultrapassar `max_bytes`;
+    - Cache limitado por URL+ETag e por hash do conteúdo (ver `ImageCache`).
+    """
+
+    def __init__(self, connect_timeout=3.05, read_timeout=10.0, max_bytes=20 * 1024 * 1024,
+                 cache=None, cache_ttl=300.0, pool_maxsize=10, shared_session=False):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_bytes = max_bytes
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self.pool_maxsize = pool_maxsize
+        self._local = threading.local()
+        self._shared_session = self._new_session() if shared_session else None
+
+    def _new_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_maxsize, pool_maxsize=self.pool_maxsize, max_retries=1)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    @property
+    def session(self):
+        if self._shared_session is not None:
+            return self._shared_session
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._new_session()
+            self._local.session = session
+        return session
+
+    @metrics.timed("fetch", "")
+    def fetch(self, url):
+        """
+        Baixa a imagem da URL, usando o cache quando possível.
+
+        Args:
+            url (str): URL da imagem.
+
+        Returns:
+            bytes: Conteúdo da imagem.
+
+        Raises:
+            ImageFetchError: Em caso de status HTTP de erro, tempo esgotado ou tamanho excedido.
+        """
+        headers = {}
+        cached = self.cache.get_url(url) if self.cache else None
+        if cached:
+            etag, last_modified, content_hash, stored_at = cached
+            content = self.cache.get_content(content_hash)
+            if content is not None:
+                if time.monotonic() - stored_at < self.cache_ttl:
+                    metrics.CACHE_REQUESTS.inc(cache="image", result="hit")
+                    return content
+                if etag:
+                    headers["If-None-Match"] = etag
+                if last_modified:
+                    headers["If-Modified-Since"] = last_modified
+
+        try:
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304 and headers:
+                    self.cache.touch_url(url)
+                    metrics.CACHE_REQUESTS.inc(cache="image", result="revalidated")
+                    return content
+                if response.status_code != 200:
+                    raise ImageFetchError(f"Erro ao baixar a imagem. Código de status: {response.status_code}")
+
+                content_length = response.headers.get("Content-Length")
+                if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+                    raise ImageFetchError(f"Imagem maior que o limite de {self.max_bytes} bytes.")
+
+                chunks = []
+                received = 0
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    received += len(chunk)
+                    if received > self.max_bytes:
+                        raise ImageFetchError(f"Imagem maior que o limite de {self.max_bytes} bytes.")
+                    chunks.append(chunk)
+                content = b"".join(chunks)
+
+                if self.cache:
+                    metrics.CACHE_REQUESTS.inc(cache="image", result="miss")
+                    self.cache.put(url, content, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+                return content
+        except requests.RequestException as e:
+            raise ImageFetchError(f"Erro ao baixar a imagem: {e}") from e
+
+
+_default_fetcher = None
+_default_fetcher_lock = threading.Lock()
+
+
+def get_image_fetcher():
+    """Retorna o `ImageFetcher` compartilhado pelo processo, configurado a partir de `Config`."""
+    global _default_fetcher
+    if _default_fetcher is None:
+        # Importado aqui para que o módulo possa ser usado sem a configuração do banco
+        from config import Config
+        from serving import gevent_active
+
+        with _default_fetcher_lock:
+            if _default_fetcher is None:
+                cache = ImageCache(
+                    max_bytes=Config.IMAGE_CACHE_MAX_BYTES,
+                    disk_dir=Config.IMAGE_CACHE_DIR or None,
+                    disk_max_bytes=Config.IMAGE_CACHE_DISK_MAX_BYTES,
+                )
+                _default_fetcher = ImageFetcher(
+                    connect_timeout=Config.IMAGE_FETCH_CONNECT_TIMEOUT,
+                    read_timeout=Config.IMAGE_FETCH_READ_TIMEOUT,
+                    max_bytes=Config.IMAGE_FETCH_MAX_BYTES,
+                    cache=cache,
+                    cache_ttl=Config.IMAGE_CACHE_TTL,
+                    pool_maxsize=Config.IMAGE_FETCH_POOL_SIZE,
+                    shared_session=gevent_active(),
+                )
+    return _default_fetcher
+
+
+def fetch_image(url):
+    """Atalho para `get_image_fetcher().fetch(url)`."""
+    return get_image_fetcher().fetch(url)
@@ -0,0 +1,135 @@
+# src/jobs.py
+import threading
+import time
+
+
+class EnrollmentQueue:
+    """
+    Fila de cadastros assíncronos persistida no Postgres (tabela `enrollment_jobs`).
+
+    `submit` grava o job e retorna imediatamente; um conjunto de threads em segundo plano
+    retira os jobs da fila, baixa a imagem, extrai as características e cadastra o cão.
+    Como o estado fica no banco, jobs pendentes sobrevivem a reinícios da instância.
+    """
+
+    def __init__(self, database, extract, extractor_params=None, on_enrolled=None, workers=2,
+                 poll_interval=2.0, max_attempts=3, stale_seconds=600.0):
+        """
+        Args:
+            database (DB): Acesso ao banco de dados.
+            extract (callable): Recebe a URL da imagem e retorna (vetor de características,
+                                dict com os dados extras do cadastro, repassados como
+                                argumentos nomeados a `DB.complete_enrollment_job`).
+            extractor_params (callable): Retorna o registro dos parâmetros de extração.
+            on_enrolled (callable): Chamado com (dog_id, feature_vector) após cada cadastro.
+            workers (int): Quantidade de threads consumidoras.
+            poll_interval (float): Espera máxima, em segundos, entre consultas à fila vazia.
+            max_attempts (int): Tentativas por job antes de marcá-lo como 'failed' (vale também
+                                para jobs parados, que não voltam à fila depois da última).
+            stale_seconds (float): Tempo após o qual um job 'running' volta para a fila.
+        """
+        self.database = database
+        self.extract = extract
+        self.extractor_params = extractor_params
+        self.on_enrolled = on_enrolled
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.stale_seconds = stale_seconds
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._recovery_lock = threading.Lock()
+        self._next_recovery = 0.0
+
+    def start(self):
+        """
+        Inicia as threads consumidoras (idempotente).
+
+        Não acessa o banco: a recuperação de jobs parados roda na primeira volta de um
+        worker, então `start` pode ser chamado na importação do app (LAZY_STARTUP).
+        """
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"enrollment-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """Sinaliza às threads que terminem após o job atual."""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, dog_name, image_url):
+        """
+        Enfileira um cadastro.
+
+        Returns:
+            int: ID do job, ou None se não foi possível gravá-lo.
+        """
+        job_id = self.database.insert_enrollment_job(dog_name, image_url)
+        if job_id is not None:
+            self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        """Retorna o estado do job (ver `DB.get_enrollment_job`)."""
+        return self.database.get_enrollment_job(job_id)
+
+    def _recover_stale_jobs(self):
+        """Devolve à fila os jobs parados, no máximo uma vez a cada `stale_seconds` entre os workers."""
+        with self._recovery_lock:
+            now = time.monotonic()
+            if now < self._next_recovery:
+                return
+            self._next_recovery = now + self.stale_seconds
+        self.database.requeue_stale_enrollment_jobs(self.stale_seconds, self.max_attempts)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self._recover_stale_jobs()
+                job = self.database.claim_enrollment_job()
+            except Exception as e:
+                print(f"Erro ao consultar a fila de cadastros: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            # Um erro inesperado encerra só este job, nunca a thread consumidora
+            try:
+                self._process(*job)
+            except Exception as e:
+                print(f"Erro inesperado no job de cadastro {job[0]}: {e}")
+
+    def _process(self, job_id, dog_name, image_url, attempts, claim_token):
+        try:
+            feature_vector, extras = self.extract(image_url)
+            if not feature_vector:
+                raise ValueError("Falha ao extrair características")
+            params = self.extractor_params() if self.extractor_params else None
+            dog_id = self.database.complete_enrollment_job(
+                job_id, claim_token, dog_name, feature_vector, image_url, params, **extras)
+        except Exception as e:
+            retry = attempts < self.max_attempts
+            print(f"Erro no job de cadastro {job_id} (tentativa {attempts}): {e}")
+            self.database.fail_enrollment_job(job_id, claim_token, str(e), retry=retry)
+            return
+
+        if dog_id is None:
+            print(f"Job de cadastro {job_id} foi devolvido à fila durante o processamento; cadastro descartado")
+            return
+
+        if self.on_enrolled:
+            try:
+                self.on_enrolled(dog_id, feature_vector)
+            except Exception as e:
+                # O cão já está gravado; as galerias o encontram na próxima atualização
+                print(f"Erro ao atualizar as galerias após o job de cadastro {job_id}: {e}")
@@ -0,0 +1,288 @@
+# src/metrics.py
+"""
+Instrumentação de latência por etapa, exposta no formato texto do Prometheus (`/metrics`)
+e no cabeçalho `Server-Timing` de cada resposta.
+
+As etapas (download, decodificação, cada estratégia, cada consulta ao banco, busca na
+galeria, re-ranking) são medidas com `timer` ou `timed`; cada medição alimenta o
+histograma `idealpet_stage_duration_seconds{stage, operation}` e, se houver uma
+requisição em andamento na mesma thread, entra no `Server-Timing` dela.
+
+Sem dependências: os valores ficam em memória, por processo. Com vários workers do
+gunicorn, cada worker expõe os próprios números (o rótulo `pid` do `idealpet_process_info`
+identifica qual respondeu a coleta).
+"""
+import bisect
+import contextvars
+import functools
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# Limites dos histogramas de latência, em segundos (1 ms a 30 s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if value == float("-inf"):
+        return "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: rótulos esperados {self.labelnames}, recebidos {tuple(labels)}.")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Contador monotônico (ex.: acertos de cache)."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values.items()]
+
+
+class Gauge(_Metric):
+    """
+    Valor instantâneo (ex.: tamanho da galeria). Pode ser definido com `set` ou calculado
+    no momento da coleta com `set_function`.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._functions = {}
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            try:
+                values[key] = function()
+            except Exception:
+                # Uma fonte com erro (ex.: banco fora do ar) não derruba a coleta das demais
+                continue
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values.items() if value is not None
+        ]
+
+
+class Histogram(_Metric):
+    """Distribuição de valores em faixas cumulativas (`le`), com soma e contagem."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][position] += 1
+            state[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        lines = []
+        for key, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Conjunto de métricas exportadas juntas em `/metrics`."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica já registrada: '{metric.name}'.")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            samples = metric.samples()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_DURATION = registry.histogram(
+    "idealpet_stage_duration_seconds",
+    "Duração de cada etapa do processamento (download, decodificação, extração, banco, busca).",
+    ("stage", "operation"),
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "idealpet_http_request_duration_seconds",
+    "Duração das requisições HTTP, por endpoint, método e status.",
+    ("endpoint", "method", "status"),
+)
+CACHE_REQUESTS = registry.counter(
+    "idealpet_cache_requests_total",
+    "Consultas aos caches do processo, por cache e resultado (hit, disk_hit, revalidated, miss).",
+    ("cache", "result"),
+)
+GALLERY_SIZE = registry.gauge(
+    "idealpet_gallery_size",
+    "Cães na galeria em memória deste processo.",
+    ("gallery",),
+)
+DB_POOL = registry.gauge(
+    "idealpet_db_pool",
+    "Estado do pool de conexões com o Postgres (ver /v2/db/pool_stats).",
+    ("field",),
+)
+PROCESS_INFO = registry.gauge("idealpet_process_info", "Processo (worker) que respondeu a coleta.", ("pid",))
+PROCESS_INFO.set_function(lambda: 1, pid=os.getpid())
+
+# Etapas medidas na requisição em andamento (None fora de uma requisição)
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def observe(stage, operation, seconds):
+    """Registra uma medição feita fora de `timer` (ex.: tempos já calculados pelo chamador)."""
+    STAGE_DURATION.observe(seconds, stage=stage, operation=operation)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, operation, seconds))
+
+
+@contextmanager
+def timer(stage, operation=""):
+    """Mede o bloco `with` como a etapa `stage` (detalhada por `operation`)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, operation, time.perf_counter() - started)
+
+
+def timed(stage, operation=None):
+    """Decorador equivalente a `timer`; `operation` padrão é o nome da função."""
+    def decorator(function):
+        name = function.__name__ if operation is None else operation
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with timer(stage, name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def begin_request():
+    """Começa a coletar as etapas da requisição atual; retorna o token para `end_request`."""
+    return _request_timings.set([])
+
+
+def end_request(token):
+    """Encerra a coleta e retorna as etapas medidas: lista de (stage, operation, segundos)."""
+    timings = _request_timings.get() or []
+    _request_timings.reset(token)
+    return timings
+
+
+_TOKEN_INVALID = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+
+
+def server_timing(timings, total_seconds=None):
+    """
+    Monta o cabeçalho `Server-Timing` a partir das etapas medidas. Etapas repetidas (ex.:
+    várias consultas iguais ao banco) são somadas.
+
+    Returns:
+        str: Ex.: 'fetch;dur=120.4, decode;dur=8.1, extract.SIFT;dur=68.2, total;dur=210.0'.
+    """
+    merged = {}
+    for stage, operation, seconds in timings:
+        name = _TOKEN_INVALID.sub("_", f"{stage}.{operation}" if operation else stage)
+        merged[name] = merged.get(name, 0.0) + seconds
+    entries = [f"{name};dur={seconds * 1000.0:.1f}" for name, seconds in merged.items()]
+    if total_seconds is not None:
+        entries.append(f"total;dur={total_seconds * 1000.0:.1f}")
+    return ", ".join(entries)
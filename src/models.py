@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import Integer, String, Float, Boolean, ARRAY, DateTime, Date, func
 from datetime import datetime
+from sqlalchemy.dialects.postgresql import JSONB
 from pgvector.sqlalchemy import Vector
 
 db = SQLAlchemy()
@@ -9,7 +10,10 @@ class Dog(db.Model):
     __tablename__ = "dogs"
     dog_id = db.Column(db.Integer, primary_key=True, autoincrement=True)  # ID único do cão
     dog_name = db.Column(db.String(255), nullable=False)  # Nome do cão
-    feature_vector = db.Column(db.ARRAY(db.Float), nullable=False)  # Vetor de características
+    feature_vector = db.Column(db.ARRAY(db.Float))  # Vetor original; nulo nos cadastros com cópia compacta (postgres/migrations/010)
+    feature_packed = db.Column(db.LargeBinary)  # Vetor em float16, lido com np.frombuffer (postgres/migrations/006)
+    embedding = db.Column(Vector(128))  # Cópia pgvector do vetor, para busca indexada (postgres/migrations/001)
+    extractor_params = db.Column(JSONB)  # Parâmetros de extração que geraram o vetor (postgres/migrations/002)
     image_path = db.Column(db.String(255))  # Caminho da imagem do cão
     created_at = db.Column(db.DateTime, default=func.current_timestamp())  # Data de criação
     # Relacionamento com a tabela `features`
@@ -20,9 +24,13 @@ class Feature(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     dog_id = db.Column(db.Integer, db.ForeignKey("dogs.dog_id", ondelete="CASCADE"), nullable=False)
     descriptor_type = db.Column(db.String(50), nullable=False)  # Adicionando descriptor_type
-    feature_vector = db.Column(Vector(128), nullable=False)  # pgvector para vetores
+    feature_vector = db.Column(Vector())  # Vetor original; nulo nos cadastros com cópia compacta (postgres/migrations/011)
+    vector_packed = db.Column(db.LargeBinary)  # Cópia float16 do vetor (postgres/migrations/006)
     created_at = db.Column(db.DateTime, default=func.current_timestamp())
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.now())  # Última alteração do vetor (postgres/migrations/008)
     image_url = db.Column(db.String(255))
+    params = db.Column(JSONB)  # Parâmetros da estratégia que gerou o vetor
+    __table_args__ = (db.UniqueConstraint("dog_id", "descriptor_type", name="features_dog_descriptor_key"),)
     
 class Projetos(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,398 @@
+# src/pq_gallery.py
+"""
+Galeria comprimida por quantização de produto (PQ), para milhões de cães em memória.
+
+Cada vetor é normalizado (L2), subtraído do vetor médio da galeria (a parte comum a
+todos os cães não ajuda a distingui-los) e dividido em M subvetores; cada subvetor é
+trocado pelo índice (1 byte) do centro mais próximo no codebook do seu subespaço. Por cão
+ficam M bytes de código + a norma original (float32) + o ID, contra 4 bytes por dimensão
+da `GalleryMatcher`. A consulta não é quantizada (distância assimétrica, ADC): monta-se
+uma tabela de produtos internos entre os subvetores da consulta e os centros, e a
+pontuação de cada cão é a soma das entradas indicadas pelos seus códigos. Os subespaços
+são combinados aos pares (tabelas de 256 x 256), o que reduz à metade as leituras por cão.
+
+Os sobreviventes da etapa aproximada podem ser reordenados pela pontuação exata, com os
+vetores originais buscados no banco só para eles.
+
+Treino do quantizador (amostra da tabela `dogs`):
+
+    python src/pq_gallery.py train --output pq.npz --subspaces 16
+"""
+import argparse
+import hashlib
+import os
+import time
+
+import cv2
+import numpy as np
+
+from gallery import GalleryCache, GalleryMatcher, has_vector
+
+
+class ProductQuantizer:
+    """
+    Codebooks por subespaço (M x K x D/M) treinados com k-means sobre os resíduos dos
+    vetores normalizados em relação ao vetor médio.
+    """
+
+    def __init__(self, centroids, mean=None):
+        """
+        Args:
+            centroids (np.array): Centros M x K x (D/M); M par e K <= 256 (códigos de 1 byte).
+            mean (np.array): Vetor médio (normalizado) subtraído antes da quantização (padrão: 0).
+        """
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        if self.centroids.ndim != 3 or self.centroids.shape[0] % 2 or self.centroids.shape[1] > 256:
+            raise ValueError("Os centros devem formar uma matriz M x K x D/M com M par e K <= 256.")
+        self.mean = np.zeros(self.dim, dtype=np.float32) if mean is None else np.asarray(mean, dtype=np.float32)
+        self._center_sq = np.einsum("mkd,mkd->mk", self.centroids, self.centroids)
+
+    @property
+    def subspaces(self):
+        return self.centroids.shape[0]
+
+    @property
+    def clusters(self):
+        return self.centroids.shape[1]
+
+    @property
+    def dim(self):
+        return self.centroids.shape[0] * self.centroids.shape[2]
+
+    @property
+    def version(self):
+        """Hash curto dos centros; muda a cada retreino."""
+        digest = hashlib.sha1(self.centroids.tobytes())
+        digest.update(self.mean.tobytes())
+        return digest.hexdigest()[:16]
+
+    @staticmethod
+    def normalize(vectors):
+        """Retorna (vetores normalizados, normas originais); vetores nulos ficam zerados."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1)
+        safe = np.where(norms > 0, norms, 1.0)
+        return vectors / safe[..., None], norms.astype(np.float32)
+
+    @classmethod
+    def train(cls, vectors, subspaces=16, clusters=256, iterations=20, max_vectors=100000, seed=0):
+        """
+        Treina os codebooks com k-means (OpenCV), um por subespaço.
+
+        Args:
+            vectors (np.array): Amostra N x D da galeria.
+            subspaces (int): Quantidade de subespaços (M), par; D precisa ser múltiplo de M.
+            clusters (int): Centros por subespaço (K), no máximo 256.
+            iterations (int): Iterações máximas do k-means.
+            max_vectors (int): Amostra máxima usada no treino.
+            seed (int): Semente da amostragem e da inicialização.
+
+        Returns:
+            ProductQuantizer: Quantizador treinado.
+        """
+        data, _ = cls.normalize(vectors)
+        if subspaces % 2 or data.ndim != 2 or data.shape[1] % subspaces:
+            raise ValueError(f"A quantidade de subespaços deve ser par e dividir a dimensão dos vetores ({subspaces}).")
+        rng = np.random.default_rng(seed)
+        if len(data) > max_vectors:
+            data = data[rng.choice(len(data), max_vectors, replace=False)]
+        if len(data) < clusters:
+            raise ValueError(f"Vetores insuficientes ({len(data)}) para {clusters} centros por subespaço.")
+        mean = data.mean(axis=0)
+        data = data - mean
+
+        cv2.setRNGSeed(seed)
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, iterations, 1e-4)
+        step = data.shape[1] // subspaces
+        centroids = []
+        for m in range(subspaces):
+            block = np.ascontiguousarray(data[:, m * step:(m + 1) * step])
+            _, _, centers = cv2.kmeans(block, clusters, None, criteria, 1, cv2.KMEANS_PP_CENTERS)
+            centroids.append(centers)
+        return cls(np.stack(centroids), mean)
+
+    def _split(self, vectors):
+        return vectors.reshape(len(vectors), self.subspaces, -1)
+
+    def encode(self, vectors):
+        """
+        Args:
+            vectors (np.array): Vetores N x D já normalizados.
+
+        Returns:
+            np.array: Códigos M/2 x N (uint16), um par de subespaços (1 byte cada) por linha.
+        """
+        blocks = self._split(np.asarray(vectors, dtype=np.float32) - self.mean)
+        codes = np.empty((self.subspaces, len(blocks)), dtype=np.uint16)
+        for m in range(self.subspaces):
+            distances = self._center_sq[m][None, :] - 2.0 * (blocks[:, m, :] @ self.centroids[m].T)
+            codes[m] = np.argmin(distances, axis=1)
+        return (codes[0::2] << 8) | codes[1::2]
+
+    def score_tables(self, query):
+        """
+        Tabelas da ADC para uma consulta normalizada.
+
+        Returns:
+            tuple: (produto interno com o vetor médio, tabelas M/2 x 65536 com a soma dos
+                   produtos internos de cada par de centros).
+        """
+        tables = np.einsum("md,mkd->mk", self._split(query[None, :])[0], self.centroids)
+        clusters = self.clusters
+        pairs = np.zeros((self.subspaces // 2, 256, 256), dtype=np.float32)
+        pairs[:, :clusters, :clusters] = tables[0::2, :, None] + tables[1::2, None, :]
+        return float(np.dot(query, self.mean)), pairs.reshape(len(pairs), -1)
+
+    def save(self, path):
+        # Grava em arquivo temporário e renomeia, para workers nunca lerem um arquivo parcial
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, centroids=self.centroids, mean=self.mean)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["centroids"], data["mean"])
+
+
+class PQGallery:
+    """
+    Galeria com os códigos PQ de todos os cães, com a mesma interface de consulta da
+    `GalleryMatcher` (`top_k`, `closest`).
+
+    Assim como na `GalleryMatcher`, os buffers crescem por duplicação e o estado é
+    publicado como uma única tupla; chamadas a `add` devem ser serializadas por quem chama.
+    """
+
+    METRICS = GalleryMatcher.METRICS
+
+    def __init__(self, quantizer):
+        self.quantizer = quantizer
+        self._state = (
+            np.empty(0, dtype=np.int64),
+            np.empty((quantizer.subspaces // 2, 0), dtype=np.uint16),
+            np.empty(0, dtype=np.float32),
+            0,
+        )
+
+    def __len__(self):
+        return self._state[3]
+
+    def _view(self):
+        ids, codes, norms, size = self._state
+        return ids[:size], codes[:, :size], norms[:size]
+
+    @property
+    def dog_ids(self):
+        return self._view()[0]
+
+    def memory_bytes(self):
+        """Bytes ocupados pelos cães carregados (IDs, códigos e normas), sem a folga dos buffers."""
+        return len(self) * (8 + self.quantizer.subspaces + 4)
+
+    def add_many(self, dog_ids, vectors):
+        """
+        Codifica e acrescenta vários cães de uma vez.
+
+        Returns:
+            int: Quantidade de cães adicionados (vetores de dimensão incompatível são ignorados).
+        """
+        pairs = [
+            (dog_id, np.asarray(vector, dtype=np.float32).ravel())
+            for dog_id, vector in zip(dog_ids, vectors) if has_vector(vector)
+        ]
+        dim = self.quantizer.dim
+        for dog_id, vector in pairs:
+            if vector.shape[0] != dim:
+                print(f"Aviso: vetor do cão {dog_id} ignorado (dimensão {vector.shape[0]} != {dim}).")
+        pairs = [(dog_id, vector) for dog_id, vector in pairs if vector.shape[0] == dim]
+        if not pairs:
+            return 0
+
+        unit, new_norms = self.quantizer.normalize(np.stack([vector for _, vector in pairs]))
+        new_codes = self.quantizer.encode(unit)
+        ids, codes, norms, size = self._state
+        needed = size + len(pairs)
+        if needed > len(ids):
+            capacity = max(16, 2 * len(ids), needed)
+            grown_ids = np.empty(capacity, dtype=np.int64)
+            grown_codes = np.empty((codes.shape[0], capacity), dtype=np.uint16)
+            grown_norms = np.empty(capacity, dtype=np.float32)
+            grown_ids[:size] = ids[:size]
+            grown_codes[:, :size] = codes[:, :size]
+            grown_norms[:size] = norms[:size]
+            ids, codes, norms = grown_ids, grown_codes, grown_norms
+
+        ids[size:needed] = [dog_id for dog_id, _ in pairs]
+        codes[:, size:needed] = new_codes
+        norms[size:needed] = new_norms
+        self._state = (ids, codes, norms, needed)
+        return len(pairs)
+
+    def add(self, dog_id, feature_vector):
+        return self.add_many([dog_id], [feature_vector]) == 1
+
+    def approximate_scores(self, query, metric):
+        """
+        Pontuações aproximadas (ADC) da consulta contra toda a galeria.
+
+        Returns:
+            np.array: Similaridades ('cosine') ou distâncias ('euclidean'), na ordem de `dog_ids`.
+        """
+        if metric not in self.METRICS:
+            raise ValueError(f"Métrica inválida: '{metric}'. Métricas disponíveis: {list(self.METRICS)}")
+        _, codes, norms = self._view()
+        query = np.asarray(query, dtype=np.float32).ravel()
+        unit, query_norm = self.quantizer.normalize(query)
+        offset, tables = self.quantizer.score_tables(unit)
+        cosine = np.full(codes.shape[1], offset, dtype=np.float32)
+        for pair in range(codes.shape[0]):
+            cosine += np.take(tables[pair], codes[pair])
+        if metric == "cosine":
+            return cosine
+        squared = query_norm ** 2 + norms ** 2 - 2.0 * query_norm * norms * cosine
+        return np.sqrt(np.maximum(squared, 0.0))
+
+    def top_k(self, query, metric, k=1, threshold=None, exact_vectors=None, shortlist=100):
+        """
+        Retorna os k cães mais próximos da consulta, do melhor para o pior.
+
+        Args:
+            query (list ou np.array): Vetor de características da imagem fornecida.
+            metric (str): 'euclidean' (menor distância) ou 'cosine' (maior similaridade).
+            k (int): Quantidade máxima de candidatos.
+            threshold (float): Distância máxima ('euclidean') ou similaridade mínima ('cosine'),
+                               aplicada à pontuação final (exata, se houver re-ranking).
+            exact_vectors (callable): Recebe uma lista de IDs e retorna linhas (dog_id, vetor)
+                                      originais; se informado, os `shortlist` melhores pela
+                                      pontuação aproximada são reordenados pela exata. Roda
+                                      na mesma thread; no servidor, o app separa as etapas
+                                      (`shortlist_ids`, busca no banco, `rescore`).
+            shortlist (int): Candidatos da etapa aproximada reordenados pela pontuação exata.
+
+        Returns:
+            list: Tuplas (dog_id, pontuação) ordenadas da melhor para a pior.
+        """
+        if exact_vectors is not None:
+            ids = self.shortlist_ids(query, metric, max(k, shortlist))
+            return self.rescore(exact_vectors(ids), query, metric, k=k, threshold=threshold) if ids else []
+        dog_ids = self.dog_ids
+        if not len(dog_ids) or k <= 0:
+            return []
+        scores = self.approximate_scores(query, metric)
+        candidates = self._best(scores, metric, k, threshold)
+        return [(int(dog_ids[i]), float(scores[i])) for i in candidates]
+
+    def shortlist_ids(self, query, metric, size):
+        """
+        Primeira etapa do re-ranking: IDs dos `size` melhores cães pela pontuação
+        aproximada, do melhor para o pior (sem limiar, aplicado só à pontuação exata).
+        """
+        dog_ids = self.dog_ids
+        if not len(dog_ids) or size <= 0:
+            return []
+        candidates = self._best(self.approximate_scores(query, metric), metric, size)
+        return [int(dog_ids[i]) for i in candidates]
+
+    @staticmethod
+    def rescore(rows, query, metric, k=1, threshold=None):
+        """
+        Segunda etapa do re-ranking: pontuação exata das linhas (dog_id, vetor) originais.
+
+        Returns:
+            list: Tuplas (dog_id, pontuação) ordenadas da melhor para a pior.
+        """
+        return GalleryMatcher.from_rows(rows).top_k(query, metric, k=k, threshold=threshold)
+
+    @staticmethod
+    def _best(scores, metric, count, threshold=None):
+        keys = scores if metric == "euclidean" else -scores
+        candidates = np.arange(len(keys))
+        if threshold is not None:
+            limit = threshold if metric == "euclidean" else -threshold
+            candidates = np.flatnonzero(keys <= limit)
+        if len(candidates) > count:
+            candidates = candidates[np.argpartition(keys[candidates], count - 1)[:count]]
+        return candidates[np.argsort(keys[candidates], kind="stable")]
+
+    def closest(self, query, metric, exact_vectors=None, shortlist=100):
+        best = self.top_k(query, metric, k=1, exact_vectors=exact_vectors, shortlist=shortlist)
+        return best[0] if best else (None, None)
+
+
+class PQGalleryCache(GalleryCache):
+    """
+    `GalleryCache` que guarda a galeria comprimida (`PQGallery`). A carga inicial percorre
+    a tabela `dogs` em páginas, codificando cada página, para não manter os vetores
+    originais de todos os cães em memória ao mesmo tempo.
+    """
+
+    def __init__(self, database, quantizer, refresh_interval=30.0, page_size=10000, refresh_window=1000):
+        super().__init__(database, refresh_interval=refresh_interval, refresh_window=refresh_window)
+        self.quantizer = quantizer
+        self.page_size = page_size
+
+    def _load(self):
+        gallery = PQGallery(self.quantizer)
+        high_water_mark = 0
+        self._recent = set()
+        while True:
+            rows = self.database.get_saved_features_since(high_water_mark, limit=self.page_size)
+            if not rows:
+                break
+            gallery.add_many([row[0] for row in rows], [row[1] for row in rows])
+            high_water_mark = rows[-1][0]
+            self._high_water_mark = high_water_mark
+            self._remember(row[0] for row in rows)
+        self._matcher = gallery
+        self._last_refresh = time.monotonic()
+
+
+def train_command(args):
+    from config import config
+    from database import DB
+
+    database = DB(config)
+    vectors = []
+    high_water_mark = 0
+    try:
+        while len(vectors) < args.max_vectors:
+            rows = database.get_saved_features_since(high_water_mark, limit=10000)
+            if not rows:
+                break
+            vectors.extend(np.asarray(row[1], dtype=np.float32) for row in rows if has_vector(row[1]))
+            high_water_mark = rows[-1][0]
+    finally:
+        database.close()
+    if not vectors:
+        raise SystemExit("Nenhum vetor cadastrado para treinar o quantizador.")
+
+    quantizer = ProductQuantizer.train(
+        np.stack(vectors), subspaces=args.subspaces, clusters=args.clusters,
+        iterations=args.iterations, max_vectors=args.max_vectors, seed=args.seed,
+    )
+    quantizer.save(args.output)
+    print(f"Quantizador {quantizer.version}: {quantizer.subspaces} subespaços x {quantizer.clusters} centros, "
+          f"{len(vectors)} vetores -> {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train = commands.add_parser("train", help="Treina (ou retreina) o quantizador com os vetores da tabela dogs.")
+    train.add_argument("--output", required=True, help="Arquivo .npz de saída.")
+    train.add_argument("--subspaces", type=int, default=16, help="Subespaços (bytes por cão).")
+    train.add_argument("--clusters", type=int, default=256, help="Centros por subespaço (máximo 256).")
+    train.add_argument("--iterations", type=int, default=20)
+    train.add_argument("--max-vectors", type=int, default=100000, help="Vetores usados no treino.")
+    train.add_argument("--seed", type=int, default=0)
+    train.set_defaults(func=train_command)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
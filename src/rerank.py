@@ -0,0 +1,269 @@
+# src/rerank.py
+"""
+Segunda etapa da identificação: verificação geométrica dos candidatos pré-selecionados.
+
+A busca pelo vetor global (galeria em memória ou pgvector) gera uma lista curta de N
+candidatos; só esses são comparados keypoint a keypoint (teste de razão de Lowe +
+homografia por RANSAC) com os descritores brutos gravados no cadastro. O custo por
+consulta depende de N, e não do tamanho da galeria.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+import metrics
+
+# Parâmetros do FLANN para descritores float (KD-tree)
+FLANN_INDEX_KDTREE = 1
+
+
+class GeometricVerifier:
+    """
+    Extrai os keypoints guardados por cão e verifica candidatos por correspondência
+    geométrica, em paralelo (o OpenCV libera o GIL durante o casamento e o RANSAC).
+    """
+
+    def __init__(self, sift, max_keypoints=500, ratio=0.75, ransac_threshold=5.0, min_inliers=8, workers=4):
+        """
+        Args:
+            sift (SIFTExtractor): Detector usado no cadastro e na consulta (mesmo `nfeatures`).
+            max_keypoints (int): Keypoints guardados por imagem (os de maior resposta).
+            ratio (float): Limite do teste de razão de Lowe.
+            ransac_threshold (float): Erro máximo de reprojeção, em pixels, de um inlier.
+            min_inliers (int): Inliers a partir dos quais a correspondência é considerada verificada.
+            workers (int): Threads usadas para verificar os candidatos em paralelo (0 verifica
+                           em sequência, na thread que chamou `rerank`).
+        """
+        self.sift = sift
+        self.max_keypoints = max_keypoints
+        self.ratio = ratio
+        self.ransac_threshold = ransac_threshold
+        self.min_inliers = min_inliers
+        self.workers = workers
+        self._local = threading.local()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def params(self):
+        return {"detector": self.sift.params, "max_keypoints": self.max_keypoints}
+
+    def matcher(self):
+        """Retorna o matcher FLANN desta thread, criando-o no primeiro uso."""
+        matcher = getattr(self._local, "matcher", None)
+        if matcher is None:
+            matcher = cv2.FlannBasedMatcher(dict(algorithm=FLANN_INDEX_KDTREE, trees=4), dict(checks=32))
+            self._local.matcher = matcher
+        return matcher
+
+    def describe(self, image):
+        """
+        Keypoints a guardar para a imagem.
+
+        Args:
+            image (ImageData): Imagem já normalizada (a mesma usada na extração das features).
+
+        Returns:
+            tuple: (pontos N x 2 float32, descritores N x 128 uint8), ou None sem keypoints.
+        """
+        keypoints, descriptors = self.sift.detect(image)
+        if descriptors is None or len(keypoints) < 2:
+            return None
+        order = np.argsort([-keypoint.response for keypoint in keypoints], kind="stable")[:self.max_keypoints]
+        points = np.array([keypoints[i].pt for i in order], dtype=np.float32)
+        # Os descritores SIFT do OpenCV já são inteiros entre 0 e 255: uint8 não perde nada
+        return points, np.clip(descriptors[order], 0, 255).astype(np.uint8)
+
+    def verify(self, query, candidate):
+        """
+        Conta os inliers da homografia entre a consulta e um candidato.
+
+        Args:
+            query (tuple): (pontos, descritores) da imagem consultada.
+            candidate (tuple): (pontos, descritores) guardados do cão.
+
+        Returns:
+            tuple: (inliers, correspondências que passaram no teste de razão).
+        """
+        query_points, query_descriptors = query
+        points, descriptors = candidate
+        if len(query_descriptors) < 2 or len(descriptors) < 2:
+            return 0, 0
+        pairs = self.matcher().knnMatch(
+            query_descriptors.astype(np.float32), descriptors.astype(np.float32), k=2
+        )
+        good = [pair[0] for pair in pairs if len(pair) == 2 and pair[0].distance < self.ratio * pair[1].distance]
+        if len(good) < 4:
+            return 0, len(good)
+        source = query_points[[match.queryIdx for match in good]].reshape(-1, 1, 2)
+        target = points[[match.trainIdx for match in good]].reshape(-1, 1, 2)
+        _, mask = cv2.findHomography(source, target, cv2.RANSAC, self.ransac_threshold)
+        return (int(mask.sum()) if mask is not None else 0), len(good)
+
+    def confidence(self, inliers):
+        """Confiança a partir da quantidade de inliers: 0,5 em `min_inliers`, tendendo a 1."""
+        return inliers / float(inliers + self.min_inliers)
+
+    def _pool(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="rerank")
+        return self._executor
+
+    def rerank(self, query, candidates, keypoints):
+        """
+        Reordena os candidatos pela quantidade de inliers (empates mantêm a ordem da 1ª etapa).
+
+        Args:
+            query (tuple): (pontos, descritores) da imagem consultada.
+            candidates (list): Tuplas (dog_id, pontuação) da busca pelo vetor global.
+            keypoints (dict): {dog_id: (pontos, descritores)} guardados; cães ausentes ficam com 0 inliers.
+
+        Returns:
+            list: Dicts {dog_id, score, inliers, matches, confidence, verified}, do melhor para o pior.
+        """
+        def verify_one(candidate):
+            stored = keypoints.get(candidate[0])
+            return self.verify(query, stored) if stored is not None else (0, 0)
+
+        if self.workers > 0:
+            verified = list(self._pool().map(verify_one, candidates))
+        else:
+            verified = [verify_one(candidate) for candidate in candidates]
+        results = [
+            {
+                "dog_id": dog_id,
+                "score": score,
+                "inliers": inliers,
+                "matches": matches,
+                "confidence": self.confidence(inliers),
+                "verified": inliers >= self.min_inliers,
+            }
+            for (dog_id, score), (inliers, matches) in zip(candidates, verified)
+        ]
+        return sorted(results, key=lambda result: -result["inliers"])
+
+
+def pack_keypoints(points, descriptors):
+    """
+    Serializa (pontos, descritores) para as colunas de `dog_keypoints`.
+
+    Returns:
+        tuple: (bytes dos pontos, bytes dos descritores, quantidade de keypoints).
+    """
+    return (
+        np.ascontiguousarray(points, dtype=np.float32).tobytes(),
+        np.ascontiguousarray(descriptors, dtype=np.uint8).tobytes(),
+        len(points),
+    )
+
+
+def unpack_keypoints(points, descriptors):
+    """Inverso de `pack_keypoints`, sem cópia (np.frombuffer)."""
+    return (
+        np.frombuffer(points, dtype=np.float32).reshape(-1, 2),
+        np.frombuffer(descriptors, dtype=np.uint8).reshape(-1, 128),
+    )
+
+
+class KeypointCache:
+    """
+    Cache LRU dos keypoints guardados, para não buscar no banco os mesmos candidatos a
+    cada consulta. Cães ausentes do cache são buscados em uma única consulta.
+    """
+
+    def __init__(self, database, max_entries=5000):
+        self.database = database
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get_many(self, dog_ids):
+        """
+        Returns:
+            dict: {dog_id: (pontos, descritores)} dos cães que têm keypoints guardados.
+        """
+        found = {}
+        with self._lock:
+            for dog_id in dog_ids:
+                entry = self._entries.get(dog_id)
+                if entry is not None:
+                    self._entries.move_to_end(dog_id)
+                    found[dog_id] = entry
+        missing = [dog_id for dog_id in dog_ids if dog_id not in found]
+        metrics.CACHE_REQUESTS.inc(len(found), cache="keypoint", result="hit")
+        metrics.CACHE_REQUESTS.inc(len(missing), cache="keypoint", result="miss")
+        if missing:
+            loaded = {
+                dog_id: unpack_keypoints(points, descriptors)
+                for dog_id, points, descriptors in self.database.get_dog_keypoints(missing)
+            }
+            self.put_many(loaded)
+            found.update(loaded)
+        return found
+
+    def put_many(self, entries):
+        with self._lock:
+            for dog_id, entry in entries.items():
+                self._entries[dog_id] = entry
+                self._entries.move_to_end(dog_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def backfill_command(args):
+    from config import Config, config
+    from database import DB
+    from image_data import ImageData
+    from image_fetcher import fetch_image
+    from strategies.sift_extractor import SIFTExtractor
+
+    verifier = GeometricVerifier(SIFTExtractor(nfeatures=Config.SIFT_NFEATURES), max_keypoints=Config.RERANK_MAX_KEYPOINTS)
+    database = DB(config)
+    stored = failed = 0
+    try:
+        for dog_id, image_url in database.get_dogs_without_keypoints():
+            try:
+                image = ImageData(
+                    data=fetch_image(image_url),
+                    max_side=Config.IMAGE_MAX_SIDE,
+                    reduced_decode=Config.IMAGE_REDUCED_DECODE,
+                )
+                described = verifier.describe(image)
+            except Exception as e:
+                print(f"Cão {dog_id} ignorado: {e}")
+                failed += 1
+                continue
+            if described is None:
+                failed += 1
+                continue
+            if database.save_dog_keypoints(dog_id, pack_keypoints(*described), verifier.params) is None:
+                failed += 1
+            else:
+                stored += 1
+    finally:
+        database.close()
+    print(f"Keypoints gravados para {stored} cães, {failed} falhas.")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manutenção dos keypoints usados no re-ranking geométrico.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backfill = commands.add_parser("backfill", help="Grava os keypoints dos cães cadastrados que ainda não os têm.")
+    backfill.set_defaults(func=backfill_command)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# src/serving.py
+"""
+Modo de atendimento assíncrono (worker gevent do gunicorn).
+
+No modo padrão (SERVING_MODE=sync) cada worker sync atende uma requisição por vez, e
+quase todo o tempo de uma identificação é espera: download da imagem do bucket e
+consultas ao Postgres. Com SERVING_MODE=gevent (ver `gunicorn.conf.py`), cada requisição
+roda em um greenlet; o download (`requests`, com os sockets do gevent) e o banco
+(psycopg2 com o callback do psycogreen) cedem a vez enquanto esperam a rede, então um
+worker mantém centenas de requisições em andamento sem uma thread por requisição.
+
+O trabalho de CPU (decodificação, extração, busca na galeria, verificação geométrica)
+travaria o loop do gevent; ele roda em `CPUExecutor`, um pool limitado de threads nativas
+(OpenCV e NumPy liberam o GIL). Fora do gevent o executor só chama a função na própria
+thread, e o comportamento é o de sempre.
+"""
+import contextvars
+
+
+class CPUBusy(RuntimeError):
+    """Há trabalho de CPU demais em andamento; a requisição não entrou na fila a tempo."""
+
+
+def gevent_active():
+    """True se o processo roda com o monkey patching do gevent (worker gevent do gunicorn)."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("socket")
+
+
+def patch_psycopg():
+    """
+    Torna o psycopg2 cooperativo (espera pelo socket via gevent). Precisa rodar antes da
+    primeira conexão; o gunicorn chama em `post_fork`, e o app chama de novo ao importar
+    (a segunda chamada não tem efeito).
+    """
+    from psycogreen.gevent import patch_psycopg as patch
+
+    patch()
+
+
+class CPUExecutor:
+    """
+    Executor limitado para o trabalho de CPU das requisições.
+
+    No modo gevent, `run` envia a função para um pool de `workers` threads nativas e o
+    greenlet da requisição espera sem bloquear os demais. O número de tarefas em
+    andamento (na fila ou rodando) é limitado por `max_pending`; acima disso, `run`
+    espera até `submit_timeout` segundos e então lança `CPUBusy`.
+    """
+
+    def __init__(self, workers, max_pending=None, submit_timeout=30.0):
+        """
+        Args:
+            workers (int): Threads nativas para o trabalho de CPU (padrão do app: núcleos).
+            max_pending (int): Máximo de tarefas em andamento (padrão: 4 x workers).
+            submit_timeout (float): Segundos esperando vaga antes de desistir.
+        """
+        self.workers = max(1, workers)
+        self.max_pending = max_pending or 4 * self.workers
+        self.submit_timeout = submit_timeout
+        self._pool = None
+        self._slots = None
+        self._in_flight = 0
+        self._rejected = 0
+
+    @property
+    def offloading(self):
+        return self._pool is not None
+
+    def start(self):
+        """Cria o pool de threads se o processo estiver no modo gevent; senão, não faz nada."""
+        if self._pool is not None or not gevent_active():
+            return
+        from gevent.lock import BoundedSemaphore
+        from gevent.threadpool import ThreadPool
+
+        self._slots = BoundedSemaphore(self.max_pending)
+        self._pool = ThreadPool(self.workers)
+
+    def run(self, function, *args, **kwargs):
+        """
+        Executa `function(*args, **kwargs)` e retorna o resultado (ou propaga a exceção).
+
+        Raises:
+            CPUBusy: Se nenhuma vaga abrir dentro de `submit_timeout` (só no modo gevent).
+        """
+        if self._pool is None:
+            return function(*args, **kwargs)
+        if not self._slots.acquire(timeout=self.submit_timeout):
+            self._rejected += 1
+            raise CPUBusy(f"Mais de {self.max_pending} tarefas de CPU em andamento.")
+        self._in_flight += 1
+        try:
+            # Leva o contexto da requisição (medições do Server-Timing) para a thread do pool
+            context = contextvars.copy_context()
+            return self._pool.spawn(context.run, function, *args, **kwargs).get()
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+    def stats(self):
+        return {
+            "mode": "gevent" if self.offloading else "inline",
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": self._in_flight,
+            "rejected": self._rejected,
+        }
@@ -1,6 +1,5 @@
 # src/similarity_metrics.py
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 
 class EuclideanSimilarity:
     def compare(self, features1, features2):
@@ -29,4 +28,7 @@ class CosineSimilarity:
         Returns:
             float: Similaridade cosseno entre os vetores de características.
         """
+        # O scikit-learn leva ~1s para importar; só é carregado quando a métrica é usada
+        from sklearn.metrics.pairwise import cosine_similarity
+
         return cosine_similarity([features1], [features2])[0][0]
\ No newline at end of file
@@ -0,0 +1,119 @@
+# src/startup.py
+"""
+Medição da inicialização do serviço (importações, criação dos objetos e pré-aquecimento).
+
+No Cloud Run cada instância nova só atende depois de importar o app e aquecer a galeria
+e os detectores, então esse tempo entra direto na latência de quem chega com o serviço
+escalado a zero. O relatório (`/v2/startup`) mostra quanto cada etapa custou e se o total
+ficou dentro de STARTUP_BUDGET_MS.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Marco zero: este módulo é o primeiro importado pelo app
+_STARTED = time.perf_counter()
+
+
+class StartupReport:
+    """Tempos de cada etapa da inicialização, em milissegundos desde o início do processo."""
+
+    def __init__(self, started=None):
+        self.started = _STARTED if started is None else started
+        self.budget_ms = 0.0
+        self._lock = threading.Lock()
+        self._last_checkpoint = self.started
+        self._stages = []
+        self._errors = {}
+        self._ready_at = None
+        self._ready = threading.Event()
+
+    def _record(self, name, started, finished):
+        with self._lock:
+            self._stages.append({
+                "name": name,
+                "start_ms": round((started - self.started) * 1000.0, 1),
+                "ms": round((finished - started) * 1000.0, 1),
+            })
+
+    def checkpoint(self, name):
+        """Registra a etapa `name` como o tempo decorrido desde o checkpoint anterior."""
+        now = time.perf_counter()
+        self._record(name, self._last_checkpoint, now)
+        self._last_checkpoint = now
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Mede o bloco `with` como a etapa `name`. Erros são registrados no relatório e
+        não interrompem a inicialização (a etapa é refeita sob demanda no primeiro uso).
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self._errors[name] = str(e)
+            logger.warning("Etapa de inicialização '%s' falhou: %s", name, e)
+        finally:
+            self._record(name, started, time.perf_counter())
+            self._last_checkpoint = time.perf_counter()
+
+    def mark_ready(self):
+        self._ready_at = time.perf_counter()
+        self._ready.set()
+        report = self.as_dict()
+        logger.info("Serviço pronto em %.0f ms", report["ready_ms"])
+        if not report["within_budget"]:
+            logger.warning(
+                "Inicialização levou %.0f ms, acima do orçamento de %.0f ms", report["ready_ms"], self.budget_ms
+            )
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def as_dict(self):
+        with self._lock:
+            stages = list(self._stages)
+        ready_ms = (self._ready_at - self.started) * 1000.0 if self._ready_at is not None else None
+        return {
+            "ready": self.ready,
+            "ready_ms": round(ready_ms, 1) if ready_ms is not None else None,
+            "uptime_ms": round((time.perf_counter() - self.started) * 1000.0, 1),
+            "budget_ms": self.budget_ms or None,
+            "within_budget": not self.budget_ms or ready_ms is None or ready_ms <= self.budget_ms,
+            "stages": stages,
+            "errors": dict(self._errors),
+        }
+
+
+startup_report = StartupReport()
+
+
+def run_prewarm(steps, background=False):
+    """
+    Executa as etapas de pré-aquecimento e marca o serviço como pronto ao final.
+
+    Args:
+        steps (list): Tuplas (nome, função) executadas em ordem.
+        background (bool): Se True, roda em uma thread, sem bloquear a importação do app
+                           (o serviço responde, mas `/readyz` só fica OK ao final).
+    """
+    def prewarm():
+        for name, step in steps:
+            with startup_report.stage(f"prewarm:{name}"):
+                step()
+        startup_report.mark_ready()
+
+    if not background:
+        prewarm()
+        return None
+    thread = threading.Thread(target=prewarm, name="startup-prewarm", daemon=True)
+    thread.start()
+    return thread
@@ -1,23 +1,82 @@
 # src/strategies/hog_extractor.py
+import threading
+
 from skimage.feature import hog
 from PIL import Image
 import numpy as np
 import cv2
 
+from image_data import as_image_data
+
 
 class HOGExtractor:
+    # A imagem é redimensionada para uma única janela, então o vetor tem sempre o mesmo
+    # tamanho (15 x 15 blocos x 4 células x 9 orientações = 8100 posições), qualquer que
+    # seja a foto: vetores de fotos diferentes são comparáveis e cabem no pgvector
+    WINDOW = (128, 128)
+    BLOCK = (16, 16)
+    BLOCK_STRIDE = (8, 8)
+    CELL = (8, 8)
+    NBINS = 9
+
+    def __init__(self):
+        self.name = "HOG"
+        # Um descritor HOG por thread, reaproveitado entre as requisições
+        self._local = threading.local()
+
+    def __getstate__(self):
+        # Os detectores por thread não são serializáveis; são recriados no destino
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @property
+    def params(self):
+        """Parâmetros que determinam o vetor gerado (registrados junto a cada vetor salvo)."""
+        return {
+            "strategy": self.name,
+            "descriptor": "cv2.HOGDescriptor",
+            "window": list(self.WINDOW),
+            "block": list(self.BLOCK),
+            "block_stride": list(self.BLOCK_STRIDE),
+            "cell": list(self.CELL),
+            "nbins": self.NBINS,
+            "opencv": cv2.__version__,
+        }
+
+    @property
+    def dim(self):
+        """Tamanho do vetor gerado."""
+        return self.descriptor().getDescriptorSize()
+
+    def descriptor(self):
+        """Retorna o descritor HOG desta thread, criando-o no primeiro uso."""
+        hog = getattr(self._local, "hog", None)
+        if hog is None:
+            hog = cv2.HOGDescriptor(self.WINDOW, self.BLOCK, self.BLOCK_STRIDE, self.CELL, self.NBINS)
+            self._local.hog = hog
+        return hog
+
+    def warmup(self):
+        """Cria o descritor da thread atual e executa um cálculo descartável."""
+        self.descriptor().compute(np.zeros(self.WINDOW[::-1], dtype=np.uint8))
+
     def extract(self, image):
         """
         Extrai características HOG (Histograma de Gradientes Orientados) da imagem.
         
         Args:
-            image (PIL.Image): Imagem a ser processada.
+            image (PIL.Image ou ImageData): Imagem a ser processada.
         
         Returns:
-            list: Vetor de características HOG.
+            list: Vetor de características HOG, de tamanho fixo (`dim`).
         """
-        # Converte a imagem para array de numpy em escala de cinza
-        image_array = np.array(image.convert("L"))
+        # Usa a escala de cinza compartilhada da imagem decodificada
+        image_array = as_image_data(image).gray
         
         # Certifica-se de que a imagem tenha o tipo de dado correto
         image_array = np.uint8(image_array)  # Converte para o tipo esperado pelo OpenCV
@@ -30,12 +89,11 @@ class HOGExtractor:
         if len(image_array.shape) != 2:
             raise ValueError("A imagem precisa ser 2D (escala de cinza), mas foi recebida com forma {}".format(image_array.shape))
         
-        # Inicializa o descritor HOG do OpenCV
-        hog = cv2.HOGDescriptor()
+        # Uma única janela cobrindo a imagem inteira: o tamanho do vetor não depende da foto
+        image_array = cv2.resize(image_array, self.WINDOW, interpolation=cv2.INTER_AREA)
 
-        # Diagnóstico: Verificar se a imagem tem valores dentro do esperado
-        print("Shape da imagem:", image_array.shape)
-        print("Valores da imagem (exemplo):", image_array[0, :10])  # Apenas mostra os primeiros valores da primeira linha
+        # Descritor HOG do OpenCV já criado para esta thread
+        hog = self.descriptor()
 
         try:
             # Calcula os descritores HOG da imagem
@@ -47,9 +105,6 @@ class HOGExtractor:
         if features is None or features.size == 0:
             raise ValueError("Falha ao calcular os descritores HOG. A imagem pode ser inadequada para este processo.")
         
-        # Diagnóstico: Verificar as características extraídas
-        print("Características HOG extraídas (exemplo):", features[:10])  # Mostra os primeiros 10 valores das características
-
         # Transforma o resultado em um vetor 1D
         features = features.flatten()  # Transforma o array de características em um vetor 1D
         
@@ -1,13 +1,42 @@
 # src/strategies/keypoints_extractor.py
+import threading
+
 from src.features import FeatureExtractor
+from image_data import as_image_data
 import cv2
 import numpy as np
 
 class KeypointsExtractor(FeatureExtractor):
+    def __init__(self):
+        self.name = "Keypoints"
+        self._local = threading.local()
+
+    def __getstate__(self):
+        # Os detectores por thread não são serializáveis; são recriados no destino
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @property
+    def params(self):
+        return {"strategy": self.name, "detector": "SIFT", "opencv": cv2.__version__}
+
+    def detector(self):
+        """Retorna o detector SIFT desta thread, criando-o no primeiro uso."""
+        sift = getattr(self._local, "sift", None)
+        if sift is None:
+            sift = cv2.SIFT_create()
+            self._local.sift = sift
+        return sift
+
     def extract(self, image):
         """Extrai keypoints e seus descritores usando SIFT."""
-        gray_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
-        sift = cv2.SIFT_create()
+        gray_image = as_image_data(image).gray
+        sift = self.detector()
         keypoints, descriptors = sift.detectAndCompute(gray_image, None)
         return descriptors  # Retorna os descritores dos keypoints
 		
\ No newline at end of file
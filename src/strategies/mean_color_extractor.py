@@ -1,18 +1,21 @@
-import requests
 import cv2
 import numpy as np
 from io import BytesIO
 
+from image_data import as_image_data
+from image_fetcher import fetch_image
+
 class MeanColorExtractor:
+    name = "MeanColor"
+    params = {"strategy": "MeanColor", "color_space": "RGB", "size": 128}
+
     def extract1(self, image_url):
         try:
             # Baixar a imagem da URL
-            response = requests.get(image_url)
-            if response.status_code != 200:
-                raise ValueError(f"Erro ao baixar a imagem: status {response.status_code}")
+            image_data = fetch_image(image_url)
 
             # Converte os dados da imagem para um array NumPy
-            image = np.array(bytearray(response.content), dtype=np.uint8)
+            image = np.frombuffer(image_data, dtype=np.uint8)
             
             # Decodifica a imagem para o formato adequado
             image = cv2.imdecode(image, cv2.IMREAD_COLOR)
@@ -35,12 +38,12 @@ class MeanColorExtractor:
         Extrai a média de cor da imagem.
 
         Args:
-            image (PIL.Image): Imagem a ser processada.
+            image (PIL.Image ou ImageData): Imagem a ser processada.
 
         Returns:
             np.array: Vetor de características de dimensão 128.
         """
-        image_array = np.array(image)
+        image_array = as_image_data(image).rgb
         mean_colors = np.mean(image_array, axis=(0, 1))  # Vetor de dimensão (3,)
 
         # Redimensiona para 128 dimensões (repetindo valores ou interpolando)
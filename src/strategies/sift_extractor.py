@@ -1,10 +1,12 @@
 # src/strategies/sift_extractor.py
+import threading
+
 import cv2
 import numpy as np
-import requests
 
+from image_data import as_image_data
+from image_fetcher import fetch_image
 from src.features import FeatureExtractor
-from sklearn.metrics.pairwise import cosine_similarity
 
 from io import BytesIO
 from PIL import Image
@@ -13,15 +15,67 @@ class SIFTExtractor:
     """
     Classe responsável por extrair características SIFT de uma imagem fornecida.
     """
-    def __init__(self):
+    def __init__(self, nfeatures=0):
+        """
+        Args:
+            nfeatures (int): Quantidade máxima de keypoints mantidos (os de maior resposta).
+                             0 mantém todos.
+        """
         self.name = "SIFT"
+        self.nfeatures = nfeatures
+        # Um detector por thread: a criação sai do caminho da requisição e instâncias
+        # do OpenCV não são compartilhadas entre threads
+        self._local = threading.local()
+
+    def __getstate__(self):
+        # Os detectores por thread não são serializáveis; são recriados no destino
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @property
+    def params(self):
+        """Parâmetros que determinam o vetor gerado (registrados junto a cada vetor salvo)."""
+        return {"strategy": self.name, "nfeatures": self.nfeatures, "pooling": "mean", "opencv": cv2.__version__}
+
+    def detector(self):
+        """Retorna o detector SIFT desta thread, criando-o no primeiro uso."""
+        sift = getattr(self._local, "sift", None)
+        if sift is None:
+            sift = cv2.SIFT_create(nfeatures=self.nfeatures)
+            self._local.sift = sift
+        return sift
+
+    def warmup(self):
+        """Cria o detector da thread atual e executa uma extração descartável."""
+        self.detector().detectAndCompute(np.random.default_rng(0).integers(0, 255, (64, 64), dtype=np.uint8), None)
+
+    def detect(self, image_input):
+        """
+        Detecta os keypoints e calcula os descritores SIFT brutos da imagem.
+
+        O resultado fica guardado na própria `ImageData`, então outras estratégias que usam
+        os mesmos descritores (ex.: VLAD) não repetem a detecção.
+
+        Returns:
+            tuple: (keypoints, descritores N x 128 float32 ou None).
+        """
+        image = as_image_data(image_input)
+        # Escala de cinza compartilhada com as demais estratégias da mesma imagem
+        return image.derived(
+            f"sift:{self.nfeatures}", lambda: self.detector().detectAndCompute(image.gray, None)
+        )
 
     def extract(self, image_input):
         """
-        Extrai características SIFT de uma imagem fornecida via URL ou objeto PIL.Image.
+        Extrai características SIFT de uma imagem fornecida via URL, objeto PIL.Image ou ImageData.
 
         Args:
-            image_input (str ou PIL.Image): URL da imagem ou objeto PIL.Image.
+            image_input (str, PIL.Image ou ImageData): URL da imagem ou imagem já carregada.
 
         Returns:
             list: Vetor unidimensional das características SIFT extraídas.
@@ -30,36 +84,8 @@ class SIFTExtractor:
             RuntimeError: Em caso de falha na extração ou processamento da imagem.
         """
         try:
-            # Determinar se a entrada é uma URL ou um objeto PIL.Image
-            if isinstance(image_input, str):
-                # Fazer o download da imagem a partir da URL
-                response = requests.get(image_input)
-                if response.status_code != 200:
-                    raise ValueError(f"Erro ao baixar a imagem. Código de status: {response.status_code}")
-
-                # Decodificar a imagem para um array OpenCV
-                image_array = np.frombuffer(response.content, np.uint8)
-                image = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-
-            elif isinstance(image_input, Image.Image):
-                # Converter o objeto PIL.Image em um array OpenCV
-                image = cv2.cvtColor(np.array(image_input), cv2.COLOR_RGB2BGR)
-
-            else:
-                raise ValueError("Entrada inválida. Forneça uma URL ou um objeto PIL.Image.")
-
-            # Verificar se a imagem foi carregada corretamente
-            if image is None:
-                raise ValueError("Erro ao carregar a imagem. A imagem pode estar corrompida ou o URL é inválido.")
-
-            # Converter a imagem para escala de cinza
-            gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-            # Inicializar o SIFT
-            sift = cv2.SIFT_create()
-
-            # Detectar keypoints e calcular descritores
-            keypoints, descriptors = sift.detectAndCompute(gray_image, None)
+            # Detectar keypoints e calcular descritores (URL, PIL.Image ou ImageData já decodificada)
+            keypoints, descriptors = self.detect(image_input)
 
             # Verificar se os descritores foram gerados
             if descriptors is None or len(descriptors) == 0:
@@ -83,7 +109,7 @@ class SIFTExtractor:
 class SIFTExtractor2(FeatureExtractor):
     def extract1(self, image_url):
         # Carregar a imagem a partir da URL
-        image_data = requests.get(image_url).content
+        image_data = fetch_image(image_url)
         image_array = np.frombuffer(image_data, np.uint8)
         image = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
         
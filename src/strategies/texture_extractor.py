@@ -1,12 +1,16 @@
 # src/strategies/texture_extractor.py
 from src.features import FeatureExtractor
+from image_data import as_image_data
 from skimage import feature
 import numpy as np
 
 class TextureExtractor(FeatureExtractor):
+    name = "Texture"
+    params = {"strategy": "Texture", "method": "LBP uniform", "P": 24, "R": 3}
+
     def extract(self, image):
         """Extrai descritores de textura usando LBP."""
-        gray_image = image.convert('L')
-        lbp = feature.local_binary_pattern(np.array(gray_image), P=24, R=3, method="uniform")
+        gray_image = as_image_data(image).gray
+        lbp = feature.local_binary_pattern(gray_image, P=24, R=3, method="uniform")
         hist, _ = np.histogram(lbp.ravel(), bins=np.arange(0, 24 + 3), range=(0, 24 + 2))
-        return hist / hist.sum()  # Normaliza o histograma
+        return (hist / hist.sum()).tolist()  # Normaliza o histograma
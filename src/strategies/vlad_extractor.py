@@ -0,0 +1,47 @@
+# src/strategies/vlad_extractor.py
+from strategies.sift_extractor import SIFTExtractor
+
+
+class VLADExtractor:
+    """
+    Codifica os descritores SIFT brutos com um codebook treinado (VLAD ou BoVW), em vez
+    da média dos descritores usada pelo `SIFTExtractor`.
+
+    A detecção SIFT é compartilhada com o `SIFTExtractor` de mesmo `nfeatures` quando os
+    dois rodam sobre a mesma `ImageData`.
+    """
+
+    def __init__(self, codebook, encoding="vlad", nfeatures=0):
+        """
+        Args:
+            codebook (VisualCodebook): Vocabulário visual treinado (ver `codebook.py`).
+            encoding (str): 'vlad' ou 'bovw'.
+            nfeatures (int): Quantidade máxima de keypoints SIFT (0 mantém todos).
+        """
+        self.codebook = codebook
+        self.encoding = encoding
+        self.sift = SIFTExtractor(nfeatures=nfeatures)
+        self.name = "VLAD" if encoding == "vlad" else "BoVW"
+
+    @property
+    def params(self):
+        return {
+            "strategy": self.name,
+            "encoding": self.encoding,
+            "codebook": self.codebook.version,
+            "words": self.codebook.n_words,
+            "sift": self.sift.params,
+        }
+
+    def warmup(self):
+        self.sift.warmup()
+
+    def extract(self, image):
+        """
+        Returns:
+            list: Vetor VLAD (palavras x 128) ou BoVW (palavras), normalizado (L2).
+        """
+        _, descriptors = self.sift.detect(image)
+        if descriptors is None or len(descriptors) == 0:
+            raise ValueError("Nenhum descritor SIFT encontrado na imagem.")
+        return self.codebook.encode(descriptors, self.encoding).tolist()
@@ -0,0 +1,42 @@
+# src/thumbnails.py
+import hashlib
+
+import cv2
+
+from cache_store import TieredCache
+from image_data import ImageData
+
+
+def make_thumbnail(image_bytes, max_side=160, quality=80):
+    """
+    Miniatura JPEG da imagem, com o maior lado limitado a `max_side` pixels.
+
+    Usa a decodificação reduzida de `ImageData`, então uma foto grande não é decodificada
+    na resolução original só para virar miniatura.
+
+    Returns:
+        bytes: Miniatura codificada em JPEG.
+    """
+    image = ImageData(image_bytes, max_side=max_side, reduced_decode=True).bgr
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Erro ao gerar a miniatura da imagem.")
+    return encoded.tobytes()
+
+
+class ThumbnailCache(TieredCache):
+    """
+    Cache das miniaturas da listagem de cães, em memória (LRU limitado por bytes) e,
+    opcionalmente, em disco (diretório limitado por bytes), sobre o armazenamento comum
+    de `cache_store`.
+
+    A chave combina a URL da imagem original com o tamanho e a qualidade da miniatura;
+    ela também serve de ETag, então o navegador revalida sem baixar a miniatura de novo.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, disk_dir=None, disk_max_bytes=256 * 1024 * 1024):
+        super().__init__(max_bytes, disk_dir=disk_dir, disk_max_bytes=disk_max_bytes, suffix=".jpg", metric="thumbnail")
+
+    @staticmethod
+    def key(image_url, max_side, quality):
+        return hashlib.sha256(f"{image_url}|{max_side}|{quality}".encode()).hexdigest()
@@ -0,0 +1,84 @@
+# src/vector_codec.py
+"""
+Formato compacto dos vetores de características guardados no Postgres.
+
+Os vetores são gravados em colunas bytea com os valores em float16 little-endian: 2 bytes
+por valor, contra 8 do float8[], e leitura direta para NumPy com `np.frombuffer`, sem
+criar um float Python por elemento. Os descritores SIFT brutos de `dog_keypoints` já usam
+o mesmo esquema, em uint8 (ver `rerank.pack_keypoints`).
+
+A coluna compacta substitui o vetor original (`dogs.feature_vector` float8[] e
+`features.feature_vector` pgvector), gravado só quando o vetor não cabe em float16 (ver
+`database.dog_vector_columns` e `database.strategy_vector_columns`). A busca no pgvector
+usa apenas `dogs.embedding`.
+
+Linhas gravadas antes de `postgres/migrations/010_dogs_packed_only.sql` e
+`011_features_packed_only.sql` guardam o original (e, antes da 006, só ele; a leitura
+volta a esse formato) até rodar, o que grava a cópia compacta e apaga o original:
+
+    python src/vector_codec.py backfill
+"""
+import numpy as np
+
+# float16 little-endian: ~3 dígitos significativos, sobra para SIFT (0-255), HOG e histogramas
+STORAGE_DTYPE = np.dtype("<f2")
+
+
+def pack_vector(values, dtype=STORAGE_DTYPE):
+    """
+    Serializa um vetor para a coluna bytea.
+
+    Returns:
+        bytes: Valores contíguos em `dtype`, ou None se algum valor não couber no formato
+               (a linha fica só com a coluna original).
+    """
+    vector = np.asarray(values, dtype=np.float64).ravel()
+    with np.errstate(over="ignore"):
+        packed = vector.astype(dtype)
+    if not np.all(np.isfinite(packed[np.isfinite(vector)])):
+        return None
+    return packed.tobytes()
+
+
+def unpack_vector(data, dtype=STORAGE_DTYPE):
+    """Inverso de `pack_vector`, sem cópia (np.frombuffer; o array é somente leitura)."""
+    return np.frombuffer(data, dtype=dtype)
+
+
+def unpack_rows(rows):
+    """
+    Converte linhas (..., packed, original) vindas do banco em (..., vetor), usando a
+    coluna compacta quando preenchida e a original caso contrário.
+    """
+    return [
+        (*row[:-2], unpack_vector(row[-2]) if row[-2] is not None else row[-1])
+        for row in rows
+    ]
+
+
+def backfill_command(args):
+    from config import config
+    from database import DB
+
+    database = DB(config)
+    try:
+        dogs, features = database.pack_stored_vectors(batch_size=args.batch_size)
+    finally:
+        database.close()
+    print(f"Vetores compactados: {dogs} em dogs, {features} em features.")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manutenção do formato compacto dos vetores guardados.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backfill = commands.add_parser("backfill", help="Preenche as colunas compactas das linhas antigas.")
+    backfill.add_argument("--batch-size", type=int, default=1000, help="Linhas convertidas por transação.")
+    backfill.set_defaults(func=backfill_command)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
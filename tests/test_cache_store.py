@@ -0,0 +1,83 @@
+# tests/test_cache_store.py
+import os
+
+from cache_store import DiskStore, MemoryLRU, TieredCache
+from feature_cache import FeatureCache
+from image_fetcher import ImageCache
+from thumbnails import ThumbnailCache
+
+
+def test_memory_lru_is_bounded_by_bytes():
+    lru = MemoryLRU(10)
+    lru.put("a", b"1234")
+    lru.put("b", b"1234")
+    lru.get("a")
+    lru.put("c", b"1234")
+    assert lru.get("b") is None
+    assert lru.get("a") == b"1234" and lru.get("c") == b"1234"
+    lru.put("big", b"x" * 11)
+    assert lru.get("big") is None
+
+
+def test_disk_store_scans_directory_only_when_over_limit(tmp_path, monkeypatch):
+    scans = []
+    import cache_store
+    original = cache_store.prune_directory
+    monkeypatch.setattr(cache_store, "prune_directory", lambda *a: scans.append(a) or original(*a))
+
+    store = DiskStore(str(tmp_path), max_bytes=100, suffix=".bin")
+    assert len(scans) == 1
+    for i in range(9):
+        store.write(f"k{i}", b"x" * 10)
+    assert len(scans) == 1
+    assert store.read("k3") == b"x" * 10
+    store.write("k9", b"x" * 10)
+    store.write("k10", b"x" * 10)
+    assert len(scans) == 2
+    files = [name for name in os.listdir(tmp_path) if name.endswith(".bin")]
+    assert sum(os.path.getsize(tmp_path / name) for name in files) <= 90
+    assert store.stats()["bytes"] <= 90
+
+
+def test_tiered_cache_promotes_disk_hits(tmp_path):
+    cache = TieredCache(1024, disk_dir=str(tmp_path), disk_max_bytes=1024)
+    cache.put("key", b"value")
+    fresh = TieredCache(1024, disk_dir=str(tmp_path), disk_max_bytes=1024)
+    assert fresh.memory.get("key") is None
+    assert fresh.get("key") == b"value"
+    assert fresh.memory.get("key") == b"value"
+    assert fresh.get("missing") is None
+
+
+def test_image_cache_shares_content_between_urls(tmp_path):
+    cache = ImageCache(max_bytes=1024, disk_dir=str(tmp_path), disk_max_bytes=1024)
+    first = cache.put("http://a/1.jpg", b"same", etag='"1"')
+    second = cache.put("http://b/2.jpg", b"same")
+    assert first == second
+    assert cache.get_url("http://a/1.jpg")[:3] == ('"1"', None, first)
+    assert cache.get_content(first) == b"same"
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_feature_cache_reads_vectors_back_from_shared_disk_store(tmp_path):
+    key = FeatureCache.key(b"imagem", "sig")
+    FeatureCache(max_entries=4, disk_dir=str(tmp_path)).put(key, [0.5, 1.0, 2.0])
+
+    other_worker = FeatureCache(max_entries=4, disk_dir=str(tmp_path))
+    assert other_worker.get(key) == [0.5, 1.0, 2.0]
+    assert other_worker.get(FeatureCache.key(b"outra", "sig")) is None
+    stats = other_worker.stats()
+    assert (stats["disk_hits"], stats["misses"]) == (1, 1)
+    assert stats["disk"]["bytes"] > 0
+    assert os.listdir(tmp_path) == [f"{key}.npy"]
+
+
+def test_thumbnail_cache_uses_shared_tiered_store(tmp_path):
+    key = ThumbnailCache.key("http://x/rex.jpg", 160, 80)
+    ThumbnailCache(max_bytes=1024, disk_dir=str(tmp_path)).put(key, b"jpeg")
+
+    other_worker = ThumbnailCache(max_bytes=1024, disk_dir=str(tmp_path))
+    assert other_worker.get(key) == b"jpeg"
+    assert other_worker.memory.get(key) == b"jpeg"
+    assert os.listdir(tmp_path) == [f"{key}.jpg"]
+    assert other_worker.stats()["disk"]["bytes"] == 4
@@ -0,0 +1,154 @@
+# tests/test_gallery_cache.py
+import datetime
+
+import numpy as np
+
+from gallery import FeatureGalleryCache, GalleryCache, GalleryMatcher, InvertedFileIndex
+
+
+class FakeDogs:
+    """Tabela `dogs` em memória: só as linhas "commitadas" são visíveis para as consultas."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def commit(self, dog_id, vector):
+        self.rows[dog_id] = np.asarray(vector, dtype=np.float32)
+
+    def get_saved_features(self):
+        return sorted(self.rows.items())
+
+    def get_saved_features_since(self, last_dog_id, limit=None, exclude=None):
+        exclude = set(exclude or [])
+        rows = [(i, v) for i, v in sorted(self.rows.items()) if i > last_dog_id and i not in exclude]
+        return rows[:limit] if limit else rows
+
+
+def vector(seed, dim=8):
+    return np.random.default_rng(seed).normal(size=dim)
+
+
+def test_refresh_picks_up_transactions_committed_out_of_id_order():
+    db = FakeDogs()
+    db.commit(1, vector(1))
+    cache = GalleryCache(db, refresh_interval=0)
+    cache.get()
+    # O cão 3 termina antes do 2, cuja transação ainda está aberta
+    db.commit(3, vector(3))
+    assert sorted(cache.get().dog_ids) == [1, 3]
+    db.commit(2, vector(2))
+    assert sorted(cache.get().dog_ids) == [1, 2, 3]
+
+
+def test_local_add_does_not_skip_pending_lower_ids():
+    db = FakeDogs()
+    db.commit(1, vector(1))
+    cache = GalleryCache(db, refresh_interval=0)
+    cache.get()
+    db.commit(5, vector(5))
+    cache.add(5, vector(5))
+    db.commit(4, vector(4))
+    assert sorted(cache.get().dog_ids) == [1, 4, 5]
+
+
+def test_refresh_and_add_never_duplicate():
+    db = FakeDogs()
+    for dog_id in range(1, 6):
+        db.commit(dog_id, vector(dog_id))
+    cache = GalleryCache(db, refresh_interval=0, refresh_window=3)
+    cache.get()
+    cache.add(5, vector(5))
+    db.commit(6, vector(6))
+    cache.add(6, vector(6))
+    for _ in range(3):
+        ids = cache.get().dog_ids
+    assert sorted(ids) == [1, 2, 3, 4, 5, 6]
+
+
+def test_late_add_below_window_is_loaded_once():
+    db = FakeDogs()
+    for dog_id in range(1, 21):
+        db.commit(dog_id, vector(dog_id))
+    cache = GalleryCache(db, refresh_interval=0, refresh_window=2)
+    cache.get()
+    cache.add(3, vector(3))
+    cache.add(25, vector(25))
+    assert sorted(cache.get().dog_ids) == list(range(1, 21)) + [25]
+
+
+class FakeFeatures:
+    """Tabela `features` em memória, com `updated_at` controlado pelo teste."""
+
+    def __init__(self):
+        self.rows = {}
+        self.next_id = 1
+        self.clock = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+    def tick(self, seconds=1):
+        self.clock += datetime.timedelta(seconds=seconds)
+        return self.clock
+
+    def upsert(self, dog_id, descriptor_type, vector, updated_at=None):
+        key = (dog_id, descriptor_type)
+        feature_id = self.rows[key][0] if key in self.rows else self.next_id
+        self.next_id += key not in self.rows
+        self.rows[key] = (feature_id, dog_id, descriptor_type, updated_at or self.tick(), np.asarray(vector, dtype=np.float32))
+
+    def get_strategy_features_since(self, since=None, exclude=None):
+        exclude = set(exclude or [])
+        rows = [
+            row for row in self.rows.values()
+            if (since is None or row[3] > since) and (row[0], row[3]) not in exclude
+        ]
+        return sorted(rows, key=lambda row: (row[3], row[0]))
+
+
+def test_feature_gallery_replaces_re_enrolled_vectors():
+    db = FakeFeatures()
+    db.upsert(1, "SIFT", [1, 0, 0])
+    db.upsert(2, "SIFT", [0, 1, 0])
+    cache = FeatureGalleryCache(db, refresh_interval=0)
+    before = cache.get()
+    db.upsert(1, "SIFT", [0, 0, 1])
+    gallery = cache.get()
+    assert gallery is not before
+    top = gallery.top_k({"SIFT": [0, 0, 1]}, {"SIFT": 1.0}, k=1)
+    assert top[0][0] == 1 and abs(top[0][1] - 1.0) < 1e-6
+    assert gallery.sizes() == {"SIFT": 2}
+    # A galeria anterior, ainda em uso por consultas em andamento, não muda
+    assert before.top_k({"SIFT": [1, 0, 0]}, {"SIFT": 1.0}, k=1)[0][0] == 1
+
+
+def test_feature_gallery_picks_up_late_commits_within_slack():
+    db = FakeFeatures()
+    db.upsert(1, "SIFT", [1, 0, 0])
+    cache = FeatureGalleryCache(db, refresh_interval=0, refresh_slack=60)
+    cache.get()
+    started = db.tick()
+    db.upsert(3, "SIFT", [0, 0, 1])
+    assert cache.get().sizes() == {"SIFT": 2}
+    # Transação que começou antes do cão 3 e só terminou agora
+    db.upsert(2, "SIFT", [0, 1, 0], updated_at=started)
+    assert cache.get().sizes() == {"SIFT": 3}
+    assert cache.get().sizes() == {"SIFT": 3}
+
+
+def test_feature_gallery_updates_inverted_file_index():
+    db = FakeFeatures()
+    db.upsert(1, "VLAD", [1, 0, 0, 0])
+    db.upsert(2, "VLAD", [0, 0, 1, 0])
+    cache = FeatureGalleryCache(db, refresh_interval=0, index_factories={"VLAD": lambda: InvertedFileIndex(4)})
+    cache.get()
+    db.upsert(1, "VLAD", [0, 0, 0, 1])
+    index = cache.get().matchers["VLAD"]
+    assert index.top_k([0, 0, 0, 1], k=1)[0][0] == 1
+    # O cão 1 saiu da lista invertida da palavra 0
+    assert index.top_k([1, 0, 0, 0], k=2) == []
+
+
+def test_with_updates_keeps_original_matcher():
+    matcher = GalleryMatcher([1, 2], [[1, 0], [0, 1]])
+    updated = matcher.with_updates({2: [1, 0], 9: [0, 1]})
+    assert matcher.closest([0, 1], "cosine")[0] == 2
+    assert updated.closest([0, 1], "cosine")[1] == 0.0
+    assert list(updated.dog_ids) == [1, 2]
@@ -0,0 +1,118 @@
+# tests/test_gallery_matcher.py
+import numpy as np
+import pytest
+
+from gallery import FusedGallery, GalleryMatcher, InvertedFileIndex
+
+
+@pytest.fixture
+def gallery():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 16)).astype(np.float32)
+    return GalleryMatcher(np.arange(100, 300), vectors), vectors
+
+
+def brute_force(vectors, query, metric):
+    if metric == "euclidean":
+        scores = np.linalg.norm(vectors - query, axis=1)
+        order = np.argsort(scores, kind="stable")
+    else:
+        scores = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+        order = np.argsort(-scores, kind="stable")
+    return [(int(100 + i), float(scores[i])) for i in order]
+
+
+@pytest.mark.parametrize("metric", GalleryMatcher.METRICS)
+@pytest.mark.parametrize("k", [1, 5, 200, 500])
+def test_top_k_matches_full_sort(gallery, metric, k):
+    matcher, vectors = gallery
+    query = vectors[7] + 0.1
+    result = matcher.top_k(query, metric, k=k)
+    expected = brute_force(vectors, query, metric)[:k]
+    assert [dog_id for dog_id, _ in result] == [dog_id for dog_id, _ in expected]
+    np.testing.assert_allclose([s for _, s in result], [s for _, s in expected], rtol=1e-4, atol=1e-4)
+
+
+@pytest.mark.parametrize("metric,threshold", [("euclidean", 5.0), ("cosine", 0.2)])
+def test_top_k_threshold_filters_before_selection(gallery, metric, threshold):
+    matcher, vectors = gallery
+    query = vectors[3]
+    passing = [
+        (dog_id, score) for dog_id, score in brute_force(vectors, query, metric)
+        if (score <= threshold if metric == "euclidean" else score >= threshold)
+    ]
+    result = matcher.top_k(query, metric, k=1000, threshold=threshold)
+    assert [dog_id for dog_id, _ in result] == [dog_id for dog_id, _ in passing]
+    assert len(matcher.top_k(query, metric, k=3, threshold=threshold)) == min(3, len(passing))
+
+
+def test_top_k_edge_cases(gallery):
+    matcher, vectors = gallery
+    assert matcher.top_k(vectors[0], "cosine", k=0) == []
+    assert GalleryMatcher().top_k(vectors[0], "cosine", k=3) == []
+    assert matcher.top_k(vectors[0], "cosine", k=3, threshold=1.5) == []
+    assert matcher.closest(vectors[42], "euclidean")[0] == 142
+    with pytest.raises(ValueError):
+        matcher.top_k(vectors[0][:8], "cosine")
+    with pytest.raises(ValueError):
+        matcher.top_k(vectors[0], "manhattan")
+
+
+def test_add_grows_buffers_and_rejects_other_dimensions():
+    matcher = GalleryMatcher()
+    for dog_id in range(40):
+        assert matcher.add(dog_id, np.eye(40)[dog_id])
+    assert not matcher.add(99, np.ones(3))
+    assert len(matcher) == 40
+    assert matcher.closest(np.eye(40)[17], "cosine") == (17, pytest.approx(1.0))
+
+
+def test_inverted_file_index_matches_exact_cosine_with_full_probe():
+    rng = np.random.default_rng(1)
+    vectors = np.abs(rng.normal(size=(50, 32))) * (rng.random((50, 32)) > 0.6)
+    index = InvertedFileIndex.from_rows(list(enumerate(vectors)), n_words=8)
+    exact = GalleryMatcher(np.arange(50), vectors)
+    query = vectors[5]
+    shared = index.top_k(query, k=50)
+    # Com todas as palavras, o índice só deixa de fora cães sem nenhuma palavra em comum (cosseno 0)
+    expected = [(i, s) for i, s in exact.top_k(query, "cosine", k=50) if s > 0]
+    assert [i for i, _ in shared][:len(expected)] == [i for i, _ in expected]
+
+
+def test_fused_gallery_threshold_and_weights():
+    sift = GalleryMatcher([1, 2, 3], [[1, 0], [0, 1], [1, 1]])
+    color = GalleryMatcher([1, 2], [[0, 1], [0, 1]])
+    fused = FusedGallery({"SIFT": sift, "MeanColor": color})
+    queries = {"SIFT": [1, 0], "MeanColor": [0, 1]}
+    top = fused.top_k(queries, {"SIFT": 1.0, "MeanColor": 1.0}, k=3)
+    assert [dog_id for dog_id, _, _ in top] == [1, 2, 3]
+    assert top[0][1] == pytest.approx(1.0)
+    # O cão 3 não tem MeanColor: esse termo conta 0
+    assert top[2][1] == pytest.approx(np.sqrt(0.5) / 2)
+    assert [dog_id for dog_id, _, _ in fused.top_k(queries, {"SIFT": 1.0, "MeanColor": 1.0}, k=3, threshold=0.6)] == [1]
+    with pytest.raises(ValueError):
+        fused.top_k(queries, {"SIFT": 0.0})
+
+
+def test_hog_vectors_of_differently_sized_images_fuse():
+    from image_data import ImageData
+    from strategies.hog_extractor import HOGExtractor
+
+    rng = np.random.default_rng(1)
+    hog = HOGExtractor()
+    small = hog.extract(ImageData(bgr=rng.integers(0, 256, size=(300, 200, 3), dtype=np.uint8)))
+    large = hog.extract(ImageData(bgr=rng.integers(0, 256, size=(480, 640, 3), dtype=np.uint8)))
+    assert len(small) == len(large) == hog.dim < 16000
+
+    sift = GalleryMatcher([1, 2], [[1, 0], [0, 1]])
+    fused = FusedGallery({"SIFT": sift, "HOG": GalleryMatcher([1, 2], [small, large])})
+    queries = {"SIFT": [0, 1], "HOG": large}
+    assert fused.mismatched_dimensions(queries) == {}
+    top = fused.top_k(queries, {"SIFT": 1.0, "HOG": 1.0}, k=2)
+    assert top[0][0] == 2
+    assert top[0][2]["HOG"] == pytest.approx(1.0)
+
+
+def test_fused_gallery_reports_mismatched_dimensions():
+    fused = FusedGallery({"SIFT": GalleryMatcher([1], [[1, 0]]), "HOG": GalleryMatcher([1], [[1, 0, 0]])})
+    assert fused.mismatched_dimensions({"SIFT": [1, 0], "HOG": [1, 0, 0, 0]}) == {"HOG": (4, 3)}
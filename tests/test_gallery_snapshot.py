@@ -0,0 +1,85 @@
+# tests/test_gallery_snapshot.py
+import threading
+import time
+
+import numpy as np
+
+from gallery_snapshot import SnapshotGalleryCache, build_snapshot, read_manifest
+
+
+class FakeDogs:
+    """Tabela `dogs` em memória; conta as leituras completas feitas para gravar snapshots."""
+
+    def __init__(self, build_delay=0.0):
+        self.rows = {}
+        self.builds = 0
+        self.build_delay = build_delay
+        self._lock = threading.Lock()
+
+    def commit(self, dog_id, vector):
+        self.rows[dog_id] = np.asarray(vector, dtype=np.float32)
+
+    def get_saved_features_since(self, last_dog_id, limit=None, exclude=None):
+        if limit is not None and last_dog_id == 0:
+            with self._lock:
+                self.builds += 1
+            time.sleep(self.build_delay)
+        exclude = set(exclude or [])
+        rows = [(i, v) for i, v in sorted(self.rows.items()) if i > last_dog_id and i not in exclude]
+        return rows[:limit] if limit else rows
+
+
+def vector(seed, dim=8):
+    return np.random.default_rng(seed).normal(size=dim)
+
+
+def test_workers_starting_together_build_one_snapshot(tmp_path):
+    db = FakeDogs(build_delay=0.1)
+    for dog_id in range(1, 4):
+        db.commit(dog_id, vector(dog_id))
+    workers = [SnapshotGalleryCache(db, str(tmp_path), refresh_interval=0) for _ in range(4)]
+    threads = [threading.Thread(target=worker.get) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert db.builds == 1
+    versions = {worker._manifest["version"] for worker in workers}
+    assert versions == {read_manifest(str(tmp_path))["version"]}
+    assert all(sorted(worker.get().dog_ids) == [1, 2, 3] for worker in workers)
+
+
+def test_build_if_missing_reuses_existing_snapshot(tmp_path):
+    db = FakeDogs()
+    db.commit(1, vector(1))
+    first = build_snapshot(db, str(tmp_path))
+    assert build_snapshot(db, str(tmp_path), if_missing=True) == first
+    assert db.builds == 1
+    assert build_snapshot(db, str(tmp_path))["version"] != first["version"]
+
+
+def test_refresh_swaps_to_new_snapshot_and_keeps_newer_delta(tmp_path):
+    db = FakeDogs()
+    for dog_id in range(1, 4):
+        db.commit(dog_id, vector(dog_id))
+    cache = SnapshotGalleryCache(db, str(tmp_path), refresh_interval=0)
+    old = cache.get()
+    db.commit(4, vector(4))
+    cache.add(4, vector(4))
+    assert sorted(old.delta.dog_ids) == [4]
+
+    # Outro worker grava uma versão nova (já com o cão 4); o 5 chega depois dela
+    manifest = build_snapshot(db, str(tmp_path), keep=1)
+    db.commit(5, vector(5))
+    cache.add(5, vector(5))
+
+    current = cache.get()
+    assert current is not old
+    assert current.version == manifest["version"]
+    assert sorted(current.base.dog_ids) == [1, 2, 3, 4]
+    assert sorted(current.delta.dog_ids) == [5]
+    assert current.closest(vector(5), "cosine")[0] == 5
+
+    # A versão antiga, já removida do disco, continua válida para quem ainda a usa
+    assert old.closest(vector(2), "cosine")[0] == 2
@@ -0,0 +1,28 @@
+# tests/test_image_fetcher.py
+import threading
+
+from image_fetcher import ImageFetcher
+
+
+def sessions_seen_by_threads(fetcher, count=3):
+    sessions = []
+    threads = [threading.Thread(target=lambda: sessions.append(fetcher.session)) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sessions
+
+
+def test_sessions_are_per_thread_by_default():
+    fetcher = ImageFetcher()
+    assert fetcher.session is fetcher.session
+    assert len({id(session) for session in sessions_seen_by_threads(fetcher)}) == 3
+
+
+def test_shared_session_is_used_by_every_thread():
+    fetcher = ImageFetcher(pool_maxsize=50, shared_session=True)
+    sessions = sessions_seen_by_threads(fetcher)
+    assert all(session is fetcher.session for session in sessions)
+    adapter = fetcher.session.get_adapter("https://bucket.example/dog.jpg")
+    assert adapter._pool_maxsize == 50
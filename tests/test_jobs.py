@@ -0,0 +1,168 @@
+import itertools
+import threading
+import time
+
+from jobs import EnrollmentQueue
+
+
+class FakeJobs:
+    """Tabela enrollment_jobs em memória, com as mesmas regras de reserva do DB."""
+
+    def __init__(self):
+        self.jobs = {}
+        self.dogs = []
+        self.requeues = []
+        self._ids = itertools.count(1)
+        self._tokens = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def insert_enrollment_job(self, dog_name, image_url):
+        job_id = next(self._ids)
+        self.jobs[job_id] = {"status": "queued", "dog_name": dog_name, "image_url": image_url,
+                             "attempts": 0, "claim_token": None, "dog_id": None, "error": None}
+        return job_id
+
+    def get_enrollment_job(self, job_id):
+        return self.jobs.get(job_id)
+
+    def claim_enrollment_job(self):
+        with self._lock:
+            for job_id, job in sorted(self.jobs.items()):
+                if job["status"] == "queued":
+                    job.update(status="running", attempts=job["attempts"] + 1,
+                               claim_token=f"token-{next(self._tokens)}")
+                    return job_id, job["dog_name"], job["image_url"], job["attempts"], job["claim_token"]
+        return None
+
+    def _holds(self, job_id, claim_token):
+        job = self.jobs[job_id]
+        return job["status"] == "running" and job["claim_token"] == claim_token
+
+    def complete_enrollment_job(self, job_id, claim_token, dog_name, feature_vector, image_url, extractor_params=None):
+        with self._lock:
+            if not self._holds(job_id, claim_token):
+                return None
+            self.dogs.append(dog_name)
+            dog_id = len(self.dogs)
+            self.jobs[job_id].update(status="done", dog_id=dog_id)
+            return dog_id
+
+    def fail_enrollment_job(self, job_id, claim_token, error, retry=False):
+        with self._lock:
+            if self._holds(job_id, claim_token):
+                self.jobs[job_id].update(status="queued" if retry else "failed", error=error, claim_token=None)
+
+    def requeue_stale_enrollment_jobs(self, stale_seconds, max_attempts):
+        self.requeues.append(stale_seconds)
+        with self._lock:
+            for job in self.jobs.values():
+                if job["status"] == "running":
+                    job.update(status="failed" if job["attempts"] >= max_attempts else "queued", claim_token=None)
+
+
+def make_queue(database, extract=None, **kwargs):
+    kwargs.setdefault("max_attempts", 2)
+    return EnrollmentQueue(database, extract or (lambda url: ([1.0, 2.0], {})), **kwargs)
+
+
+def test_failed_job_is_retried_until_max_attempts():
+    database = FakeJobs()
+    queue = make_queue(database, extract=lambda url: ([], {}))
+    job_id = queue.submit("rex", "http://x/rex.jpg")
+
+    queue._process(*database.claim_enrollment_job())
+    assert database.jobs[job_id]["status"] == "queued"
+
+    queue._process(*database.claim_enrollment_job())
+    assert database.jobs[job_id]["status"] == "failed"
+    assert database.jobs[job_id]["attempts"] == 2
+    assert database.claim_enrollment_job() is None
+
+
+def test_stale_requeue_honours_max_attempts():
+    database = FakeJobs()
+    queue = make_queue(database)
+    first = queue.submit("rex", "http://x/rex.jpg")
+    second = queue.submit("bob", "http://x/bob.jpg")
+    database.claim_enrollment_job()
+    database.claim_enrollment_job()
+    database.jobs[second]["attempts"] = 2
+
+    queue._recover_stale_jobs()
+
+    assert database.jobs[first]["status"] == "queued"
+    assert database.jobs[second]["status"] == "failed"
+
+
+def test_worker_that_lost_the_claim_does_not_enroll_twice():
+    database = FakeJobs()
+    enrolled = []
+    queue = make_queue(database, on_enrolled=lambda dog_id, fv: enrolled.append(dog_id))
+    job_id = queue.submit("rex", "http://x/rex.jpg")
+
+    stale = database.claim_enrollment_job()
+    database.requeue_stale_enrollment_jobs(600.0, 3)
+    fresh = database.claim_enrollment_job()
+
+    queue._process(*fresh)
+    queue._process(*stale)
+    assert database.dogs == ["rex"]
+    assert enrolled == [1]
+
+    # A falha do worker antigo também não altera o job concluído pelo novo
+    database.fail_enrollment_job(job_id, stale[4], "timeout", retry=True)
+    assert database.jobs[job_id]["status"] == "done"
+
+
+def test_recovery_runs_once_on_first_loop_not_on_start():
+    database = FakeJobs()
+    queue = make_queue(database, workers=3, poll_interval=0.01, stale_seconds=600.0)
+    queue.start()
+    try:
+        deadline = time.monotonic() + 2.0
+        while not database.requeues and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+    finally:
+        queue.stop(timeout=2.0)
+    assert database.requeues == [600.0]
+
+
+def test_worker_survives_errors_after_enrollment():
+    database = FakeJobs()
+
+    def on_enrolled(dog_id, feature_vector):
+        raise RuntimeError("galeria indisponível")
+
+    queue = make_queue(database, on_enrolled=on_enrolled, poll_interval=0.01)
+    first = queue.submit("rex", "http://x/rex.jpg")
+    queue.start()
+    try:
+        second = queue.submit("bob", "http://x/bob.jpg")
+        deadline = time.monotonic() + 2.0
+        while database.jobs[second]["status"] != "done" and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        queue.stop(timeout=2.0)
+    assert database.jobs[first]["status"] == "done"
+    assert database.jobs[second]["status"] == "done"
+
+
+def test_worker_survives_errors_while_failing_a_job():
+    class BrokenFail(FakeJobs):
+        def fail_enrollment_job(self, job_id, claim_token, error, retry=False):
+            raise RuntimeError("conexão perdida")
+
+    database = BrokenFail()
+    urls = iter([([], {}), ([1.0], {})])
+    queue = make_queue(database, extract=lambda url: next(urls), poll_interval=0.01)
+    queue.submit("rex", "http://x/rex.jpg")
+    queue.start()
+    try:
+        second = queue.submit("bob", "http://x/bob.jpg")
+        deadline = time.monotonic() + 2.0
+        while database.jobs[second]["status"] != "done" and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        queue.stop(timeout=2.0)
+    assert database.jobs[second]["status"] == "done"
@@ -0,0 +1,42 @@
+# tests/test_pq_gallery.py
+import numpy as np
+
+from gallery import GalleryMatcher
+from pq_gallery import PQGallery, ProductQuantizer
+
+
+def make_gallery(count=300, dim=16):
+    vectors = np.random.default_rng(0).normal(size=(count, dim)).astype(np.float32)
+    quantizer = ProductQuantizer.train(vectors, subspaces=4, clusters=16, iterations=5, seed=0)
+    gallery = PQGallery(quantizer)
+    gallery.add_many(list(range(1, count + 1)), vectors)
+    return gallery, vectors
+
+
+def test_split_rerank_matches_single_call():
+    gallery, vectors = make_gallery()
+    lookups = []
+
+    def exact_vectors(ids):
+        lookups.append(list(ids))
+        return [(dog_id, vectors[dog_id - 1]) for dog_id in ids]
+
+    query = vectors[41] + 0.01
+    for metric, threshold in (("cosine", 0.2), ("euclidean", None)):
+        ids = gallery.shortlist_ids(query, metric, 50)
+        assert len(ids) == 50 and 42 in ids
+        split = gallery.rescore(exact_vectors(ids), query, metric, k=5, threshold=threshold)
+        single = gallery.top_k(query, metric, k=5, threshold=threshold, exact_vectors=exact_vectors, shortlist=50)
+        assert split == single
+        assert split[0][0] == 42
+        # A pontuação final é a exata, não a aproximada
+        exact = GalleryMatcher(np.arange(1, len(vectors) + 1), vectors).top_k(query, metric, k=1)
+        assert np.isclose(split[0][1], exact[0][1])
+    assert all(len(ids) == 50 for ids in lookups)
+
+
+def test_shortlist_of_empty_gallery():
+    gallery, _ = make_gallery()
+    empty = PQGallery(gallery.quantizer)
+    assert empty.shortlist_ids(np.zeros(16), "cosine", 10) == []
+    assert empty.top_k(np.zeros(16), "cosine", k=3, exact_vectors=lambda ids: [], shortlist=10) == []
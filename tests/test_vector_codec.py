@@ -0,0 +1,60 @@
+# tests/test_vector_codec.py
+import numpy as np
+import pytest
+
+from database import EMBEDDING_DIM, dog_vector_columns
+from vector_codec import STORAGE_DTYPE, pack_vector, unpack_rows, unpack_vector
+
+
+def test_pack_unpack_round_trip():
+    rng = np.random.default_rng(0)
+    vector = np.concatenate([rng.integers(0, 256, size=128), rng.random(64), [0.0, -3.5]])
+    packed = pack_vector(vector.tolist())
+    assert len(packed) == vector.size * STORAGE_DTYPE.itemsize
+
+    unpacked = unpack_vector(packed)
+    assert unpacked.dtype == STORAGE_DTYPE
+    np.testing.assert_allclose(unpacked, vector, rtol=1e-3, atol=1e-4)
+    # Valores inteiros de descritores (SIFT 0-255) voltam exatos
+    np.testing.assert_array_equal(unpacked[:128], vector[:128])
+    assert not unpacked.flags.writeable
+
+
+def test_pack_rejects_values_outside_float16():
+    assert pack_vector([1.0, 1e6]) is None
+    assert pack_vector([]) == b""
+
+
+def test_unpack_rows_prefers_packed_column():
+    rows = [(1, pack_vector([1.0, 2.0]), None), (2, None, [3.0, 4.0])]
+    (first_id, first), (second_id, second) = unpack_rows(rows)
+    assert first_id == 1 and np.array_equal(first, [1.0, 2.0])
+    assert second_id == 2 and second == [3.0, 4.0]
+
+
+def test_dog_vector_columns_skip_float8_array_when_packed():
+    vector = [float(i) for i in range(EMBEDDING_DIM)]
+    feature_vector, packed, embedding = dog_vector_columns(vector)
+    assert feature_vector is None
+    assert np.array_equal(unpack_vector(packed.adapted), vector)
+    assert embedding == "[" + ",".join(str(v) for v in vector) + "]"
+
+    feature_vector, packed, embedding = dog_vector_columns([1e6, 2.0])
+    assert feature_vector == [1e6, 2.0]
+    assert packed is None and embedding is None
+
+
+@pytest.mark.parametrize("values", [[0.5] * 3, np.arange(5, dtype=np.float32)])
+def test_pack_accepts_lists_and_arrays(values):
+    assert np.array_equal(unpack_vector(pack_vector(values)), np.asarray(values, dtype=np.float64))
+
+
+def test_strategy_vector_columns_skip_pgvector_when_packed():
+    from database import strategy_vector_columns
+
+    feature_vector, packed = strategy_vector_columns([0.25] * 8100)
+    assert feature_vector is None
+    assert len(packed.adapted) == 8100 * STORAGE_DTYPE.itemsize
+
+    feature_vector, packed = strategy_vector_columns([1e6])
+    assert feature_vector == "[1000000.0]" and packed is None